@@ -0,0 +1,429 @@
+import asyncio
+import bz2
+import socket
+import struct
+import threading
+import time
+import zlib
+
+#
+#   A2S QUERIES
+#
+
+class _PacketReader:
+    """
+    Reads the little endian fields of an A2S answer
+    """
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data   = data
+        self.offset = offset
+
+    def Remaining(self) -> int:
+        return len(self.data) - self.offset
+
+    def Unpack(self, format: str):
+        values = struct.unpack_from("<" + format, self.data, self.offset)
+        self.offset += struct.calcsize("<" + format)
+        return values[0] if len(values) == 1 else values
+
+    def String(self) -> str:
+        end = self.data.index(b"\0", self.offset)
+        value = self.data[self.offset:end].decode("utf-8", errors = "replace")
+        self.offset = end + 1
+        return value
+
+
+class A2S:
+    """
+    Encoding and parsing of the A2S_INFO, A2S_PLAYER and A2S_RULES server queries
+    https://developer.valvesoftware.com/wiki/Server_queries
+    """
+
+    single_packet: bytes    = b"\xff\xff\xff\xff"
+    split_packet: bytes     = b"\xff\xff\xff\xfe"
+
+    A2S_INFO: int           = 0x54
+    A2S_PLAYER: int         = 0x55
+    A2S_RULES: int          = 0x56
+    S2C_CHALLENGE: int      = 0x41
+    S2A_INFO: int           = 0x49
+    S2A_PLAYER: int         = 0x44
+    S2A_RULES: int          = 0x45
+
+    # answer header expected for each query
+    answers: map = {A2S_INFO: S2A_INFO, A2S_PLAYER: S2A_PLAYER, A2S_RULES: S2A_RULES}
+
+    no_challenge: bytes     = b"\xff\xff\xff\xff"
+
+    @staticmethod
+    def Request(query: int, challenge: bytes = None) -> bytes:
+        """
+        query packet, A2S_INFO only carries a challenge once the server asked for one
+        """
+        if query == A2S.A2S_INFO:
+            return A2S.single_packet + bytes([query]) + b"Source Engine Query\0" + (challenge if challenge is not None else b"")
+        return A2S.single_packet + bytes([query]) + (challenge if challenge is not None else A2S.no_challenge)
+
+    @staticmethod
+    def ParseInfo(payload: bytes) -> map:
+        reader = _PacketReader(payload, 1)
+
+        info = {"protocol":reader.Unpack("B"), "name":reader.String(), "map":reader.String(), "folder":reader.String(), "game":reader.String(),
+            "appId":reader.Unpack("H"), "players":reader.Unpack("B"), "maxPlayers":reader.Unpack("B"), "bots":reader.Unpack("B"),
+            "serverType":chr(reader.Unpack("B")), "environment":chr(reader.Unpack("B")), "password":reader.Unpack("B") == 1, "vac":reader.Unpack("B") == 1,
+            "version":reader.String()}
+
+        if reader.Remaining() > 0:
+            edf = reader.Unpack("B")
+            if edf & 0x80: info["port"] = reader.Unpack("H")
+            if edf & 0x10: info["steamId"] = reader.Unpack("Q")
+            if edf & 0x40: info["sourceTVPort"], info["sourceTVName"] = reader.Unpack("H"), reader.String()
+            if edf & 0x20: info["keywords"] = reader.String()
+            if edf & 0x01: info["gameId"] = reader.Unpack("Q")
+
+        return info
+
+    @staticmethod
+    def ParsePlayers(payload: bytes) -> list:
+        reader = _PacketReader(payload, 1)
+
+        players = []
+        for _ in range(reader.Unpack("B")):
+            if reader.Remaining() <= 0:
+                break
+            index = reader.Unpack("B")
+            players.append({"index":index, "name":reader.String(), "score":reader.Unpack("l"), "duration":reader.Unpack("f")})
+        return players
+
+    @staticmethod
+    def ParseRules(payload: bytes) -> map:
+        reader = _PacketReader(payload, 1)
+
+        rules = {}
+        for _ in range(reader.Unpack("H")):
+            if reader.Remaining() <= 0:
+                break
+            name = reader.String()
+            rules[name] = reader.String()
+        return rules
+
+    parsers: map = {S2A_INFO: ParseInfo, S2A_PLAYER: ParsePlayers, S2A_RULES: ParseRules}
+
+
+class _A2SProtocol(asyncio.DatagramProtocol):
+    """
+    One udp socket for every polled server, answers are routed to the query waiting on their address
+    split answers (0xFFFFFFFE packets) are reassembled before being handed over, bz2 compressed ones (high bit of their id)
+    decompressed and checked against their crc32
+    only a waited for address keeps split parts, they are dropped with its query (answered or timed out)
+    """
+
+    def __init__(self):
+        self.transport  = None
+        self.waiters    = {} # address -> future of the next answer payload
+        self.splits     = {} # address -> {split id: {packet number: payload}}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, address):
+        address = address[:2]
+
+        waiter = self.waiters.get(address)
+        if waiter is None or waiter.done():
+            # late or unexpected, nobody would ever take it
+            return
+
+        if data[:4] == A2S.split_packet and len(data) >= 12:
+            id, total, number, _ = struct.unpack_from("<LBBH", data, 4)
+            parts = self.splits.setdefault(address, {}).setdefault(id, {})
+            parts[number] = data[12:]
+            if len(parts) < total:
+                return
+            del self.splits[address][id]
+            data = b"".join(parts.get(i, b"") for i in range(total))
+
+            if id & 0x80000000:
+                try:
+                    data = _A2SProtocol.Decompress(data)
+                except (ValueError, OSError, EOFError, struct.error) as e:
+                    waiter.set_exception(ValueError("invalid compressed a2s answer: " + str(e)))
+                    return
+
+        if data[:4] != A2S.single_packet:
+            return
+
+        waiter.set_result(data[4:])
+
+    @staticmethod
+    def Decompress(data: bytes) -> bytes:
+        """
+        payload of a compressed split answer: decompressed size and crc32, then the bz2 data
+        """
+        size, crc = struct.unpack_from("<lL", data, 0)
+        data = bz2.decompress(data[8:])
+        if len(data) != size or zlib.crc32(data) != crc:
+            raise ValueError("size or crc32 mismatch")
+        return data
+
+    def Forget(self, address):
+        self.splits.pop(address, None)
+
+    def error_received(self, exc):
+        # icmp port unreachable and co, the query times out
+        pass
+
+
+class ServerStatus:
+    """
+    Last known state of a polled server
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host               = host
+        self.port               = port
+
+        self.online: bool       = False
+        self.info: map          = {}
+        self.players: list      = []
+        self.rules: map         = {}
+        self.latency: float     = None # seconds of the last A2S_INFO round trip
+        self.lastUpdate: float  = 0.0  # time.time() of the last answer
+        self.lastError: str     = ""
+        self.failures: int      = 0    # polls failed in a row
+
+    def ToDict(self) -> map:
+        return {"host":self.host, "port":self.port, "online":self.online, "info":self.info, "players":self.players, "rules":self.rules,
+            "latency":self.latency, "lastUpdate":self.lastUpdate, "lastError":self.lastError, "failures":self.failures}
+
+
+class _Target:
+    def __init__(self, host: str, port: int, interval: float, timeout: float, players: bool, rules: bool):
+        self.host       = host
+        self.port       = port
+        self.interval   = interval
+        self.timeout    = timeout
+        self.players    = players
+        self.rules      = rules
+
+        self.address    = None # resolved (ip, port)
+        self.task       = None
+        self.removed    = False
+
+
+class A2SPoller:
+    """
+    Polls many game servers with A2S queries from one asyncio event loop and one udp socket
+    every target has its own interval, timeout and queries (A2S_INFO always, A2S_PLAYER / A2S_RULES optional),
+    results land in a shared status table keyed by "host:port"
+    a server goes offline after offlineAfter polls failed in a row
+
+    usage:
+        poller = A2SPoller().Start() # background thread
+        poller.AddTarget("127.0.0.1", 27015)
+        poller.GetStatus("127.0.0.1", 27015).info["players"]
+    """
+
+    def __init__(self, interval: float = 5.0, timeout: float = 2.0, players: bool = True, rules: bool = False, offlineAfter: int = 2):
+        self.interval       = interval
+        self.timeout        = timeout
+        self.players        = players
+        self.rules          = rules
+        self.offlineAfter   = offlineAfter
+
+        self.statuses: map  = {} # "host:port" -> ServerStatus
+
+        self._lock          = threading.Lock()
+        self._targets: map  = {} # "host:port" -> _Target
+        self._loop          = None
+        self._thread        = None
+        self._protocol      = None
+        self._stopped       = None
+        self._ready         = threading.Event() # set once Run() listens
+
+    @staticmethod
+    def _Key(host: str, port: int) -> str:
+        return host + ":" + str(int(port))
+
+    #
+    #   TARGETS
+    #
+
+    def AddTarget(self, host: str, port: int, interval: float = None, timeout: float = None, players: bool = None, rules: bool = None):
+        """
+        Start polling a server (replaces the settings of an already polled one)
+        """
+        target = _Target(host, int(port), interval if interval is not None else self.interval, timeout if timeout is not None else self.timeout,
+            players if players is not None else self.players, rules if rules is not None else self.rules)
+        key = A2SPoller._Key(host, port)
+
+        with self._lock:
+            previous = self._targets.get(key)
+            self._targets[key] = target
+            self.statuses.setdefault(key, ServerStatus(host, int(port)))
+
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._Schedule, target, previous)
+
+    def RemoveTarget(self, host: str, port: int):
+        key = A2SPoller._Key(host, port)
+
+        with self._lock:
+            target = self._targets.pop(key, None)
+            self.statuses.pop(key, None)
+
+        if target is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._Cancel, target)
+
+    def GetStatus(self, host: str, port: int) -> ServerStatus:
+        with self._lock:
+            return self.statuses.get(A2SPoller._Key(host, port))
+
+    def Snapshot(self) -> map:
+        """
+        copy of the status table as plain dicts
+        """
+        with self._lock:
+            return {key: status.ToDict() for key, status in self.statuses.items()}
+
+    def _Schedule(self, target: _Target, previous: _Target = None):
+        if previous is not None:
+            self._Cancel(previous)
+
+        # a target added while Run() starts is scheduled by both, and one removed meanwhile not at all
+        with self._lock:
+            current = self._targets.get(A2SPoller._Key(target.host, target.port)) is target
+        if target.task is None and current:
+            target.task = self._loop.create_task(self._PollLoop(target))
+
+    def _Cancel(self, target: _Target):
+        # asyncio.wait_for can swallow a cancellation that lands as the answer arrives, the poll loop checks removed too
+        target.removed = True
+        if target.task is not None:
+            target.task.cancel()
+
+    #
+    #   QUERIES
+    #
+
+    async def Query(self, address: tuple, query: int, timeout: float):
+        """
+        Send a query to address and return its parsed answer, follows S2C_CHALLENGE answers
+        only one query per address can be in flight, the poll loop of a target sends them one after the other
+        """
+        loop = asyncio.get_running_loop()
+        challenge = None
+
+        # a server asks for a challenge at most once, a second challenge means it's misbehaving
+        for attempt in range(3):
+            waiter = loop.create_future()
+            self._protocol.waiters[address] = waiter
+            try:
+                self._protocol.transport.sendto(A2S.Request(query, challenge), address)
+                payload = await asyncio.wait_for(waiter, timeout)
+            finally:
+                if self._protocol.waiters.get(address) is waiter:
+                    del self._protocol.waiters[address]
+                # parts of an answer that did not come whole (lost packet) would wait forever
+                self._protocol.Forget(address)
+
+            if payload[:1] == bytes([A2S.S2C_CHALLENGE]) and len(payload) >= 5:
+                challenge = payload[1:5]
+                continue
+
+            if payload[:1] != bytes([A2S.answers[query]]):
+                raise ValueError("unexpected a2s answer " + payload[:1].hex())
+
+            return A2S.parsers[payload[0]](payload)
+
+        raise ValueError("too many a2s challenges")
+
+    async def Poll(self, target: _Target):
+        """
+        Query a target once and update its status
+        """
+        if target.address is None:
+            infos = await asyncio.get_running_loop().getaddrinfo(target.host, target.port, family = socket.AF_INET, type = socket.SOCK_DGRAM)
+            target.address = infos[0][4][:2]
+
+        start = time.monotonic()
+        info = await self.Query(target.address, A2S.A2S_INFO, target.timeout)
+        latency = time.monotonic() - start
+
+        players = await self.Query(target.address, A2S.A2S_PLAYER, target.timeout) if target.players else []
+        rules = await self.Query(target.address, A2S.A2S_RULES, target.timeout) if target.rules else {}
+
+        with self._lock:
+            status = self.statuses.get(A2SPoller._Key(target.host, target.port))
+            if status is None:
+                return
+            status.online, status.info, status.players, status.rules = True, info, players, rules
+            status.latency, status.lastUpdate, status.lastError, status.failures = latency, time.time(), "", 0
+
+    async def _PollLoop(self, target: _Target):
+        while not target.removed:
+            started = time.monotonic()
+            try:
+                await self.Poll(target)
+            except asyncio.CancelledError:
+                raise
+            except (asyncio.TimeoutError, OSError, ValueError, struct.error, IndexError) as e:
+                with self._lock:
+                    status = self.statuses.get(A2SPoller._Key(target.host, target.port))
+                    if status is not None:
+                        status.failures += 1
+                        status.lastError = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+                        if status.failures >= self.offlineAfter:
+                            status.online = False
+
+            await asyncio.sleep(max(0.0, target.interval - (time.monotonic() - started)))
+
+    #
+    #   EVENT LOOP
+    #
+
+    async def Run(self):
+        """
+        Poll every target until Stop(), on the running event loop
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+
+        transport, self._protocol = await self._loop.create_datagram_endpoint(_A2SProtocol, local_addr = ("0.0.0.0", 0), family = socket.AF_INET)
+        self._ready.set()
+        try:
+            with self._lock:
+                targets = list(self._targets.values())
+            for target in targets:
+                self._Schedule(target)
+
+            await self._stopped.wait()
+        finally:
+            with self._lock:
+                targets = list(self._targets.values())
+            for target in targets:
+                # still polled by a next Run()
+                if target.task is not None:
+                    target.task.cancel()
+                    target.task = None
+            transport.close()
+            self._loop = None
+
+    def Start(self):
+        """
+        Run the poller on its own event loop in a background thread
+        """
+        self._ready.clear()
+        self._thread = threading.Thread(target = asyncio.run, args = (self.Run(),), daemon = True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def Stop(self):
+        loop, stopped = self._loop, self._stopped
+        if loop is not None and stopped is not None:
+            loop.call_soon_threadsafe(stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout = 5)
+            self._thread = None
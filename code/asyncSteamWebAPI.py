@@ -0,0 +1,320 @@
+import asyncio
+from collections import deque
+import json
+import ssl
+import time
+
+from steamWebAPI import SteamWebAPI
+from connectionPool import PooledResponse
+from requestPolicy import RequestPolicy
+
+#
+#   ASYNC STEAM WEB API
+#
+
+class AsyncSteamWebAPI:
+    """
+    asyncio version of SteamWebAPI, for resolving many collections / items at once without threads
+    requests are built and parsed by SteamWebAPI so both clients return the same data,
+    only the transport differs (keep-alive HTTP/1.1 connections on the running event loop)
+    at most maxConcurrency requests are in flight, each attempt is cancelled after timeout seconds
+    retries and rate limiting follow policy (SteamWebAPI.request_policy by default)
+    requests are recorded in SteamWebAPI.metrics, connect times include the tls handshake
+    """
+
+    def __init__(self, maxConcurrency: int = 8, timeout: float = 10.0, idleTimeout: float = 30.0, policy: RequestPolicy = None):
+        self.maxConcurrency = maxConcurrency
+        self.timeout        = timeout
+        self.idleTimeout    = idleTimeout
+        self.policy         = policy if policy is not None else SteamWebAPI.request_policy
+
+        self._semaphore     = None
+        self._idle: dict    = {} # scheme://host -> list of (reader, writer, last used time)
+        self._sslContext    = ssl.create_default_context()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.Close()
+
+    async def Close(self):
+        """
+        Close every idle connection
+        """
+        idle = self._idle
+        self._idle = {}
+        for connections in idle.values():
+            for _, writer, _ in connections:
+                writer.close()
+        for connections in idle.values():
+            for _, writer, _ in connections:
+                try:
+                    await writer.wait_closed()
+                except (OSError, ssl.SSLError):
+                    pass
+
+    #
+    #   TRANSPORT
+    #
+
+    async def _Acquire(self, host: str) -> tuple:
+        idle = self._idle.get(SteamWebAPI.steam_api_scheme + "://" + host, [])
+        now = time.monotonic()
+
+        while idle:
+            reader, writer, lastUsed = idle.pop()
+            if now - lastUsed > self.idleTimeout or writer.is_closing() or reader.at_eof():
+                writer.close()
+                continue
+            return reader, writer, True
+
+        hostname, _, port = host.partition(":")
+
+        if SteamWebAPI.steam_api_scheme == "http":
+            reader, writer = await asyncio.open_connection(hostname, int(port or 80))
+        else:
+            reader, writer = await asyncio.open_connection(hostname, int(port or 443), ssl = self._sslContext, server_hostname = hostname)
+        return reader, writer, False
+
+    def _Release(self, host: str, reader, writer, reusable: bool):
+        if reusable:
+            self._idle.setdefault(SteamWebAPI.steam_api_scheme + "://" + host, []).append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+
+    @staticmethod
+    async def _ReadResponse(reader) -> tuple:
+        """
+        returns (status, headers, body, keepAlive, firstByteTime) of an HTTP/1.1 response
+        """
+        statusLine = await reader.readline()
+        if not statusLine:
+            raise ConnectionResetError("connection closed by server")
+        firstByteTime = time.monotonic()
+
+        version, status, _ = (statusLine.decode("latin-1").rstrip("\r\n") + " ").split(" ", 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        keepAlive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b";")[0].strip(), 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                body += await reader.readexactly(size)
+                await reader.readexactly(2)
+            body = bytes(body)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keepAlive = False
+
+        return int(status), headers, body, keepAlive, firstByteTime
+
+    async def _Request(self, host: str, method: str, url: str, body: bytes, headers: map) -> PooledResponse:
+        request = method + " " + url + " HTTP/1.1\r\nHost: " + host + "\r\nContent-Length: " + str(len(body)) + "\r\n"
+        for key, value in headers.items():
+            request += key + ": " + value + "\r\n"
+        request = request.encode("latin-1") + b"\r\n" + body
+
+        start = time.monotonic()
+
+        while True:
+            timings = {}
+            connectStart = time.monotonic()
+            reader, writer, reused = await self._Acquire(host)
+            if not reused:
+                timings["connect"] = time.monotonic() - connectStart
+
+            requestStart = time.monotonic()
+            try:
+                writer.write(request)
+                await writer.drain()
+                response = await self._ReadResponse(reader)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                self._Release(host, reader, writer, False)
+                if reused:
+                    # the server dropped a kept alive connection, try again on a fresh one
+                    continue
+                if isinstance(e, asyncio.IncompleteReadError):
+                    raise ConnectionResetError("incomplete response") from e
+                raise
+            except BaseException:
+                # includes cancellation and timeouts, the connection is in an unknown state
+                self._Release(host, reader, writer, False)
+                raise
+
+            status, responseHeaders, responseBody, keepAlive, firstByteTime = response
+            self._Release(host, reader, writer, keepAlive)
+
+            timings["ttfb"] = firstByteTime - requestStart
+            timings["total"] = time.monotonic() - start
+            return PooledResponse(status, "", responseHeaders, responseBody, timings)
+
+    async def SendRequest(self, url: str, data: map, method = "POST", verbose: bool = False) -> map:
+        """
+        Sends HTTP request with x-www-form-urlencoded format body
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.maxConcurrency)
+
+        body = SteamWebAPI.ParseData(data).encode("utf-8")
+        endpoint = SteamWebAPI.EndpointName(url)
+
+        async def Send() -> PooledResponse:
+            SteamWebAPI.metrics.Increment("steam_web_api_requests_total", {"endpoint":endpoint})
+            try:
+                async with self._semaphore:
+                    response = await asyncio.wait_for(self._Request(SteamWebAPI.steam_api_base_url, method, url, body, SteamWebAPI.request_headers), self.timeout)
+            except Exception as e:
+                SteamWebAPI.RecordError(endpoint, e)
+                raise
+            SteamWebAPI.RecordResponse(endpoint, response)
+            return response
+
+        response = await self.policy.RunAsync(Send)
+
+        try:
+            return json.loads(SteamWebAPI.DecodeBody(response))
+        except Exception as e:
+            SteamWebAPI.RecordError(endpoint, e)
+            raise
+
+    async def TestConnectivity(self) -> bool:
+        """
+        Test Connectivity to steam web api services
+        """
+        try:
+            await asyncio.wait_for(self._Request(SteamWebAPI.steam_api_base_url, "GET", "/", b"", {}), self.timeout)
+            return True
+        except Exception:
+            return False
+
+    #
+    #   STEAM WEB API CALLS
+    #
+
+    async def GetCollectionsDetails(self, collectioncount: int, publishedfileids: list, verbose: bool = False, raiseOnError = True) -> list:
+        """
+        async SteamWebAPI.GetCollectionsDetails
+        """
+        url, body = SteamWebAPI.BuildCollectionsDetailsRequest(collectioncount, publishedfileids)
+
+        rawData = await self.SendRequest(url, body, verbose = verbose)
+
+        return SteamWebAPI.ParseCollectionsDetails(rawData, publishedfileids, raiseOnError)
+
+    async def GetPublishedFileDetails(self, itemcount: int, publishedfileids: list, verbose: bool = False, raiseOnError = False) -> list:
+        """
+        async SteamWebAPI.GetPublishedFileDetails
+        """
+        url, body = SteamWebAPI.BuildPublishedFileDetailsRequest(itemcount, publishedfileids)
+
+        rawData = await self.SendRequest(url, body, verbose = verbose)
+
+        return SteamWebAPI.ParsePublishedFileDetails(rawData, publishedfileids, raiseOnError)
+
+    async def GetPublishedFileDetailsBatched(self, publishedfileids: list, chunkSize: int = None, retries: int = None, verbose: bool = False, raiseOnError = False) -> list:
+        """
+        async SteamWebAPI.GetPublishedFileDetailsBatched, chunks are bounded by maxConcurrency instead of a thread pool
+        """
+        if chunkSize is None: chunkSize = SteamWebAPI.published_file_details_chunk_size
+        if retries is None: retries = SteamWebAPI.chunk_retries
+
+        chunks = [publishedfileids[i:i + chunkSize] for i in range(0, len(publishedfileids), chunkSize)]
+
+        results: list = [None] * len(chunks)
+        pending: list = list(range(len(chunks)))
+        lastError = None
+
+        for attempt in range(retries + 1):
+            if len(pending) == 0:
+                break
+
+            chunkResults = await asyncio.gather(*[self.GetPublishedFileDetails(len(chunks[index]), chunks[index], verbose, raiseOnError) for index in pending], return_exceptions = True)
+
+            failed = []
+            for index, chunkResult in zip(pending, chunkResults):
+                if isinstance(chunkResult, SteamWebAPI.chunk_retryable_errors):
+                    lastError = chunkResult
+                    failed.append(index)
+                elif isinstance(chunkResult, BaseException):
+                    raise chunkResult
+                else:
+                    results[index] = chunkResult
+            pending = failed
+
+        if len(pending) != 0:
+            raise lastError
+
+        steamElementsList = []
+        for chunkResult in results:
+            steamElementsList.extend(chunkResult)
+
+        return steamElementsList
+
+    async def IterPublishedFileDetails(self, publishedfileids: list, chunkSize: int = None, retries: int = None, verbose: bool = False, raiseOnError = False):
+        """
+        async SteamWebAPI.IterPublishedFileDetails, at most maxConcurrency chunks are in flight or waiting to be consumed
+        """
+        if chunkSize is None: chunkSize = SteamWebAPI.published_file_details_chunk_size
+        if retries is None: retries = SteamWebAPI.chunk_retries
+
+        inFlight = deque()
+        nextChunk: int = 0
+
+        try:
+            while len(inFlight) != 0 or nextChunk < len(publishedfileids):
+                while nextChunk < len(publishedfileids) and len(inFlight) < self.maxConcurrency:
+                    inFlight.append(asyncio.ensure_future(self._GetPublishedFileDetailsChunk(publishedfileids[nextChunk:nextChunk + chunkSize], retries, verbose, raiseOnError)))
+                    nextChunk += chunkSize
+
+                for element in await inFlight.popleft():
+                    yield element
+        finally:
+            for task in inFlight:
+                task.cancel()
+
+    async def _GetPublishedFileDetailsChunk(self, publishedfileids: list, retries: int, verbose: bool = False, raiseOnError = False) -> list:
+        for attempt in range(retries + 1):
+            try:
+                return await self.GetPublishedFileDetails(len(publishedfileids), publishedfileids, verbose, raiseOnError)
+            except SteamWebAPI.chunk_retryable_errors:
+                if attempt == retries:
+                    raise
+
+    async def IterMapsFromCollectionsList(self, collections: list):
+        """
+        async SteamWebAPI.IterMapsFromCollectionsList
+        """
+        mapIDs = SteamWebAPI.GetMapIdsFromCollectionsList(collections)
+
+        async for file in self.IterPublishedFileDetails(mapIDs):
+            if(file.fileType != "Map"):
+                continue
+
+            yield file.ToCSMap()
+
+    async def GetMapsFromCollectionsList(self, collections: list) -> list:
+        """
+        async SteamWebAPI.GetMapsFromCollectionsList
+        """
+        mapIDs = SteamWebAPI.GetMapIdsFromCollectionsList(collections)
+
+        if (mapIDs == []):
+            return []
+
+        return SteamWebAPI.GetMapsFromFileElements(await self.GetPublishedFileDetailsBatched(mapIDs))
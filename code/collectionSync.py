@@ -0,0 +1,92 @@
+from steamWebAPI import SteamWebAPI
+from workshopCache import WorkshopCache
+from dataStructs import CollectionChangeSet
+
+#
+#   COLLECTION SYNC
+#
+
+class CollectionSync:
+    """
+    Incremental refresh of workshop collections, the last known snapshot of a collection
+    (its children and their time_updated) is the one stored in cache
+
+    a sync sends the collection id in the same GetPublishedFileDetails request as the children due for a check:
+     - GetCollectionDetails is only sent again when the collection time_updated moved
+     - details are only fetched for added children and for at most checkBudget known children,
+       the ones checked the longest time ago (their cache entry expired) go first
+    steam does not give the children time_updated in GetCollectionDetails, so updates of known children
+    are found by rotating through them, every child is checked at least once per cache file ttl
+    as long as checkBudget * syncs per ttl covers the collection size
+
+    usage:
+        changes = CollectionSync(cache).Sync(3513758895)
+    """
+
+    check_budget: int = 100
+
+    def __init__(self, cache: WorkshopCache = None, checkBudget: int = None):
+        if cache is None: cache = WorkshopCache()
+        if checkBudget is None: checkBudget = CollectionSync.check_budget
+
+        self.cache          = cache
+        self.checkBudget    = checkBudget
+
+    def Sync(self, collectionId: int, verbose: bool = False) -> CollectionChangeSet:
+        """
+        Refresh a collection and return what changed since its last sync
+        the first sync of a collection reports every child as added
+        nothing is stored when a request fails, the next sync starts from the same snapshot
+        """
+        collectionId = int(collectionId)
+
+        entry = self.cache.GetCollection(collectionId)
+        knownIds = [int(id) for id in entry[0].mapIds] if entry is not None else []
+        states = self.cache.GetFileStates(knownIds)
+
+        # children whose details are missing are due first, then expired ones from the oldest check
+        due = [id for id in knownIds if id not in states]
+        due += sorted([id for id in knownIds if id in states and not states[id][2]], key = lambda id: states[id][1])
+        due = due[:self.checkBudget]
+
+        elementsById = {int(element.publishedfileid): element for element in SteamWebAPI.GetPublishedFileDetailsBatched([collectionId] + due, verbose = verbose)}
+        collectionElement = elementsById.pop(collectionId, None)
+        timeUpdated = collectionElement.timeUpdated if collectionElement is not None else 0
+
+        changed: bool = entry is None or timeUpdated == 0 or timeUpdated != entry[1]
+        if changed:
+            collection = SteamWebAPI.GetCollectionsDetails(1, [collectionId], verbose)[0]
+        else:
+            collection = entry[0]
+
+        currentIds = [int(id) for id in collection.mapIds]
+        current = set(currentIds)
+        known = set(knownIds)
+
+        # known children without cached details are reported as added, whoever reads the change set never got them
+        addedIds = [id for id in currentIds if id not in known or id not in states]
+        removedIds = [id for id in knownIds if id not in current]
+
+        toFetch = [id for id in addedIds if id not in elementsById]
+        if len(toFetch) != 0:
+            for element in SteamWebAPI.GetPublishedFileDetailsBatched(toFetch, verbose = verbose):
+                elementsById[int(element.publishedfileid)] = element
+
+        updated = []
+        for id in due:
+            if id in current and id in states and id in elementsById and elementsById[id].timeUpdated != states[id][0]:
+                updated.append(elementsById[id])
+
+        self.cache.PutFileElements(list(elementsById.values()))
+        if changed:
+            self.cache.PutCollection(collection, timeUpdated)
+        else:
+            self.cache.Touch("collections", [collectionId])
+
+        return CollectionChangeSet(collectionId, [elementsById[id] for id in addedIds if id in elementsById], removedIds, updated, len(due))
+
+    def SyncAll(self, collectionIds: list, verbose: bool = False) -> list:
+        """
+        Sync every collection, returns their change sets in the same order
+        """
+        return [self.Sync(collectionId, verbose) for collectionId in collectionIds]
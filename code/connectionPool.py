@@ -0,0 +1,221 @@
+from http import client
+import threading
+import time
+
+#
+#   CONNECTION POOL
+#
+
+class PooledResponse:
+    """
+    Fully read http response, the connection it came from is already back in the pool
+    """
+
+    def __init__(self, status: int, reason: str, headers: client.HTTPMessage, body: bytes, timings: map = None):
+        self.status     = status
+        self.reason     = reason
+        self.headers    = headers
+        self.body       = body
+
+        # seconds spent in each phase: connect / tls (new connections only), ttfb (time to first byte) and total
+        self.timings    = timings if timings is not None else {}
+
+
+class _TimedHTTPConnection(client.HTTPConnection):
+    """
+    HTTPConnection recording how long connecting took
+    """
+    connectTime: float = None
+    tlsTime: float = None
+
+    def connect(self):
+        start = time.monotonic()
+        super().connect()
+        self.connectTime = time.monotonic() - start
+
+
+class _TimedHTTPSConnection(client.HTTPSConnection):
+    """
+    HTTPSConnection recording the tcp connect and the tls handshake separately
+    """
+    connectTime: float = None
+    tlsTime: float = None
+
+    def connect(self):
+        # same as HTTPSConnection.connect, split in two timed steps
+        start = time.monotonic()
+        client.HTTPConnection.connect(self)
+        self.connectTime = time.monotonic() - start
+
+        start = time.monotonic()
+        self.sock = self._context.wrap_socket(self.sock, server_hostname = self._tunnel_host if self._tunnel_host else self.host)
+        self.tlsTime = time.monotonic() - start
+
+
+class HTTPSConnectionPool:
+    """
+    Thread safe pool of keep-alive https connections, keyed by scheme and host
+    (plain http is only meant for local stand-ins of the steam web api)
+    idle connections older than idleTimeout are closed instead of being reused
+    at most maxConnectionsPerHost connections (idle + in use) are opened for a host,
+    callers wait for a free connection once that cap is reached
+    """
+
+    # errors raised when the server silently dropped a kept alive connection
+    staleConnectionErrors: tuple = (client.RemoteDisconnected, client.CannotSendRequest, client.BadStatusLine, BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+
+    def __init__(self, maxConnectionsPerHost: int = 4, idleTimeout: float = 30.0, connectTimeout: float = 10.0, readTimeout: float = 30.0):
+        self.maxConnectionsPerHost  = maxConnectionsPerHost
+        self.idleTimeout            = idleTimeout
+        self.connectTimeout         = connectTimeout
+        self.readTimeout            = readTimeout
+
+        self._lock          = threading.Condition()
+        self._idle: dict    = {} # scheme://host -> list of (connection, last used time)
+        self._opened: dict  = {} # scheme://host -> number of connections idle or in use
+        self._closed        = False
+
+    def _NewConnection(self, scheme: str, host: str) -> client.HTTPConnection:
+        if scheme == "http":
+            return _TimedHTTPConnection(host, timeout = self.connectTimeout)
+        return _TimedHTTPSConnection(host, timeout = self.connectTimeout)
+
+    @staticmethod
+    def _Key(scheme: str, host: str) -> str:
+        return scheme + "://" + host
+
+    def OpenedConnections(self, host: str, scheme: str = "https") -> int:
+        """
+        number of connections idle or in use for host
+        """
+        with self._lock:
+            return self._opened.get(HTTPSConnectionPool._Key(scheme, host), 0)
+
+    def Acquire(self, host: str, scheme: str = "https") -> tuple:
+        """
+        Get a connection for host, returns (connection, reused)
+        """
+        key = HTTPSConnectionPool._Key(scheme, host)
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+
+                self._EvictIdleLocked(key)
+
+                idle = self._idle.get(key)
+                if idle:
+                    connection, _ = idle.pop()
+                    return connection, True
+
+                if self._opened.get(key, 0) < self.maxConnectionsPerHost:
+                    self._opened[key] = self._opened.get(key, 0) + 1
+                    break
+
+                self._lock.wait()
+
+        try:
+            return self._NewConnection(scheme, host), False
+        except:
+            self._Forget(key)
+            raise
+
+    def Release(self, host: str, connection: client.HTTPConnection, reusable: bool = True, scheme: str = "https"):
+        """
+        Give a connection back to the pool, closes it if it can't be kept alive
+        """
+        key = HTTPSConnectionPool._Key(scheme, host)
+
+        with self._lock:
+            if reusable and not self._closed:
+                self._idle.setdefault(key, []).append((connection, time.monotonic()))
+                self._lock.notify()
+                return
+
+        connection.close()
+        self._Forget(key)
+
+    def _Forget(self, key: str):
+        with self._lock:
+            self._opened[key] = max(0, self._opened.get(key, 0) - 1)
+            self._lock.notify()
+
+    def _EvictIdleLocked(self, key: str):
+        idle = self._idle.get(key)
+        if not idle:
+            return
+
+        now = time.monotonic()
+        keep = []
+        for connection, lastUsed in idle:
+            if now - lastUsed > self.idleTimeout:
+                connection.close()
+                self._opened[key] = max(0, self._opened.get(key, 0) - 1)
+                continue
+            keep.append((connection, lastUsed))
+        self._idle[key] = keep
+
+    def EvictIdle(self):
+        """
+        Close every idle connection that went over idleTimeout
+        """
+        with self._lock:
+            for key in list(self._idle.keys()):
+                self._EvictIdleLocked(key)
+            self._lock.notify_all()
+
+    def Request(self, host: str, method: str, url: str, body = None, headers: map = {}, connectTimeout: float = None, readTimeout: float = None, scheme: str = "https") -> PooledResponse:
+        """
+        Send a request on a pooled connection and read the whole response
+        a request that fails on a reused connection is sent once more on a fresh one
+        """
+        if connectTimeout is None: connectTimeout = self.connectTimeout
+        if readTimeout is None: readTimeout = self.readTimeout
+
+        start = time.monotonic()
+        connection, reused = self.Acquire(host, scheme)
+
+        while True:
+            timings = {}
+            try:
+                if connection.sock is None:
+                    connection.timeout = connectTimeout
+                    connection.connect()
+                    if getattr(connection, "connectTime", None) is not None: timings["connect"] = connection.connectTime
+                    if getattr(connection, "tlsTime", None) is not None: timings["tls"] = connection.tlsTime
+                connection.sock.settimeout(readTimeout)
+
+                requestStart = time.monotonic()
+                connection.request(method, url, body = body, headers = headers)
+                response = connection.getresponse()
+                timings["ttfb"] = time.monotonic() - requestStart
+                data = response.read()
+            except self.staleConnectionErrors:
+                self.Release(host, connection, False, scheme)
+                if not reused:
+                    raise
+                connection, reused = self.Acquire(host, scheme)
+                continue
+            except:
+                self.Release(host, connection, False, scheme)
+                raise
+
+            self.Release(host, connection, not response.will_close, scheme)
+
+            timings["total"] = time.monotonic() - start
+            return PooledResponse(response.status, response.reason, response.headers, data, timings)
+
+    def Close(self):
+        """
+        Close every idle connection and refuse new requests
+        connections currently in use are closed when they are released
+        """
+        with self._lock:
+            self._closed = True
+            for idle in self._idle.values():
+                for connection, _ in idle:
+                    connection.close()
+            self._idle = {}
+            self._opened = {}
+            self._lock.notify_all()
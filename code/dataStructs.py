@@ -1,43 +1,81 @@
+import sys
+import zlib
+
+from tools import Tools
 
 #
 #   DATA STRUCTURES
 #
+# records are slotted (no per instance __dict__) since catalogs hold tens of thousands of them,
+# tags and creators are interned strings and long descriptions are kept compressed
+# or loaded on first access (description can be given as a callable returning it)
+#
+
+# descriptions at least this long are stored zlib compressed
+description_compress_size: int = 256
+
+def _PackDescription(description):
+    if type(description) == str and len(description) >= description_compress_size:
+        return zlib.compress(description.encode("utf-8"))
+    return description
+
+def _UnpackDescription(packed) -> str:
+    if type(packed) == bytes:
+        return zlib.decompress(packed).decode("utf-8")
+    return packed
+
 class SteamCollection:
     """
     Steam Collection Meta Implementation
     """
 
-    id: int = 0
-    url: str = ""
-    name: str = ""
-
-    mapIds: list = []
+    __slots__ = ("id", "url", "name", "mapIds", "subCollectionIds")
 
-    def __init__(self, id: int, url: str, name: str, mapIds: list):
+    def __init__(self, id: int, url: str, name: str, mapIds: list, subCollectionIds: list = None):
         self.id                 = id
         self.url                = url
         self.name               = name
 
         self.mapIds             = mapIds
+        self.subCollectionIds   = subCollectionIds if subCollectionIds is not None else []
 
     def ToDict(self) -> map:
-        return {"id":self.id, "url":self.url, "name":self.name, "mapIds":self.mapIds}
+        return {"id":self.id, "url":self.url, "name":self.name, "mapIds":self.mapIds, "subCollectionIds":self.subCollectionIds}
 
 class CSMap:
     """
     Counter Strike 2 map
     """
-    publishedfileid: int    = 0
-    creator: int            = 0
-    title: str              = ""
-    description: str        = ""
-    tags: list              = []
-    def __init__(self, publishedfileid: int = 0, creator: int = 0, title: str = "", description: str = "", tags: list = []):
+
+    __slots__ = ("publishedfileid", "creator", "title", "_description", "tagNames")
+
+    def __init__(self, publishedfileid: int = 0, creator: int = 0, title: str = "", description: str = "", tags: list = None):
         self.publishedfileid    = publishedfileid
-        self.creator            = creator
+        self.creator            = sys.intern(creator) if type(creator) == str else creator
         self.title              = title
         self.description        = description
-        self.tags               = tags
+        self.tags               = tags if tags is not None else []
+
+    @property
+    def description(self) -> str:
+        if callable(self._description):
+            self._description = _PackDescription(self._description())
+        return _UnpackDescription(self._description)
+
+    @description.setter
+    def description(self, description):
+        self._description = _PackDescription(description)
+
+    @property
+    def tags(self) -> list:
+        """
+        tags in the steam web api format ([{"tag": "Map"}, ...])
+        """
+        return [{"tag":tag} for tag in self.tagNames]
+
+    @tags.setter
+    def tags(self, tags: list):
+        self.tagNames = Tools.InternTags(tags)
 
     def ToDict(self) -> map:
         return {"publishedfileid":self.publishedfileid, "creator":self.creator, "title":self.title, "description":self.description, "tags":self.tags }
@@ -47,24 +85,52 @@ class SteamFileElement:
     a common wrapper for steam file elements (including collections, maps, items etc.)
     it's the response of GetPublishedFileDetails
     """
-    publishedfileid: int    = 0
-    creator: int            = 0
-    title: str              = ""
-    description: str        = ""
-    tags: list              = []
-    fileType: str           = ""
-
-    def __init__(self, publishedfileid: int = 0, creator: int = 0, title: str = "", description: str = "", tags: list = [], fileType: str = "Unknown"):
+
+    __slots__ = ("publishedfileid", "creator", "title", "_description", "tagNames", "fileType", "timeUpdated", "fileSize", "appId")
+
+    def __init__(self, publishedfileid: int = 0, creator: int = 0, title: str = "", description: str = "", tags: list = None, fileType: str = "Unknown", timeUpdated: int = 0, fileSize: int = 0, appId: int = 0):
         self.publishedfileid    = publishedfileid
-        self.creator            = creator
+        self.creator            = sys.intern(creator) if type(creator) == str else creator
         self.title              = title
         self.description        = description
-        self.tags               = tags
-        self.fileType               = fileType
+        self.tags               = tags if tags is not None else []
+        self.fileType           = sys.intern(fileType)
+        self.timeUpdated        = timeUpdated
+        self.fileSize           = fileSize
+        self.appId              = appId
+
+    description = CSMap.description
+    tags = CSMap.tags
 
     def ToDict(self) -> map:
         return {"publishedfileid":self.publishedfileid, "creator":self.creator, "title":self.title, "description":self.description, "tags":self.tags , "fileType":self.fileType }
 
     def ToCSMap(self) -> CSMap:
-        _map = CSMap(self.publishedfileid, self.creator, self.title, self.description, self.tags)
+        _map = CSMap(self.publishedfileid, self.creator, self.title, None, self.tagNames)
+        # hand over the packed (or not yet loaded) description as is
+        _map._description = self._description
         return _map
+
+class CollectionChangeSet:
+    """
+    What changed in a collection since its last sync
+    added / updated are SteamFileElement, removed are ids
+    """
+
+    __slots__ = ("collectionId", "added", "removed", "updated", "checked")
+
+    def __init__(self, collectionId: int, added: list = None, removed: list = None, updated: list = None, checked: int = 0):
+        self.collectionId   = collectionId
+
+        self.added          = added if added is not None else []
+        self.removed        = removed if removed is not None else []
+        self.updated        = updated if updated is not None else []
+
+        # number of known children whose time_updated was checked during the sync
+        self.checked        = checked
+
+    def IsEmpty(self) -> bool:
+        return len(self.added) == 0 and len(self.removed) == 0 and len(self.updated) == 0
+
+    def ToDict(self) -> map:
+        return {"collectionId":self.collectionId, "added":[element.ToDict() for element in self.added], "removed":self.removed, "updated":[element.ToDict() for element in self.updated], "checked":self.checked}
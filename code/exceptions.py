@@ -21,3 +21,43 @@ class SteamFileElementIsAnIncompatibleMap(Exception):
 class SteamFileElementIsNotACS2Item(Exception):
     "Raised when the remote file is not made for cs2/csgo (appid != 730)"
     pass
+
+class SteamWebAPIRequestFailed(Exception):
+    "Raised when the steam web api keeps answering with an error status (429 / 5xx) after every retry"
+    def __init__(self, status: int, retryAfter: float = None):
+        super().__init__("steam web api answered with status " + str(status))
+        self.status = status
+        self.retryAfter = retryAfter
+
+class WorkshopSnapshotFormatError(Exception):
+    "Raised when a workshop snapshot file is not a snapshot, is corrupted or was written by another format version"
+    pass
+
+class WorkshopDownloadFailed(Exception):
+    "Raised when the downloader could not download a workshop item"
+    def __init__(self, publishedfileid, message: str = ""):
+        super().__init__("workshop item " + str(publishedfileid) + " could not be downloaded: " + message)
+        self.publishedfileid = publishedfileid
+
+class RCONConnectionError(Exception):
+    "Raised when the rcon connection to a server can't be opened or was lost"
+    pass
+
+class RCONAuthenticationFailed(Exception):
+    "Raised when the server refuses the rcon password"
+    pass
+
+class ServerInstanceStateError(Exception):
+    "Raised when a server instance can't do an action in its current state (starting a running instance, ...)"
+    def __init__(self, name: str, state: str, action: str):
+        super().__init__("server instance " + name + " can't " + action + " while " + state)
+        self.name = name
+        self.state = state
+
+class ServerPortUnavailable(Exception):
+    "Raised when no free port is left for a server instance, or the port it asks for is already taken"
+    pass
+
+class CoreAllocationFailed(Exception):
+    "Raised when there are not enough cpu cores left for the performance profile of a server instance"
+    pass
@@ -0,0 +1,91 @@
+from collections import deque
+from itertools import count
+import threading
+
+#
+#   LOG BUFFER
+#
+
+class LogBuffer:
+    """
+    Bounded queue between the threads reading server output and the log panel that renders it a few times per second
+    Push() only holds a short lock (numbering and queueing a line), once maxPending lines wait the oldest ones are dropped
+    Drain() (one consumer) returns what to render: at most maxBatch lines, repeated lines coalesced into one
+    and a note where lines were dropped
+
+    usage:
+        buffer.Push(line) # reader threads
+        lines = buffer.Drain() # ui thread, every frame
+    """
+
+    def __init__(self, maxPending: int = 20000, maxBatch: int = 5000):
+        self.maxPending     = maxPending
+        self.maxBatch       = maxBatch  # older lines of a bigger backlog would be trimmed from the panel right away
+
+        self.rendered: int  = 0         # lines handed out by Drain(), coalesced ones included
+        self.dropped: int   = 0         # lines pushed out of the queue or skipped before being rendered
+        self.coalesced: int = 0         # repeated lines folded into the line before them
+
+        self._lines = deque(maxlen = maxPending)    # (sequence, line), in sequence order
+        self._sequence = count()
+        self._pushLock = threading.Lock()           # a line is queued in the order of its sequence
+        self._highest = -1                          # highest sequence drained
+        self._drained = 0                           # lines taken out of the queue
+        self._queueDropped = 0                      # lines found missing from the queue
+
+    def Push(self, line: str):
+        with self._pushLock:
+            self._lines.append((next(self._sequence), line))
+
+    def Pending(self) -> int:
+        return len(self._lines)
+
+    def Drain(self) -> list:
+        """
+        Take every waiting line, returns the lines to render
+        """
+        # only what is there now, readers keep pushing meanwhile (and can push lines out of a full queue)
+        batch = []
+        for _ in range(len(self._lines)):
+            try:
+                batch.append(self._lines.popleft())
+            except IndexError:
+                break
+
+        if len(batch) == 0:
+            return []
+
+        # sequences up to the highest drained one that were never drained were pushed out of the full queue
+        self._drained += len(batch)
+        self._highest = max(self._highest, max(sequence for sequence, _ in batch))
+        dropped = max(0, self._highest + 1 - self._drained - self._queueDropped)
+        self._queueDropped += dropped
+
+        if len(batch) > self.maxBatch:
+            dropped += len(batch) - self.maxBatch
+            batch = batch[-self.maxBatch:]
+
+        lines = []
+        if dropped != 0:
+            self.dropped += dropped
+            lines.append("... " + str(dropped) + " lines dropped, the server writes faster than the log panel renders ...")
+
+        previous, repeats = None, 0
+        for _, line in batch:
+            if line == previous:
+                repeats += 1
+                continue
+            if repeats != 0:
+                lines.append("    (last line repeated " + str(repeats) + " more times)")
+                self.coalesced += repeats
+            lines.append(line)
+            previous, repeats = line, 0
+        if repeats != 0:
+            lines.append("    (last line repeated " + str(repeats) + " more times)")
+            self.coalesced += repeats
+
+        self.rendered += len(batch)
+        return lines
+
+    def Stats(self) -> map:
+        return {"pending":len(self._lines), "rendered":self.rendered, "dropped":self.dropped, "coalesced":self.coalesced}
@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk, colorchooser
-import subprocess
 import os
 import threading
 import socket
@@ -9,6 +8,14 @@ import re
 import shlex
 import json
 
+from rconClient import RCONClient
+from serverManager import ServerManager, ServerInstance, ServerInstanceConfig
+from performanceProfile import PerformanceProfile
+from logBuffer import LogBuffer
+from serverLogWriter import ServerLogWriter
+from serverLogSearch import LogSearch
+from exceptions import RCONAuthenticationFailed, RCONConnectionError, ServerInstanceStateError
+
 class ToolTip:
     """
     A simple tooltip class for Tkinter widgets.
@@ -51,12 +58,31 @@ class CS2ServerLauncher:
     def __init__(self, master):
         self.master = master
         master.title("CS2 Dedicated Server Launcher")
-        master.geometry("850x730")
+        master.geometry("850x770")
         master.resizable(False, False)
 
-        self.server_process = None
-        self.output_log_thread = None
-        self.stop_log_thread = threading.Event()
+        # Log lines wait in a bounded buffer, the log panel renders them in batches at log_refresh_ms
+        self.log_buffer = LogBuffer()
+        self.log_max_lines = 5000 # Older lines are trimmed from the log panel
+        self.log_refresh_ms = 50
+        self.log_line_count = 0
+
+        # Every server instance is run by the manager, the window is a view over the selected one
+        # Server output is also kept on disk in rotating, compressed files (one folder per instance)
+        self.server_manager = ServerManager(
+            logDirectory=ServerLogWriter.default_directory,
+            onOutput=lambda name, line: self.log_buffer.Push(self._instance_log_line(name, line)),
+            onEvent=lambda name, event, message: self.master.after(0, self._on_instance_event, name, event, message)
+        )
+        self.instance_name = tk.StringVar(value="default")
+
+        # Past server output is searched in the log files, matching lines are streamed into the log panel
+        self.search_text = tk.StringVar()
+        self.search_regex = tk.BooleanVar(value=False)
+        self.search_periods = {"Last hour": 3600, "Last day": 86400, "Last 7 days": 7 * 86400, "Last 30 days": 30 * 86400, "All": None}
+        self.search_period = tk.StringVar(value="Last 7 days")
+        self.search_max_results = 1000
+        self.search_generation = 0 # A new search stops the running one
 
         # --- Theme Variables and Colors ---
         self.default_light_theme_colors = {
@@ -132,6 +158,7 @@ class CS2ServerLauncher:
 
         self.selected_game_mode_display = tk.StringVar(value="Casual")
         self.additional_args = tk.StringVar(value="-usercon -dedicated")
+        self.performance_profile = tk.StringVar(value="Default")
 
         # --- Comprehensive CS2 Map List ---
         self.cs2_maps = {
@@ -171,6 +198,8 @@ class CS2ServerLauncher:
         self.auto_detect_cs2_path()
         # Apply the initial preset theme
         self.apply_preset_theme() # Will use self.current_theme_name.get()
+        self._refresh_server_status()
+        self._flush_log()
 
     def add_tooltip(self, widget, text):
         """Helper method to add a tooltip to a widget."""
@@ -204,6 +233,18 @@ class CS2ServerLauncher:
         self._update_theme_combobox_values() # Initial population of combobox values after all themes are defined
         self.theme_combobox.set(self.current_theme_name.get()) # Set initial display value
 
+        # Instance selection, typing a new name creates a new instance on start
+        self.label_instance = tk.Label(top_frame, text="Instance:")
+        self.label_instance.pack(side="left")
+        self.instance_combobox = ttk.Combobox(top_frame, textvariable=self.instance_name, values=["default"], width=15)
+        self.instance_combobox.pack(side="left", padx=5)
+        self.instance_combobox.bind("<<ComboboxSelected>>", self.select_instance)
+        self.add_tooltip(self.instance_combobox, "Server instance shown in this window. Type a new name to run another server side by side.")
+
+        self.server_status_label = tk.Label(top_frame, text="Server: not running", anchor="w")
+        self.server_status_label.pack(side="left")
+        self.add_tooltip(self.server_status_label, "Live status of the server, from A2S queries on its game port.")
+
 
         # Input Frame
         input_frame = tk.LabelFrame(self.master, text="Server Parameters", padx=10, pady=10)
@@ -296,6 +337,18 @@ class CS2ServerLauncher:
         self.additional_args_entry.grid(row=8, column=1, pady=2, padx=5, sticky="ew")
         self.add_tooltip(self.additional_args_entry, "Add any extra command-line arguments for the server (e.g., -tickrate 128, +sv_cheats 1).")
 
+        self.label_performance_profile = tk.Label(input_frame, text="Performance Profile:")
+        self.label_performance_profile.grid(row=9, column=0, sticky="w", pady=2)
+        self.performance_profile_combobox = ttk.Combobox(
+            input_frame,
+            textvariable=self.performance_profile,
+            values=list(PerformanceProfile.presets.keys()),
+            state="readonly",
+            width=48
+        )
+        self.performance_profile_combobox.grid(row=9, column=1, pady=2, padx=5, sticky="ew")
+        self.add_tooltip(self.performance_profile_combobox, "CPU cores and priority of the server (Linux). Pinned servers get cores no other instance uses while there are free ones.")
+
         # Command Buttons
         button_frame = tk.Frame(self.master, padx=10, pady=5)
         button_frame.pack(pady=5)
@@ -335,6 +388,32 @@ class CS2ServerLauncher:
         self.send_command_button.pack(side="left")
         self.add_tooltip(self.send_command_button, "Send the entered command to the server.")
 
+        # Log Search
+        search_frame = tk.Frame(self.master, padx=10, pady=5)
+        search_frame.pack(padx=10, pady=(0, 10), fill="x")
+        self.search_frame = search_frame # Store for theming
+
+        self.search_label = tk.Label(search_frame, text="Search Logs:")
+        self.search_label.pack(side="left", padx=(0, 5))
+        self.add_tooltip(self.search_label, "Search the saved output of every server instance (e.g., a SteamID or a player name).")
+
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_text, width=40)
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
+        self.search_entry.bind("<Return>", lambda event: self.search_logs())
+        self.add_tooltip(self.search_entry, "Text to search for. Plain text matches whole words, so searching a SteamID only reads the log blocks that hold it.")
+
+        self.search_period_combobox = ttk.Combobox(search_frame, textvariable=self.search_period, values=list(self.search_periods.keys()), state="readonly", width=12)
+        self.search_period_combobox.pack(side="left", padx=(0, 5))
+        self.add_tooltip(self.search_period_combobox, "Only search the lines written in this period.")
+
+        self.search_regex_check = tk.Checkbutton(search_frame, text="Regex", variable=self.search_regex)
+        self.search_regex_check.pack(side="left", padx=(0, 5))
+        self.add_tooltip(self.search_regex_check, "Treat the search text as a regular expression (case insensitive).")
+
+        self.search_button = tk.Button(search_frame, text="Search", command=self.search_logs)
+        self.search_button.pack(side="left")
+        self.add_tooltip(self.search_button, "Search the server logs, matching lines are shown in the log below.")
+
 
         # Log Frame
         log_frame = tk.LabelFrame(self.master, text="Server Output Log", padx=10, pady=10)
@@ -374,14 +453,15 @@ class CS2ServerLauncher:
         self.master.update_idletasks() # Force update after changing master background
 
         # Update frames and labels
-        for frame in [self.top_frame, self.input_frame, self.button_frame, self.log_frame, self.command_frame]:
+        for frame in [self.top_frame, self.input_frame, self.button_frame, self.log_frame, self.command_frame, self.search_frame]:
             frame.config(bg=theme["frame_bg"])
             self.master.update_idletasks() # Update after each frame, if many frames
 
         for label in [
             self.label_exe_path, self.label_ip, self.label_map, self.label_max_players,
             self.label_server_port, self.label_server_password, self.label_rcon_password,
-            self.label_game_mode, self.label_additional_args, self.command_label
+            self.label_game_mode, self.label_additional_args, self.label_performance_profile, self.command_label,
+            self.label_instance, self.server_status_label, self.search_label
         ]:
             label.config(bg=theme["frame_bg"], fg=theme["frame_fg"])
 
@@ -389,7 +469,7 @@ class CS2ServerLauncher:
         for entry in [
             self.exe_path_entry, self.ip_entry, self.max_players_entry,
             self.server_port_entry, self.server_password_entry, self.rcon_password_entry,
-            self.additional_args_entry, self.command_entry
+            self.additional_args_entry, self.command_entry, self.search_entry
         ]:
             entry.config(bg=theme["entry_bg"], fg=theme["entry_fg"], insertbackground=theme["entry_fg"])
 
@@ -423,10 +503,12 @@ class CS2ServerLauncher:
         for button in [
             self.credits_button, self.browse_button,
             self.auto_detect_button, self.detect_ip_button, self.settings_button,
-            self.save_config_button, self.load_config_button, self.send_command_button
+            self.save_config_button, self.load_config_button, self.send_command_button, self.search_button
         ]:
             button.config(bg=theme["button_bg"], fg=theme["button_fg"],
                           activebackground=theme["active_button_bg"], activeforeground=theme["active_button_fg"])
+        self.search_regex_check.config(bg=theme["frame_bg"], fg=theme["frame_fg"], activebackground=theme["frame_bg"],
+                                       activeforeground=theme["frame_fg"], selectcolor=theme["entry_bg"])
         
         # Special buttons (Start/Stop)
         self.start_button.config(bg=theme["start_button_bg"], fg="white",
@@ -756,38 +838,33 @@ class CS2ServerLauncher:
             self.append_to_log(f"Error detecting IP address: {e}")
 
     def append_to_log(self, message):
-        self.log_text.config(state="normal")
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state="disabled")
-
-    def read_server_output(self):
-        if self.server_process:
-            while not self.stop_log_thread.is_set():
-                # Readline with timeout for cleaner shutdown
-                try:
-                    line = self.server_process.stdout.readline()
-                except ValueError: # stdin/stdout closed
-                    break
-                
-                if not line:
-                    if self.server_process.poll() is not None: # Process has terminated
-                        break
-                    time.sleep(0.1) # Short delay to prevent busy-waiting
-                    continue
-                try:
-                    decoded_line = line.decode('utf-8', errors='replace').strip()
-                    self.master.after(0, self.append_to_log, decoded_line)
-                except Exception as e:
-                    self.master.after(0, self.append_to_log, f"Error decoding line from server output: {e}")
-            self.master.after(0, self.append_to_log, "Server output stream closed.")
-        else:
-            self.master.after(0, self.append_to_log, "No server process to read from.")
-
+        # Rendered with the next batch, in order with the server output (any thread)
+        self.log_buffer.Push(message)
+
+    def _flush_log(self):
+        """Renders the buffered log lines in one insert and trims the panel to log_max_lines, every log_refresh_ms."""
+        lines = self.log_buffer.Drain()
+        if lines:
+            self.log_text.config(state="normal")
+            text = "\n".join(lines) + "\n"
+            self.log_text.insert(tk.END, text)
+            self.log_line_count += text.count("\n") # Messages can hold several lines
+            if self.log_line_count > self.log_max_lines:
+                self.log_text.delete("1.0", f"{self.log_line_count - self.log_max_lines + 1}.0")
+                self.log_line_count = self.log_max_lines
+            self.log_text.see(tk.END)
+            self.log_text.config(state="disabled")
+
+        self.master.after(self.log_refresh_ms, self._flush_log)
+
+    def _selected_instance(self):
+        """The manager instance shown in the window, None if it was never started."""
+        return self.server_manager.GetInstance(self.instance_name.get().strip() or "default")
 
     def start_server(self):
-        if self.server_process and self.server_process.poll() is None:
-            messagebox.showinfo("Server Status", "Server is already running.")
+        instance = self._selected_instance()
+        if instance and instance.IsActive():
+            messagebox.showinfo("Server Status", f"Server is already {instance.state}.")
             return
 
         exe_path = self.cs2_exe_path.get().strip()
@@ -825,8 +902,8 @@ class CS2ServerLauncher:
             return
         try:
             server_port_int = int(server_port)
-            if not (1024 <= server_port_int <= 65535):
-                messagebox.showerror("Error", "Server Port must be a number between 1024 and 65535.")
+            if server_port_int != 0 and not (1024 <= server_port_int <= 65535):
+                messagebox.showerror("Error", "Server Port must be 0 (pick a free port) or a number between 1024 and 65535.")
                 return
         except ValueError:
             messagebox.showerror("Error", "Server Port must be a valid number.")
@@ -876,114 +953,187 @@ class CS2ServerLauncher:
             # Deathmatch can be played on any map, but typically uses de_ or cs_ maps
             pass # No specific prefix check, as it's flexible
 
-        # --- Construct Command Arguments ---
-        cmd_args = [
-            f"-dedicated",
-            f"-ip {pc_ip}",
-            f"-port {server_port}",
-            f"+game_type {game_type_val}",
-            f"+game_mode {game_mode_val}",
-            f"+map {map_name}",
-            f"-maxplayers {max_players}",
-        ]
-
-        if self.server_password.get():
-            cmd_args.append(f"+sv_password \"{self.server_password.get()}\"")
-        if self.rcon_password.get():
-            cmd_args.append(f"+rcon_password \"{self.rcon_password.get()}\"")
-
+        # --- Instance Config ---
+        additional_parsed_args = []
         if self.additional_args.get():
             try:
                 # shlex.split handles quoted arguments correctly
                 additional_parsed_args = shlex.split(self.additional_args.get())
-                cmd_args.extend(additional_parsed_args)
             except ValueError as e:
                 messagebox.showerror("Error", f"Invalid Additional Arguments format: {e}")
                 self.append_to_log(f"Error parsing additional arguments: {e}")
                 return
 
-        full_command = [exe_path] + cmd_args
+        name = self.instance_name.get().strip() or "default"
+
+        # A profile loaded from a config file that is not a preset is kept as it is
+        profile = None
+        if self.performance_profile.get() in PerformanceProfile.presets:
+            profile = PerformanceProfile.Preset(self.performance_profile.get())
+        elif instance:
+            profile = instance.config.profile
+
+        config = ServerInstanceConfig(
+            exe_path, ip=pc_ip, port=server_port_int, map=map_name, gameType=game_type_val, gameMode=game_mode_val,
+            maxPlayers=max_players_int, serverPassword=self.server_password.get(), rconPassword=self.rcon_password.get(),
+            additionalArgs=additional_parsed_args, profile=profile
+        )
 
         try:
-            # Determine the working directory for the server process
-            # It should be the directory containing 'game' folder, usually Steam/steamapps/common/Counter-Strike Global Offensive
-            server_bin_path = os.path.dirname(exe_path) # e.g., .../win64
-            server_game_path = os.path.dirname(server_bin_path) # e.g., .../bin
-            server_base_path = os.path.dirname(server_game_path) # e.g., .../game
-            server_dir = os.path.dirname(server_base_path) # e.g., .../Counter-Strike Global Offensive
-
-            creation_flags = 0
-            if os.name == 'nt': # For Windows, hide the console window
-                creation_flags = subprocess.CREATE_NO_WINDOW
-
-            self.server_process = subprocess.Popen(
-                full_command,
-                cwd=server_dir, # Set working directory to the CS2 install root
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT, # Redirect stderr to stdout for combined log
-                text=False, # Output is bytes, needs decoding
-                creationflags=creation_flags
-                # If you want to enable sending commands via stdin, add:
-                # stdin=subprocess.PIPE
-            )
-            self.append_to_log(f"Starting server with command: {' '.join(shlex.quote(arg) for arg in full_command)}")
-            self.append_to_log(f"Working directory set to: {server_dir}")
+            self.server_manager.AddInstance(name, config)
+            instance = self.server_manager.Start(name)
+            self.instance_combobox.config(values=self.server_manager.Names())
+
+            self.append_to_log(f"Starting server '{name}' with command: {' '.join(shlex.quote(arg) for arg in config.Command(instance.port))}")
+            self.append_to_log(f"Working directory set to: {config.ServerDir()}")
+            if server_port_int == 0:
+                self.append_to_log(f"Server '{name}' uses the free port {instance.port}.")
+            if instance.cpus is not None:
+                self.append_to_log(f"Server '{name}' is pinned to CPUs {', '.join(str(cpu) for cpu in instance.cpus)}.")
             self.append_to_log("Server process started. Please wait for it to load.")
 
-            self.stop_log_thread.clear() # Ensure the event is clear for a new thread
-            self.output_log_thread = threading.Thread(target=self.read_server_output)
-            self.output_log_thread.daemon = True # Daemonize thread so it exits with main app
-            self.output_log_thread.start()
-
         except FileNotFoundError:
             messagebox.showerror("Error", f"The executable '{exe_path}' was not found. Please check the path.")
             self.append_to_log(f"Error: Executable not found at {exe_path}")
-            self.server_process = None
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start server: {e}")
             self.append_to_log(f"Error starting server: {e}")
-            self.server_process = None
 
     def stop_server(self):
-        if self.server_process and self.server_process.poll() is None:
-            self.append_to_log("Attempting to stop server...")
+        instance = self._selected_instance()
+        if instance and instance.IsActive():
+            self.append_to_log(f"Attempting to stop server '{instance.name}'...")
+            host, port = instance.queryHost, instance.port
             try:
-                self.stop_log_thread.set() # Signal the log thread to stop
-                if self.output_log_thread and self.output_log_thread.is_alive():
-                    self.output_log_thread.join(timeout=3) # Wait for log thread to finish
-
-                self.server_process.terminate() # Request graceful termination
-                self.append_to_log("Sent terminate signal to server process.")
-
-                try:
-                    self.server_process.wait(timeout=10) # Wait a bit for it to close
-                    if self.server_process.poll() is None: # Still running?
-                        self.server_process.kill() # Force kill
-                        self.append_to_log("Server process forcefully terminated.")
-                    else:
-                        self.append_to_log("Server process terminated successfully.")
-                except subprocess.TimeoutExpired:
-                    self.server_process.kill() # Force kill if timeout
-                    self.append_to_log("Server process did not terminate in time, forcefully killed.")
-
+                self.server_manager.Stop(instance.name)
+                self.append_to_log("Server process terminated successfully.")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to stop server: {e}")
                 self.append_to_log(f"Error stopping server: {e}")
             finally:
-                self.server_process = None
-                self.output_log_thread = None
-                self.stop_log_thread.clear() # Clear for next start
+                if port is not None:
+                    RCONClient.CloseServer(host, port) # Only the stopped server, the other instances keep their connections
         else:
             messagebox.showinfo("Server Status", "No server process is currently running.")
-            # Ensure state is clean even if process somehow detached but wasn't None
-            if self.server_process:
-                self.server_process = None
-                self.output_log_thread = None
-                self.stop_log_thread.clear()
+
+    def select_instance(self, event=None):
+        """Shows the parameters of the selected instance in the form."""
+        instance = self._selected_instance()
+        if not instance:
+            return
+
+        config = instance.config
+        self.cs2_exe_path.set(config.exePath)
+        self.pc_ip_address.set(config.ip)
+        self.map_name.set(config.map)
+        self.max_players.set(str(config.maxPlayers))
+        self.server_port.set(str(config.port))
+        self.server_password.set(config.serverPassword)
+        self.rcon_password.set(config.rconPassword)
+        for display_name, (game_type, game_mode) in self.all_game_modes.items():
+            if (game_type, game_mode) == (config.gameType, config.gameMode):
+                self.selected_game_mode_display.set(display_name)
+        self.additional_args.set(shlex.join(config.additionalArgs))
+        self.performance_profile.set("Custom")
+        for profile_name in PerformanceProfile.presets:
+            profile = PerformanceProfile.Preset(profile_name)
+            if (profile.ToDict() if profile else None) == (config.profile.ToDict() if config.profile else None):
+                self.performance_profile.set(profile_name)
+        self._refresh_server_status(reschedule=False)
+
+    def _instance_log_line(self, name, line):
+        # With several instances every line says where it comes from
+        return f"[{name}] {line}" if len(self.server_manager.instances) > 1 else line
+
+    def _on_instance_event(self, name, event, message):
+        """Logs instance state changes and watchdog events (called on the Tk thread)."""
+        if event == "state":
+            instance = self.server_manager.GetInstance(name)
+            if message == ServerInstance.FAILED and instance and instance.lastError:
+                self.append_to_log(self._instance_log_line(name, f"Server failed: {instance.lastError}"))
+            elif message in (ServerInstance.RESTARTING, ServerInstance.FAILED):
+                self.append_to_log(self._instance_log_line(name, f"Server is {message}."))
+        elif event == "profile":
+            self.append_to_log(self._instance_log_line(name, f"Performance profile: {message}"))
+        else:
+            self.append_to_log(self._instance_log_line(name, f"Watchdog: {message}"))
+
+    def _refresh_server_status(self, reschedule=True):
+        """Shows the state and last A2S status of the selected instance, every second."""
+        instance = self._selected_instance()
+        status = self.server_manager.GetStatus(instance.name) if instance else None
+
+        if not instance or instance.state == ServerInstance.STOPPED:
+            text = "Server: not running"
+        elif instance.state == ServerInstance.FAILED:
+            text = f"Server: failed ({instance.lastError})"
+        elif instance.state != ServerInstance.RUNNING:
+            text = f"Server: {instance.state}..."
+        elif status is not None and status.online:
+            info = status.info
+            text = f"Server: online - {info.get('map', '?')} - {info.get('players', 0) - info.get('bots', 0)}/{info.get('maxPlayers', 0)} players - {int(status.latency * 1000)} ms"
+        elif status is not None and status.lastUpdate != 0:
+            text = f"Server: not answering ({status.lastError})"
+        else:
+            text = "Server: starting..."
+        self.server_status_label.config(text=text)
+
+        if reschedule:
+            self.master.after(1000, self._refresh_server_status)
+
+    def search_logs(self):
+        """Searches the log files of every instance in a worker thread, streaming the matching lines into the log panel."""
+        text = self.search_text.get().strip()
+        if not text:
+            messagebox.showwarning("Empty Search", "Please enter the text to search for.")
+            return
+
+        if self.search_regex.get():
+            pattern = text
+        else:
+            # Plain text matches whole words, the log index can then skip the blocks without them
+            pattern = re.escape(text)
+            if re.match(r"\w", text, re.ASCII):
+                pattern = r"\b" + pattern
+            if re.search(r"\w$", text, re.ASCII):
+                pattern += r"\b"
+        try:
+            re.compile(pattern.encode("utf-8"))
+        except re.error as e:
+            messagebox.showerror("Invalid Regular Expression", f"Could not use '{text}' as a regular expression: {e}")
+            return
+
+        period = self.search_periods.get(self.search_period.get())
+        start = time.time() - period if period is not None else None
+
+        self.search_generation += 1
+        self.append_to_log(f"Searching the server logs for '{text}' ({self.search_period.get().lower()})...")
+        threading.Thread(target=self._run_log_search, args=(pattern, start, self.search_generation), daemon=True).start()
+
+    def _run_log_search(self, pattern, start, generation):
+        """Streams the results of a log search into the log buffer (worker thread)."""
+        search = LogSearch(ServerLogWriter.default_directory)
+        started = time.time()
+        count = 0
+        try:
+            for name, line in search.Search(pattern, start=start, limit=self.search_max_results):
+                if generation != self.search_generation:
+                    return # Replaced by a newer search
+                self.log_buffer.Push(f"[search] [{name}] {line}")
+                count += 1
+        except (OSError, ValueError) as e:
+            self.log_buffer.Push(f"Log search failed: {e}")
+            return
+
+        limited = f" (first {count} shown)" if count >= self.search_max_results else ""
+        unreadable = f", {search.unreadable} damaged blocks skipped" if search.unreadable else ""
+        self.log_buffer.Push(f"Log search done: {count} matching lines{limited} in {time.time() - started:.2f} s, "
+                             f"{search.blocksRead} of {search.blocksIndexed} indexed blocks read{unreadable}.")
 
     def send_console_command(self):
-        """Sends a console command to the running server."""
-        if not self.server_process or self.server_process.poll() is not None:
+        """Sends a console command to the running server over RCON."""
+        instance = self._selected_instance()
+        if not instance or not instance.IsActive():
             messagebox.showwarning("Server Not Running", "No server is currently running to send commands to.")
             self.append_to_log("Cannot send command: Server not running.")
             return
@@ -993,18 +1143,31 @@ class CS2ServerLauncher:
             messagebox.showwarning("Empty Command", "Please enter a command to send.")
             return
 
-        try:
-            self.append_to_log(f"Attempting to send command: {command}")
-            messagebox.showinfo("Command Sent (Logged)", 
-                                f"Command '{command}' sent. Note: Direct console command sending via GUI might not be fully supported by CS2 dedicated server stdout/stdin. "
-                                "For robust command execution, consider implementing RCON.")
+        rcon_password = instance.config.rconPassword
+        if not rcon_password:
+            messagebox.showwarning("RCON Password Required", "Console commands are sent over RCON. Set an RCON password and restart the server.")
+            self.append_to_log("Cannot send command: no RCON password set.")
+            return
 
-            # Clear the command entry after sending
-            self.command_entry.delete(0, tk.END)
+        self.append_to_log(f"> {command}")
+        # Clear the command entry after sending
+        self.command_entry.delete(0, tk.END)
 
-        except Exception as e:
-            self.append_to_log(f"Error sending command: {e}")
-            messagebox.showerror("Command Error", f"Failed to send command: {e}")
+        # RCON runs on the game port; the network round trip must not block the GUI
+        host = instance.queryHost
+        port = instance.port
+        threading.Thread(target=self._send_rcon_command, args=(host, port, rcon_password, command), daemon=True).start()
+
+    def _send_rcon_command(self, host, port, rcon_password, command):
+        """Runs a command on the shared RCON connection of the server and logs its output (worker thread)."""
+        try:
+            client = RCONClient.ForServer(host, int(port), rcon_password)
+            response = client.Execute(command).rstrip()
+            self.master.after(0, self.append_to_log, response if response else f"(no output for '{command}')")
+        except RCONAuthenticationFailed:
+            self.master.after(0, self.append_to_log, "RCON authentication failed: the server refused the RCON password.")
+        except (RCONConnectionError, TimeoutError, ValueError) as e:
+            self.master.after(0, self.append_to_log, f"Error sending command over RCON: {e}")
 
     def send_command_on_enter(self, event=None):
         """Called when the Enter key is pressed in the command entry."""
@@ -1022,9 +1185,12 @@ class CS2ServerLauncher:
             "rcon_password": self.rcon_password.get(),
             "selected_game_mode_display": self.selected_game_mode_display.get(),
             "additional_args": self.additional_args.get(),
+            "performance_profile": self.performance_profile.get(),
             "current_theme_name": self.current_theme_name.get(), # Save the selected preset name
             "active_theme_config_colors": self.active_theme_config, # Save the currently active (potentially customized) colors
-            "user_defined_themes": self.user_defined_themes # Save user-defined themes
+            "user_defined_themes": self.user_defined_themes, # Save user-defined themes
+            "selected_instance": self.instance_name.get(),
+            "instances": self.server_manager.ConfigsToDict() # Launch parameters of every started instance
         }
 
         filepath = filedialog.asksaveasfilename(
@@ -1064,6 +1230,16 @@ class CS2ServerLauncher:
                 self.rcon_password.set(config_data.get("rcon_password", ""))
                 self.selected_game_mode_display.set(config_data.get("selected_game_mode_display", "Casual"))
                 self.additional_args.set(config_data.get("additional_args", "-usercon -dedicated"))
+                self.performance_profile.set(config_data.get("performance_profile", "Default"))
+
+                # Instances, running ones keep their current parameters
+                for name, instance_config in config_data.get("instances", {}).items():
+                    try:
+                        self.server_manager.AddInstance(name, ServerInstanceConfig.FromDict(instance_config))
+                    except ServerInstanceStateError:
+                        self.append_to_log(f"Instance '{name}' is running, its saved parameters were not loaded.")
+                self.instance_combobox.config(values=self.server_manager.Names() or ["default"])
+                self.instance_name.set(config_data.get("selected_instance", "default"))
                 
                 # Load theme preference and colors
                 loaded_theme_name = config_data.get("current_theme_name", "Light Mode")
@@ -1096,12 +1272,11 @@ class CS2ServerLauncher:
                 messagebox.showerror("Load Config Error", f"Failed to load configuration: {e}")
 
     def on_closing(self):
-        if self.server_process and self.server_process.poll() is None:
-            if messagebox.askokcancel("Quit", "A server is currently running. Do you want to quit and stop the server?"):
-                self.stop_server()
-                self.master.destroy()
-        else:
-            self.master.destroy()
+        if any(self.server_manager.GetInstance(name).IsActive() for name in self.server_manager.Names()):
+            if not messagebox.askokcancel("Quit", "A server is currently running. Do you want to quit and stop every server?"):
+                return
+        self.server_manager.Close() # Stops every instance in parallel and flushes their logs, failed ones included
+        self.master.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
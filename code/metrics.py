@@ -0,0 +1,197 @@
+from bisect import bisect_left
+import threading
+
+#
+#   METRICS
+#
+
+class Histogram:
+    """
+    Cumulative histogram with fixed upper bounds, like prometheus histograms
+    """
+
+    latency_buckets: tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    bytes_buckets: tuple = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+    count_buckets: tuple = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self, buckets: tuple):
+        self.buckets    = tuple(sorted(buckets))
+
+        self.counts     = [0] * (len(self.buckets) + 1) # last one is +Inf
+        self.count      = 0
+        self.sum        = 0.0
+
+    def Observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def Quantile(self, q: float) -> float:
+        """
+        upper bound of the bucket holding the q quantile (0 < q <= 1), None without observations
+        """
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def Snapshot(self) -> map:
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            cumulative.append((bound, seen))
+
+        return {"count":self.count, "sum":self.sum, "buckets":cumulative}
+
+
+class MetricsRegistry:
+    """
+    Thread safe in process counters and histograms, labelled like prometheus metrics
+    metrics are declared once with Counter() / Histogram(), then updated with Increment() / Observe()
+
+    usage:
+        metrics.Counter("requests_total", "Requests sent")
+        metrics.Increment("requests_total", {"endpoint": "GetPublishedFileDetails"})
+        print(metrics.ToPrometheus())
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+        self._declared: map = {}    # name -> (type, help, buckets)
+        self._values: map = {}      # name -> {sorted labels tuple -> float or Histogram}
+
+    def Counter(self, name: str, help: str = ""):
+        with self._lock:
+            self._declared[name] = ("counter", help, None)
+            self._values.setdefault(name, {})
+
+    def Histogram(self, name: str, help: str = "", buckets: tuple = Histogram.latency_buckets):
+        with self._lock:
+            self._declared[name] = ("histogram", help, buckets)
+            self._values.setdefault(name, {})
+
+    @staticmethod
+    def _LabelsKey(labels: map) -> tuple:
+        if not labels:
+            return ()
+        return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+    def _Declared(self, name: str, metricType: str) -> tuple:
+        declared = self._declared.get(name)
+        if declared is None or declared[0] != metricType:
+            raise ValueError(name + " is not a declared " + metricType)
+        return declared
+
+    def Increment(self, name: str, labels: map = None, value: float = 1):
+        key = MetricsRegistry._LabelsKey(labels)
+
+        with self._lock:
+            self._Declared(name, "counter")
+            values = self._values[name]
+            values[key] = values.get(key, 0) + value
+
+    def Observe(self, name: str, value: float, labels: map = None):
+        key = MetricsRegistry._LabelsKey(labels)
+
+        with self._lock:
+            buckets = self._Declared(name, "histogram")[2]
+            values = self._values[name]
+            histogram = values.get(key)
+            if histogram is None:
+                histogram = values[key] = Histogram(buckets)
+            histogram.Observe(value)
+
+    def GetCounter(self, name: str, labels: map = None) -> float:
+        with self._lock:
+            return self._values.get(name, {}).get(MetricsRegistry._LabelsKey(labels), 0)
+
+    def GetHistogram(self, name: str, labels: map = None) -> map:
+        """
+        snapshot of one histogram, None if nothing was observed for these labels
+        """
+        with self._lock:
+            histogram = self._values.get(name, {}).get(MetricsRegistry._LabelsKey(labels))
+            return histogram.Snapshot() if histogram is not None else None
+
+    def Snapshot(self) -> list:
+        """
+        every metric value as a list of {"name", "type", "labels", "value"} for counters
+        or {"name", "type", "labels", "count", "sum", "buckets"} for histograms
+        """
+        snapshot = []
+
+        with self._lock:
+            for name, (metricType, _, _) in sorted(self._declared.items()):
+                for key, value in sorted(self._values[name].items()):
+                    entry = {"name":name, "type":metricType, "labels":dict(key)}
+                    if metricType == "counter":
+                        entry["value"] = value
+                    else:
+                        entry.update(value.Snapshot())
+                    snapshot.append(entry)
+
+        return snapshot
+
+    def Reset(self):
+        """
+        forget every value, declarations are kept
+        """
+        with self._lock:
+            for name in self._values.keys():
+                self._values[name] = {}
+
+    #
+    #   PROMETHEUS EXPOSITION
+    #
+
+    @staticmethod
+    def _FormatValue(value: float) -> str:
+        if value == float("inf"):
+            return "+Inf"
+        if float(value).is_integer():
+            return str(int(value))
+        return repr(float(value))
+
+    @staticmethod
+    def _FormatLabels(labels: map) -> str:
+        if len(labels) == 0:
+            return ""
+        escaped = [key + '="' + value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"' for key, value in labels.items()]
+        return "{" + ",".join(escaped) + "}"
+
+    def ToPrometheus(self) -> str:
+        """
+        every metric in the prometheus text exposition format (version 0.0.4)
+        """
+        lines = []
+        snapshot = self.Snapshot()
+
+        with self._lock:
+            declared = dict(self._declared)
+
+        for name, (metricType, help, _) in sorted(declared.items()):
+            lines.append("# HELP " + name + " " + help.replace("\\", "\\\\").replace("\n", "\\n"))
+            lines.append("# TYPE " + name + " " + metricType)
+
+            for entry in snapshot:
+                if entry["name"] != name:
+                    continue
+
+                if metricType == "counter":
+                    lines.append(name + MetricsRegistry._FormatLabels(entry["labels"]) + " " + MetricsRegistry._FormatValue(entry["value"]))
+                    continue
+
+                for bound, count in entry["buckets"]:
+                    lines.append(name + "_bucket" + MetricsRegistry._FormatLabels(dict(entry["labels"], le = MetricsRegistry._FormatValue(bound))) + " " + str(count))
+                lines.append(name + "_sum" + MetricsRegistry._FormatLabels(entry["labels"]) + " " + MetricsRegistry._FormatValue(entry["sum"]))
+                lines.append(name + "_count" + MetricsRegistry._FormatLabels(entry["labels"]) + " " + str(entry["count"]))
+
+        return "\n".join(lines) + "\n"
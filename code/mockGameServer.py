@@ -0,0 +1,230 @@
+import bz2
+import socket
+import socketserver
+import struct
+import threading
+import zlib
+
+from a2sQuery import A2S
+from rconClient import RCONPacket
+
+#
+#   MOCK GAME SERVER
+#
+
+class MockRCONServer:
+    """
+    Local stand-in for the rcon side of a dedicated server (tests)
+    it answers like srcds: an empty SERVERDATA_RESPONSE_VALUE before the auth response, long answers split
+    in several packets of at most answerPacketSize bytes, and empty SERVERDATA_RESPONSE_VALUE packets mirrored
+    followed by the 00 01 00 00 packet
+    answers come from answer(command) -> str
+
+    usage:
+        with MockRCONServer("secret") as server:
+            RCONClient(server.host, server.port, "secret").Execute("status")
+    """
+
+    def __init__(self, password: str, answer = None, host: str = "127.0.0.1", port: int = 0, answerPacketSize: int = 4000):
+        if answer is None: answer = MockRCONServer.DefaultAnswer
+
+        self.password           = password
+        self.answer             = answer
+        self.answerPacketSize   = answerPacketSize
+
+        self.commands: list     = [] # every command received, in order
+        self.connections: int   = 0  # number of accepted connections
+
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), MockRCONServer._MakeHandler(self))
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @staticmethod
+    def DefaultAnswer(command: str) -> str:
+        name, _, args = command.partition(" ")
+        if name == "echo":
+            return args + "\n"
+        if name == "status":
+            return "hostname: Mock CS2 Server\nplayers : 0 humans, 0 bots (10 max)\n"
+        return "Unknown command \"" + name + "\"\n"
+
+    def Start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def Stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.Start()
+
+    def __exit__(self, *exc):
+        self.Stop()
+
+    @staticmethod
+    def _MakeHandler(mock):
+        class Handler(socketserver.BaseRequestHandler):
+            def _Send(self, id: int, type: int, body: bytes):
+                data = body + b"\0\0"
+                self.request.sendall(struct.pack("<iii", 8 + len(data), id, type) + data)
+
+            def handle(self):
+                with mock._lock:
+                    mock.connections += 1
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+                authenticated = False
+                try:
+                    while True:
+                        id, type, body = RCONPacket.Read(self.request)
+
+                        if type == RCONPacket.SERVERDATA_AUTH:
+                            authenticated = body == mock.password
+                            self._Send(id, RCONPacket.SERVERDATA_RESPONSE_VALUE, b"")
+                            self._Send(id if authenticated else -1, RCONPacket.SERVERDATA_AUTH_RESPONSE, b"")
+                        elif not authenticated:
+                            return
+                        elif type == RCONPacket.SERVERDATA_EXECCOMMAND:
+                            with mock._lock:
+                                mock.commands.append(body)
+                            answer = mock.answer(body).encode("utf-8")
+                            for i in range(0, max(1, len(answer)), mock.answerPacketSize):
+                                self._Send(id, RCONPacket.SERVERDATA_RESPONSE_VALUE, answer[i:i + mock.answerPacketSize])
+                        elif type == RCONPacket.SERVERDATA_RESPONSE_VALUE:
+                            self._Send(id, RCONPacket.SERVERDATA_RESPONSE_VALUE, b"")
+                            self._Send(id, RCONPacket.SERVERDATA_RESPONSE_VALUE, b"\x00\x01")
+                except Exception:
+                    # connection closed by the client
+                    return
+
+        return Handler
+
+
+class MockA2SServer:
+    """
+    Local stand-in for the query side of a dedicated server (tests)
+    every query must carry the challenge it hands out first (S2C_CHALLENGE), answers bigger than
+    splitSize bytes are sent as several 0xFFFFFFFE packets, in reverse order, bz2 compressed with compress = True
+    a server that is not answering can be simulated with silent = True, one that loses a packet of its split answers with lostPacket
+
+    usage:
+        with MockA2SServer(rules = {"sv_cheats": "0"}) as server:
+            poller.AddTarget(server.host, server.port)
+    """
+
+    def __init__(self, info: map = None, players: list = None, rules: map = None, host: str = "127.0.0.1", port: int = 0, splitSize: int = 1248):
+        if info is None: info = {"name":"Mock CS2 Server", "map":"de_dust2", "folder":"csgo", "game":"Counter-Strike 2", "appId":730, "maxPlayers":10, "bots":0, "version":"1.0.0.0"}
+        if players is None: players = []
+        if rules is None: rules = {}
+
+        self.info               = info
+        self.players            = players
+        self.rules              = rules
+        self.splitSize          = splitSize
+        self.silent: bool       = False
+        self.compress: bool     = False
+        self.lostPacket: int    = None # number of the split packet never sent
+
+        self.queries: list      = [] # header byte of every query answered, in order
+        self.challenge: bytes   = b"\x4d\x6f\x63\x6b"
+
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingUDPServer((host, port), MockA2SServer._MakeHandler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def Start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def Stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.Start()
+
+    def __exit__(self, *exc):
+        self.Stop()
+
+    @staticmethod
+    def _String(value: str) -> bytes:
+        return value.encode("utf-8") + b"\0"
+
+    def Answer(self, query: int) -> bytes:
+        if query == A2S.A2S_INFO:
+            info = self.info
+            return (bytes([A2S.S2A_INFO, 17]) + MockA2SServer._String(info["name"]) + MockA2SServer._String(info["map"]) + MockA2SServer._String(info["folder"])
+                + MockA2SServer._String(info["game"]) + struct.pack("<HBBBccBB", info["appId"], len(self.players), info["maxPlayers"], info["bots"], b"d", b"l", 0, 1)
+                + MockA2SServer._String(info["version"]) + bytes([0x80]) + struct.pack("<H", self.port))
+
+        if query == A2S.A2S_PLAYER:
+            data = bytes([A2S.S2A_PLAYER, len(self.players)])
+            for index, player in enumerate(self.players):
+                data += bytes([index]) + MockA2SServer._String(player["name"]) + struct.pack("<lf", player["score"], player["duration"])
+            return data
+
+        data = bytes([A2S.S2A_RULES]) + struct.pack("<H", len(self.rules))
+        for name, value in self.rules.items():
+            data += MockA2SServer._String(name) + MockA2SServer._String(value)
+        return data
+
+    def Packets(self, payload: bytes) -> list:
+        data = A2S.single_packet + payload
+        if len(data) <= self.splitSize:
+            return [data]
+
+        id = 1234
+        if self.compress:
+            id |= 0x80000000
+            data = struct.pack("<lL", len(data), zlib.crc32(data)) + bz2.compress(data)
+
+        parts = [data[i:i + self.splitSize] for i in range(0, len(data), self.splitSize)]
+        packets = [A2S.split_packet + struct.pack("<LBBH", id, len(parts), number, self.splitSize) + part for number, part in enumerate(parts)
+            if number != self.lostPacket]
+        return packets[::-1]
+
+    @staticmethod
+    def _MakeHandler(mock):
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                data, sock = self.request
+                if mock.silent or data[:4] != A2S.single_packet or len(data) < 5:
+                    return
+
+                query = data[4]
+                if query not in A2S.answers:
+                    return
+
+                challenge = data[-4:] if query != A2S.A2S_INFO or len(data) > 25 else None
+                if challenge != mock.challenge:
+                    sock.sendto(A2S.single_packet + bytes([A2S.S2C_CHALLENGE]) + mock.challenge, self.client_address)
+                    return
+
+                with mock._lock:
+                    mock.queries.append(query)
+                for packet in mock.Packets(mock.Answer(query)):
+                    sock.sendto(packet, self.client_address)
+
+        return Handler
@@ -0,0 +1,185 @@
+from http import client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+import gzip
+import json
+import os
+import threading
+
+from steamWebAPI import SteamWebAPI
+
+#
+#   MOCK STEAM WEB API
+#
+
+class MockSteamWebAPIServer:
+    """
+    Local stand-in for the ISteamRemoteStorage endpoints of the steam web api
+    replay mode answers from the fixtures file,
+    record mode forwards every request to the real api and stores each returned item in the fixtures file
+    fixtures are stored per item so any request made of known ids can be replayed, whatever the chunking
+
+    usage:
+        with MockSteamWebAPIServer():
+            SteamWebAPI.GetCollectionsDetails(...) # answered locally
+    """
+
+    default_fixtures_path: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "steamWebAPI.json")
+
+    # endpoint -> (fixtures section, response list key)
+    endpoints: map = {
+        "GetCollectionDetails": ("collections", "collectiondetails"),
+        "GetPublishedFileDetails": ("files", "publishedfiledetails"),
+    }
+
+    # answers at least this big are gzipped when the client accepts it, like steam does
+    gzip_min_size: int = 256
+
+    def __init__(self, fixturesPath: str = None, record: bool = False, host: str = "127.0.0.1", port: int = 0, upstreamHost: str = "api.steampowered.com"):
+        if fixturesPath is None: fixturesPath = MockSteamWebAPIServer.default_fixtures_path
+
+        self.fixturesPath   = fixturesPath
+        self.record         = record
+        self.upstreamHost   = upstreamHost
+
+        self.fixtures: map  = {"collections": {}, "files": {}}
+        if os.path.exists(fixturesPath):
+            with open(fixturesPath, "r", encoding = "utf-8") as f:
+                self.fixtures.update(json.load(f))
+
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), MockSteamWebAPIServer._MakeHandler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+        self._previousSettings = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return host + ":" + str(port)
+
+    def Start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def Stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self.record:
+            self.SaveFixtures()
+
+    def Install(self):
+        """
+        Point SteamWebAPI at this server
+        """
+        self._previousSettings = (SteamWebAPI.steam_api_scheme, SteamWebAPI.steam_api_base_url)
+        SteamWebAPI.steam_api_scheme = "http"
+        SteamWebAPI.steam_api_base_url = self.address
+        SteamWebAPI.Close()
+
+    def Uninstall(self):
+        if self._previousSettings is None:
+            return
+        SteamWebAPI.steam_api_scheme, SteamWebAPI.steam_api_base_url = self._previousSettings
+        self._previousSettings = None
+        SteamWebAPI.Close()
+
+    def __enter__(self):
+        self.Start()
+        self.Install()
+        return self
+
+    def __exit__(self, *exc):
+        self.Uninstall()
+        self.Stop()
+
+    def SaveFixtures(self):
+        if os.path.dirname(self.fixturesPath) != "":
+            os.makedirs(os.path.dirname(self.fixturesPath), exist_ok = True)
+
+        with self._lock:
+            with open(self.fixturesPath, "w", encoding = "utf-8") as f:
+                json.dump(self.fixtures, f, indent = 1, sort_keys = True)
+
+    #
+    #   REQUEST HANDLING
+    #
+
+    def Answer(self, method: str, path: str, body: str) -> tuple:
+        """
+        returns (status, response body) for a request
+        """
+        if method == "GET" and path == "/":
+            return 200, b"OK"
+
+        parts = [part for part in path.split("/") if part != ""]
+        if method != "POST" or len(parts) != 3 or parts[0] != SteamWebAPI.steam_api_ISteamRemoteStorage_endpoint or parts[1] not in MockSteamWebAPIServer.endpoints:
+            return 404, b"Not Found"
+
+        if self.record:
+            return self._Forward(method, path, body, parts[1])
+
+        section, listKey = MockSteamWebAPIServer.endpoints[parts[1]]
+
+        fields = parse_qsl(body)
+        ids = [value for key, value in fields if key.startswith("publishedfileids[")]
+
+        # steam answers with an empty object when none of the ids could be valid
+        if len([itemId for itemId in ids if itemId.isdigit() and int(itemId) != 0]) == 0:
+            return 200, b"{}"
+
+        with self._lock:
+            entries = [self.fixtures[section].get(itemId, {"publishedfileid": itemId, "result": 9}) for itemId in ids]
+
+        return 200, json.dumps({"response": {"result": 1, "resultcount": len(entries), listKey: entries}}).encode("utf-8")
+
+    def _Forward(self, method: str, path: str, body: str, endpoint: str) -> tuple:
+        connection = client.HTTPSConnection(self.upstreamHost, timeout = 30)
+        try:
+            connection.request(method, path, body = body, headers = {"Content-type":"application/x-www-form-urlencoded"})
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+
+        try:
+            section, listKey = MockSteamWebAPIServer.endpoints[endpoint]
+            entries = json.loads(data).get("response", {}).get(listKey, [])
+        except (ValueError, AttributeError):
+            entries = []
+
+        with self._lock:
+            for entry in entries:
+                if "publishedfileid" in entry:
+                    self.fixtures[section][str(entry["publishedfileid"])] = entry
+
+        return response.status, data
+
+    @staticmethod
+    def _MakeHandler(mock):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _Handle(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8") if length else ""
+
+                status, data = mock.Answer(self.command, self.path, body)
+
+                self.send_response(status)
+                if "gzip" in self.headers.get("Accept-Encoding", "") and len(data) >= MockSteamWebAPIServer.gzip_min_size:
+                    data = gzip.compress(data)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _Handle
+            do_POST = _Handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
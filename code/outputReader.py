@@ -0,0 +1,223 @@
+import codecs
+import os
+import selectors
+import socket
+import threading
+
+#
+#   OUTPUT READER
+#
+
+class _Pipe:
+    """
+    One pipe being read: incremental decoder and the unfinished last line
+    """
+
+    def __init__(self, pipe, onLine, onClose):
+        self.pipe       = pipe
+        self.fd         = pipe.fileno()
+        self.onLine     = onLine
+        self.onClose    = onClose
+
+        self.decoder    = codecs.getincrementaldecoder("utf-8")(errors = "replace")
+        self.tail       = "" # text after the last newline
+        self.removed    = False
+
+    def Feed(self, data) -> None:
+        """
+        decode a chunk (a utf-8 character can be split between chunks) and hand out its complete lines
+        """
+        text = self.decoder.decode(data)
+        if text == "":
+            return
+
+        start = 0
+        end = text.find("\n")
+        if end != -1:
+            self.onLine((self.tail + text[:end]).rstrip("\r"))
+            self.tail = ""
+            start = end + 1
+
+            end = text.find("\n", start)
+            while end != -1:
+                self.onLine(text[start:end].rstrip("\r"))
+                start = end + 1
+                end = text.find("\n", start)
+
+        self.tail += text[start:]
+
+    def Finish(self):
+        text = self.tail + self.decoder.decode(b"", final = True)
+        self.tail = ""
+        if text != "":
+            self.onLine(text.rstrip("\r"))
+        if self.onClose is not None:
+            self.onClose()
+
+
+class OutputReader:
+    """
+    Reads the output pipes of many processes from one thread: pipes are non blocking and watched with a selector,
+    ready ones are read by chunks of chunkSize bytes into one reusable buffer, decoded incrementally and split in lines
+    onLine(line) is called for every line and onClose() once the pipe is closed (from the reader thread)
+    Stop() returns right away, the selector also watches a socket pair used to wake it up
+    where pipes can't be selected (windows), every pipe gets a thread doing blocking reads into its own buffer
+
+    usage:
+        reader = OutputReader().Start()
+        reader.Add(process.stdout, print)
+    """
+
+    chunk_size: int = 65536
+
+    def __init__(self, chunkSize: int = None):
+        if chunkSize is None: chunkSize = OutputReader.chunk_size
+
+        self.chunkSize  = chunkSize
+        self.selectable = os.name == "posix"
+
+        self._lock      = threading.Lock()
+        self._pipes     = {} # fd -> _Pipe
+        self._commands  = [] # ("add" / "remove", _Pipe) for the reader thread
+        self._stopped   = False
+        self._thread    = None
+
+        self._buffer    = bytearray(chunkSize)
+        self._view      = memoryview(self._buffer)
+        self._selector  = None
+        self._wakeRead, self._wakeWrite = None, None
+
+    def Start(self):
+        if self.selectable:
+            self._selector = selectors.DefaultSelector()
+            self._wakeRead, self._wakeWrite = socket.socketpair()
+            self._wakeRead.setblocking(False)
+            self._wakeWrite.setblocking(False)
+            self._selector.register(self._wakeRead, selectors.EVENT_READ, None)
+
+            self._thread = threading.Thread(target = self._Run, daemon = True)
+            self._thread.start()
+        return self
+
+    def _Wake(self):
+        try:
+            self._wakeWrite.send(b"\0")
+        except (BlockingIOError, OSError):
+            # a wake up is already pending
+            pass
+
+    def Add(self, pipe, onLine, onClose = None):
+        """
+        Start reading a pipe (a binary file object, like Popen.stdout)
+        """
+        state = _Pipe(pipe, onLine, onClose)
+
+        if not self.selectable:
+            with self._lock:
+                self._pipes[state.fd] = state
+            threading.Thread(target = self._ReadBlocking, args = (state,), daemon = True).start()
+            return
+
+        os.set_blocking(state.fd, False)
+        with self._lock:
+            self._commands.append(("add", state))
+        self._Wake()
+
+    def Remove(self, pipe):
+        """
+        Stop reading a pipe, onClose is not called
+        """
+        with self._lock:
+            state = self._pipes.get(pipe.fileno())
+            if state is None:
+                # not registered yet
+                self._commands = [(action, other) for action, other in self._commands if other.pipe is not pipe]
+                return
+            state.removed = True
+            if self.selectable:
+                self._commands.append(("remove", state))
+            else:
+                del self._pipes[state.fd]
+        if self.selectable:
+            self._Wake()
+
+    def Stop(self):
+        self._stopped = True
+        if self._thread is not None:
+            self._Wake()
+            self._thread.join(timeout = 5)
+            self._thread = None
+
+    def _RunCommands(self):
+        with self._lock:
+            commands, self._commands = self._commands, []
+
+            for action, state in commands:
+                if action == "add":
+                    self._pipes[state.fd] = state
+                    self._selector.register(state.fd, selectors.EVENT_READ, state)
+                elif self._pipes.get(state.fd) is state:
+                    del self._pipes[state.fd]
+                    self._selector.unregister(state.fd)
+
+    def _Close(self, state: _Pipe):
+        with self._lock:
+            if self._pipes.get(state.fd) is state:
+                del self._pipes[state.fd]
+                self._selector.unregister(state.fd)
+        state.Finish()
+        state.pipe.close()
+
+    def _Run(self):
+        try:
+            while not self._stopped:
+                for key, _ in self._selector.select():
+                    state = key.data
+
+                    if state is None:
+                        try:
+                            while self._wakeRead.recv(4096):
+                                pass
+                        except BlockingIOError:
+                            pass
+                        self._RunCommands()
+                        continue
+
+                    try:
+                        size = os.readv(state.fd, [self._view])
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        size = 0
+
+                    if state.removed:
+                        continue
+                    if size == 0:
+                        self._Close(state)
+                    else:
+                        state.Feed(self._view[:size])
+        finally:
+            self._selector.close()
+            self._wakeRead.close()
+            self._wakeWrite.close()
+
+    def _ReadBlocking(self, state: _Pipe):
+        buffer = bytearray(self.chunkSize)
+        view = memoryview(buffer)
+        raw = getattr(state.pipe, "raw", state.pipe)
+
+        while not self._stopped and not state.removed:
+            try:
+                size = raw.readinto(view)
+            except (OSError, ValueError):
+                size = 0
+            if not size:
+                break
+            state.Feed(view[:size])
+
+        with self._lock:
+            if self._pipes.get(state.fd) is state:
+                del self._pipes[state.fd]
+        if not state.removed:
+            state.Finish()
+            state.pipe.close()
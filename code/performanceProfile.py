@@ -0,0 +1,255 @@
+import ctypes
+import os
+import platform
+import threading
+
+from exceptions import CoreAllocationFailed
+
+#
+#   CPU TOPOLOGY
+#
+
+class CPUTopology:
+    """
+    Physical cores of the machine with their logical cpus (hyperthreads), in package / core order
+    read from /sys, or /proc/cpuinfo when /sys has no topology, limited to the cpus the launcher may use
+    """
+
+    def __init__(self, cores: list):
+        self.cores: list = cores # tuple of logical cpu ids per physical core
+
+    @property
+    def cpus(self) -> list:
+        return sorted(cpu for core in self.cores for cpu in core)
+
+    @staticmethod
+    def ParseCPUInfo(text: str) -> map:
+        """
+        {logical cpu: (physical id, core id)} of a /proc/cpuinfo
+        """
+        cpus = {}
+        for block in text.split("\n\n"):
+            fields = {}
+            for line in block.splitlines():
+                key, _, value = line.partition(":")
+                fields[key.strip()] = value.strip()
+
+            if "processor" in fields:
+                cpu = int(fields["processor"])
+                cpus[cpu] = (int(fields.get("physical id", 0)), int(fields.get("core id", cpu)))
+        return cpus
+
+    @staticmethod
+    def _ReadSys(sysPath: str, cpus: set) -> map:
+        topology = {}
+        for cpu in cpus:
+            directory = os.path.join(sysPath, "cpu" + str(cpu), "topology")
+            with open(os.path.join(directory, "physical_package_id")) as f:
+                package = int(f.read())
+            with open(os.path.join(directory, "core_id")) as f:
+                core = int(f.read())
+            topology[cpu] = (package, core)
+        return topology
+
+    @staticmethod
+    def Load(sysPath: str = "/sys/devices/system/cpu", cpuinfoPath: str = "/proc/cpuinfo", allowed: set = None):
+        if allowed is None: allowed = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else set(range(os.cpu_count() or 1))
+
+        try:
+            topology = CPUTopology._ReadSys(sysPath, allowed)
+        except (OSError, ValueError):
+            try:
+                with open(cpuinfoPath) as f:
+                    topology = CPUTopology.ParseCPUInfo(f.read())
+            except (OSError, ValueError):
+                topology = {}
+
+        # cpus without topology are cores of their own
+        cores = {}
+        for cpu in sorted(allowed):
+            cores.setdefault(topology.get(cpu, (-1, cpu)), []).append(cpu)
+
+        return CPUTopology([tuple(cores[key]) for key in sorted(cores.keys())])
+
+#
+#   PERFORMANCE PROFILES
+#
+
+class PerformanceProfile:
+    """
+    Scheduling of a server instance: cpu affinity, nice value and io priority
+    cores physical cores are picked by a CoreAllocator (0: no pinning) unless cpus lists the logical cpus to use,
+    isolate keeps the cores of the instance for it alone, nice / ioClass None leave the defaults
+    on linux these settings belong to a thread: the profile is set in the child before exec (PreExec) so that every
+    thread of the server inherits it, then applied to every thread of the started process (Apply) to report what failed
+    """
+
+    # linux io scheduling classes (ioprio_set)
+    io_classes: map = {"realtime":1, "best-effort":2, "idle":3}
+    ioprio_set_syscalls: map = {"x86_64":251, "amd64":251, "i386":289, "i686":289, "aarch64":30, "arm64":30}
+
+    # name -> profile settings, None: no profile
+    presets: map = {
+        "Default": None,
+        "Dedicated cores": {"cores":2},
+        "Isolated core, high priority": {"cores":1, "isolate":True, "nice":-5, "ioClass":"best-effort", "ioLevel":0},
+    }
+
+    _libc = None
+
+    def __init__(self, cores: int = 0, cpus: list = None, isolate: bool = False, nice: int = None, ioClass: str = None, ioLevel: int = 4):
+        if ioClass is not None and ioClass not in PerformanceProfile.io_classes:
+            raise ValueError("unknown io class " + str(ioClass))
+
+        self.cores      = cores
+        self.cpus       = cpus
+        self.isolate    = isolate
+        self.nice       = nice
+        self.ioClass    = ioClass
+        self.ioLevel    = ioLevel
+
+    def ToDict(self) -> map:
+        return {"cores":self.cores, "cpus":self.cpus, "isolate":self.isolate, "nice":self.nice, "ioClass":self.ioClass, "ioLevel":self.ioLevel}
+
+    @staticmethod
+    def FromDict(data: map):
+        return PerformanceProfile(**data)
+
+    @staticmethod
+    def Preset(name: str):
+        """
+        profile of a preset, None for "Default"
+        """
+        settings = PerformanceProfile.presets[name]
+        return PerformanceProfile(**settings) if settings is not None else None
+
+    def IsPinned(self) -> bool:
+        return self.cpus is not None or self.cores > 0
+
+    @staticmethod
+    def SetIOPriority(pid: int, ioClass: str, ioLevel: int):
+        syscall = PerformanceProfile.ioprio_set_syscalls.get(platform.machine().lower())
+        if syscall is None or os.name != "posix":
+            raise OSError("io priorities are not supported on this system")
+
+        if PerformanceProfile._libc is None:
+            PerformanceProfile._libc = ctypes.CDLL(None, use_errno = True)
+        # IOPRIO_WHO_PROCESS (a thread id on linux), class in the top 3 bits of the priority
+        if PerformanceProfile._libc.syscall(syscall, 1, pid, (PerformanceProfile.io_classes[ioClass] << 13) | ioLevel) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    @staticmethod
+    def Threads(pid: int) -> list:
+        """
+        thread ids of a process (linux), [pid] where they can't be listed
+        """
+        try:
+            return sorted(int(tid) for tid in os.listdir(os.path.join("/proc", str(pid), "task")))
+        except (OSError, ValueError):
+            return [pid]
+
+    def _Settings(self, cpus: list) -> list:
+        """
+        (description, function(thread id)) of every setting of the profile
+        """
+        settings = []
+        if cpus is not None:
+            settings.append(("cpu affinity " + str(list(cpus)), lambda tid: os.sched_setaffinity(tid, cpus)))
+        if self.nice is not None:
+            settings.append(("nice " + str(self.nice), lambda tid: os.setpriority(os.PRIO_PROCESS, tid, self.nice)))
+        if self.ioClass is not None:
+            settings.append(("io priority " + self.ioClass, lambda tid: PerformanceProfile.SetIOPriority(tid, self.ioClass, self.ioLevel)))
+        return settings
+
+    def PreExec(self, cpus: list = None):
+        """
+        function for Popen(preexec_fn) setting the profile in the child before exec (posix),
+        errors are left to Apply: an exception there would fail the launch
+        """
+        if self.ioClass is not None and PerformanceProfile._libc is None and os.name == "posix":
+            # loaded before the fork
+            PerformanceProfile._libc = ctypes.CDLL(None, use_errno = True)
+        settings = self._Settings(cpus)
+
+        def SetUp():
+            for _, setting in settings:
+                try:
+                    setting(0) # the calling thread
+                except (OSError, AttributeError):
+                    pass
+        return SetUp
+
+    def Apply(self, pid: int, cpus: list = None) -> list:
+        """
+        Apply the profile to every thread of a started process, cpus being the cpus the allocator picked
+        returns the errors (a lower nice or the realtime io class need privileges), the process runs anyway
+        """
+        errors = []
+        threads = PerformanceProfile.Threads(pid)
+        for description, setting in self._Settings(cpus):
+            for tid in threads:
+                try:
+                    setting(tid)
+                except ProcessLookupError:
+                    # the thread ended meanwhile
+                    if tid == pid:
+                        errors.append(description + " not applied: the process exited")
+                        break
+                except (OSError, AttributeError) as e:
+                    errors.append(description + " not applied: " + str(e))
+                    break
+
+        return errors
+
+
+class CoreAllocator:
+    """
+    Gives server instances physical cores that no other instance uses while there are free ones,
+    then the least used cores; cores of an isolated instance are never shared
+    the first core is left to the system and the launcher when there is more than one
+    """
+
+    def __init__(self, topology: CPUTopology, reserveFirstCore: bool = True):
+        self.topology           = topology
+        self.reserveFirstCore   = reserveFirstCore
+
+        self._lock = threading.Lock()
+        self._assigned: map = {} # instance name -> (core indexes, isolate)
+
+    def Allocate(self, name: str, count: int, isolate: bool = False) -> list:
+        """
+        Pick count physical cores for an instance (replacing what it had), returns their logical cpus
+        """
+        with self._lock:
+            self._assigned.pop(name, None)
+
+            usage = {index: 0 for index in range(len(self.topology.cores))}
+            if self.reserveFirstCore and len(usage) > 1:
+                del usage[0]
+
+            for indexes, isolated in self._assigned.values():
+                for index in indexes:
+                    if index in usage:
+                        usage[index] = usage[index] + 1 if not isolated else None
+
+            candidates = sorted((used, index) for index, used in usage.items() if used is not None and (used == 0 or not isolate))
+            if not isolate:
+                # shared cores are fine, as many as there are
+                count = min(count, len(candidates))
+            if len(candidates) == 0 or len(candidates) < count:
+                raise CoreAllocationFailed("not enough " + ("free " if isolate else "") + "cpu cores left for " + name
+                    + " (" + str(count) + " wanted, " + str(len(candidates)) + " left)")
+
+            indexes = tuple(sorted(index for _, index in candidates[:max(1, count)]))
+            self._assigned[name] = (indexes, isolate)
+
+        return sorted(cpu for index in indexes for cpu in self.topology.cores[index])
+
+    def Release(self, name: str):
+        with self._lock:
+            self._assigned.pop(name, None)
+
+    def Assignments(self) -> map:
+        with self._lock:
+            return {name: sorted(cpu for index in indexes for cpu in self.topology.cores[index]) for name, (indexes, _) in self._assigned.items()}
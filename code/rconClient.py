@@ -0,0 +1,307 @@
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import socket
+import struct
+import threading
+
+from exceptions import RCONAuthenticationFailed, RCONConnectionError
+
+#
+#   SOURCE RCON
+#
+
+class RCONPacket:
+    """
+    Source RCON packet: little endian int32 size, id and type, then a null terminated body and an empty string
+    """
+
+    SERVERDATA_AUTH: int            = 3
+    SERVERDATA_AUTH_RESPONSE: int   = 2
+    SERVERDATA_EXECCOMMAND: int     = 2
+    SERVERDATA_RESPONSE_VALUE: int  = 0
+
+    # biggest packet a server accepts (size field excluded)
+    max_size: int = 4096
+
+    header_struct = struct.Struct("<iii")
+
+    @staticmethod
+    def Encode(id: int, type: int, body: str) -> bytes:
+        data = body.encode("utf-8") + b"\0\0"
+        if 8 + len(data) > RCONPacket.max_size:
+            raise ValueError("rcon command is too long (" + str(len(data)) + " bytes)")
+        return RCONPacket.header_struct.pack(8 + len(data), id, type) + data
+
+    @staticmethod
+    def Read(sock: socket.socket) -> tuple:
+        """
+        returns (id, type, body) of the next packet
+        """
+        size = struct.unpack("<i", RCONPacket._ReadExactly(sock, 4))[0]
+        if size < 10 or size > RCONPacket.max_size + 8192:
+            raise RCONConnectionError("invalid rcon packet size " + str(size))
+
+        data = RCONPacket._ReadExactly(sock, size)
+        id, type = struct.unpack_from("<ii", data, 0)
+
+        return id, type, data[8:].split(b"\0", 1)[0].decode("utf-8", errors = "replace")
+
+    @staticmethod
+    def _ReadExactly(sock: socket.socket, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise RCONConnectionError("connection closed by server")
+            data += chunk
+        return bytes(data)
+
+
+class RCONClient:
+    """
+    Source RCON client keeping one authenticated tcp connection to a server
+    commands are pipelined: they are written as soon as they are sent and a reader thread matches answers
+    to commands by request id, each command is followed by an empty SERVERDATA_RESPONSE_VALUE packet that the server
+    mirrors once the whole (possibly multi packet) answer of the command was sent
+    a broken connection is opened again on the next command
+
+    usage:
+        client = RCONClient.ForServer("127.0.0.1", 27015, password)
+        print(client.Execute("status"))
+    """
+
+    # shared clients, one per server (see ForServer)
+    clients: map = {}
+    clients_lock = threading.Lock()
+
+    def __init__(self, host: str, port: int, password: str, timeout: float = 5.0):
+        self.host       = host
+        self.port       = int(port)
+        self.password   = password
+        self.timeout    = timeout
+
+        self._lock      = threading.Lock() # connection state and writes
+        self._socket    = None
+        self._reader    = None
+        self._nextId    = 1
+        self._pending   = {} # command id -> [future, answer parts, terminator id]
+        self._terminators = {} # terminator id -> command id
+
+    @staticmethod
+    def ForServer(host: str, port: int, password: str, timeout: float = 5.0):
+        """
+        shared client of a server, so every caller reuses the same connection
+        """
+        key = (host, int(port))
+
+        with RCONClient.clients_lock:
+            client = RCONClient.clients.get(key)
+            if client is None or client.password != password:
+                if client is not None:
+                    client.Close()
+                client = RCONClient.clients[key] = RCONClient(host, port, password, timeout)
+            return client
+
+    @staticmethod
+    def CloseServer(host: str, port: int):
+        """
+        close the shared client of a server (stopped), the clients of the other servers are left alone
+        """
+        with RCONClient.clients_lock:
+            client = RCONClient.clients.pop((host, int(port)), None)
+        if client is not None:
+            client.Close()
+
+    @staticmethod
+    def CloseAll():
+        with RCONClient.clients_lock:
+            clients = list(RCONClient.clients.values())
+            RCONClient.clients = {}
+        for client in clients:
+            client.Close()
+
+    def __enter__(self):
+        self.Connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    @property
+    def connected(self) -> bool:
+        return self._socket is not None
+
+    def _NewId(self) -> int:
+        id = self._nextId
+        self._nextId = self._nextId + 1 if self._nextId < 0x7FFFFFFF else 1
+        return id
+
+    def Connect(self):
+        """
+        Open and authenticate the connection if it isn't already
+        """
+        with self._lock:
+            if self._socket is not None:
+                return
+
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout = self.timeout)
+            except OSError as e:
+                raise RCONConnectionError("can't connect to " + self.host + ":" + str(self.port) + ": " + str(e)) from e
+
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+                authId = self._NewId()
+                sock.sendall(RCONPacket.Encode(authId, RCONPacket.SERVERDATA_AUTH, self.password))
+
+                # servers send an empty SERVERDATA_RESPONSE_VALUE before the auth response
+                while True:
+                    id, type, _ = RCONPacket.Read(sock)
+                    if type == RCONPacket.SERVERDATA_AUTH_RESPONSE:
+                        break
+
+                if id == -1 or id != authId:
+                    raise RCONAuthenticationFailed(self.host + ":" + str(self.port) + " refused the rcon password")
+            except (OSError, RCONConnectionError, RCONAuthenticationFailed) as e:
+                sock.close()
+                if isinstance(e, OSError):
+                    raise RCONConnectionError("rcon authentication failed: " + str(e)) from e
+                raise
+
+            # the reader blocks on recv, commands have their own timeout
+            sock.settimeout(None)
+            self._socket = sock
+            self._reader = threading.Thread(target = self._ReadLoop, args = (sock,), daemon = True)
+            self._reader.start()
+
+    def Close(self):
+        with self._lock:
+            sock = self._socket
+            self._socket = None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self._FailPending(RCONConnectionError("rcon connection closed"))
+
+    def _FailPending(self, error: Exception):
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending = {}
+            self._terminators = {}
+        for future, _, _ in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def _ReadLoop(self, sock: socket.socket):
+        try:
+            while True:
+                id, type, body = RCONPacket.Read(sock)
+                if type != RCONPacket.SERVERDATA_RESPONSE_VALUE:
+                    continue
+
+                with self._lock:
+                    if id in self._pending:
+                        self._pending[id][1].append(body)
+                        continue
+
+                    commandId = self._terminators.pop(id, None)
+                    entry = self._pending.pop(commandId, None) if commandId is not None else None
+
+                # answers to terminators that are already resolved (the 0x01000000 packet) end up ignored here
+                if entry is not None and not entry[0].done():
+                    entry[0].set_result("".join(entry[1]))
+        except (OSError, RCONConnectionError) as e:
+            with self._lock:
+                current = self._socket is sock
+                if current:
+                    self._socket = None
+            sock.close()
+
+            # after Close() (or a reconnection) pending commands are not this connection's anymore
+            if current:
+                self._FailPending(e if isinstance(e, RCONConnectionError) else RCONConnectionError(str(e)))
+
+    def _Send(self, command: str) -> tuple:
+        """
+        returns (command id, Future of the answer), raises RCONConnectionError when the command could not be written
+        """
+        self.Connect()
+
+        future = Future()
+        with self._lock:
+            if self._socket is None:
+                raise RCONConnectionError("rcon connection closed")
+
+            commandId = self._NewId()
+            terminatorId = self._NewId()
+            data = RCONPacket.Encode(commandId, RCONPacket.SERVERDATA_EXECCOMMAND, command) + RCONPacket.Encode(terminatorId, RCONPacket.SERVERDATA_RESPONSE_VALUE, "")
+
+            self._pending[commandId] = [future, [], terminatorId]
+            self._terminators[terminatorId] = commandId
+
+            try:
+                self._socket.sendall(data)
+            except OSError as e:
+                self._pending.pop(commandId, None)
+                self._terminators.pop(terminatorId, None)
+                raise RCONConnectionError(str(e)) from e
+
+        return commandId, future
+
+    def Send(self, command: str) -> Future:
+        """
+        Send a command without waiting for its answer, returns a Future of the answer
+        """
+        return self._Send(command)[1]
+
+    def Cancel(self, commandId: int):
+        """
+        Forget a command whose answer is not awaited anymore (timed out), its answer is ignored if it still comes
+        """
+        with self._lock:
+            entry = self._pending.pop(commandId, None)
+            if entry is not None:
+                self._terminators.pop(entry[2], None)
+        if entry is not None:
+            entry[0].cancel()
+
+    def _Result(self, commandId: int, future: Future, timeout: float) -> str:
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            self.Cancel(commandId)
+            raise
+
+    def Execute(self, command: str, timeout: float = None) -> str:
+        """
+        Send a command and wait for its answer, the command is sent once more on a new connection
+        if the connection turned out to be broken before it was written (never once it went out: it may have run)
+        """
+        if timeout is None: timeout = self.timeout
+
+        for attempt in range(2):
+            try:
+                commandId, future = self._Send(command)
+                break
+            except RCONConnectionError:
+                if attempt == 1:
+                    raise
+                self.Close()
+
+        return self._Result(commandId, future, timeout)
+
+    def ExecuteMany(self, commands: list, timeout: float = None) -> list:
+        """
+        Pipeline several commands, returns their answers in the same order
+        """
+        if timeout is None: timeout = self.timeout
+
+        sent = [self._Send(command) for command in commands]
+        try:
+            return [self._Result(commandId, future, timeout) for commandId, future in sent]
+        finally:
+            for commandId, _ in sent:
+                self.Cancel(commandId)
@@ -0,0 +1,84 @@
+import threading
+
+#
+#   REQUEST COALESCER
+#
+
+class _Flight:
+    """
+    one running fetch, shared by every caller waiting on one of its ids
+    """
+
+    def __init__(self):
+        self.done       = threading.Event()
+        self.results    = {}
+        self.error      = None
+
+
+class RequestCoalescer:
+    """
+    Single flight lookups of ids
+    fetch(ids) -> map of id to result, ids missing from the map are considered not found
+    ids already being fetched by another caller are waited for instead of being fetched again,
+    so concurrent callers with overlapping ids only fetch each id once
+    """
+
+    def __init__(self, fetch, key = int):
+        self.fetch  = fetch
+        self.key    = key
+
+        self._lock          = threading.Lock()
+        self._inFlight: map = {} # id -> _Flight
+
+    def Get(self, ids: list) -> map:
+        """
+        returns map of id to result for every requested id that was found
+        """
+        # deduplicated, in order (a dict: large id lists)
+        keys = list(dict.fromkeys(self.key(id) for id in ids))
+
+        ownKeys = []
+        otherFlights: map = {} # _Flight -> ids waited on
+
+        with self._lock:
+            for key in keys:
+                flight = self._inFlight.get(key)
+                if flight is None:
+                    ownKeys.append(key)
+                else:
+                    otherFlights.setdefault(flight, []).append(key)
+
+            if len(ownKeys) != 0:
+                ownFlight = _Flight()
+                for key in ownKeys:
+                    self._inFlight[key] = ownFlight
+
+        results = {}
+
+        if len(ownKeys) != 0:
+            try:
+                ownFlight.results = self.fetch(ownKeys)
+            except BaseException as e:
+                ownFlight.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in ownKeys:
+                        if self._inFlight.get(key) is ownFlight:
+                            del self._inFlight[key]
+                ownFlight.done.set()
+
+            for key in ownKeys:
+                if key in ownFlight.results:
+                    results[key] = ownFlight.results[key]
+
+        for flight, flightKeys in otherFlights.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+
+            for key in flightKeys:
+                if key in flight.results:
+                    results[key] = flight.results[key]
+
+        return results
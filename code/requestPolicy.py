@@ -0,0 +1,162 @@
+import asyncio
+from email.utils import parsedate_to_datetime
+from http import client
+import random
+import threading
+import time
+
+from exceptions import SteamWebAPIRequestFailed
+
+#
+#   REQUEST POLICY
+#
+
+class TokenBucket:
+    """
+    Thread safe token bucket rate limiter
+    rate tokens are added every second, up to capacity (the allowed burst)
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate       = rate
+        self.capacity   = capacity
+
+        self._lock      = threading.Lock()
+        self._tokens    = capacity
+        self._updated   = time.monotonic()
+
+    def Reserve(self, tokens: float = 1) -> float:
+        """
+        Take tokens from the bucket, returns how many seconds the caller has to wait before using them
+        reserving never blocks so it can be used from threads and event loops alike
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def Acquire(self, tokens: float = 1):
+        """
+        Take tokens from the bucket, sleeping until they are available
+        """
+        delay = self.Reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RequestPolicy:
+    """
+    Timeouts, retries and rate limiting shared by every steam web api request
+    failed attempts (network errors, 429 and 5xx answers) are sent again after a jittered
+    exponential backoff, or after the Retry-After delay asked by the server if it is longer
+    every attempt takes a token from the shared bucket
+    """
+
+    retryable_statuses: tuple = (429, 500, 502, 503, 504)
+    retryable_errors: tuple = (OSError, client.HTTPException, asyncio.TimeoutError)
+
+    def __init__(self, connectTimeout: float = 5.0, readTimeout: float = 15.0, maxRetries: int = 3, baseDelay: float = 0.5, maxDelay: float = 8.0, rate: float = 5.0, burst: float = 10.0):
+        self.connectTimeout = connectTimeout
+        self.readTimeout    = readTimeout
+        self.maxRetries     = maxRetries
+        self.baseDelay      = baseDelay
+        self.maxDelay       = maxDelay
+
+        self.bucket         = TokenBucket(rate, burst)
+
+    @staticmethod
+    def ParseRetryAfter(value: str) -> float:
+        """
+        Retry-After header value (seconds or http date) to seconds, None if missing or invalid
+        """
+        if not value:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def RetryDelay(self, attempt: int, retryAfter: float = None) -> float:
+        """
+        seconds to wait before attempt number attempt + 1 (full jitter exponential backoff)
+        """
+        delay = random.uniform(0, min(self.maxDelay, self.baseDelay * (2 ** attempt)))
+
+        if retryAfter is not None:
+            delay = max(delay, min(retryAfter, self.maxDelay * 4))
+
+        return delay
+
+    def _CheckResponse(self, response, attempt: int) -> float:
+        """
+        returns None when the response can be used, otherwise the delay before trying again
+        raises once retries are exhausted
+        """
+        if response.status not in RequestPolicy.retryable_statuses:
+            return None
+
+        retryAfter = RequestPolicy.ParseRetryAfter(response.headers.get("retry-after"))
+
+        if attempt >= self.maxRetries:
+            raise SteamWebAPIRequestFailed(response.status, retryAfter)
+
+        return self.RetryDelay(attempt, retryAfter)
+
+    def Run(self, send):
+        """
+        send() -> response with status and headers, called until it succeeds or retries are exhausted
+        """
+        attempt: int = 0
+
+        while True:
+            self.bucket.Acquire()
+
+            try:
+                response = send()
+            except RequestPolicy.retryable_errors:
+                if attempt >= self.maxRetries:
+                    raise
+                delay = self.RetryDelay(attempt)
+            else:
+                delay = self._CheckResponse(response, attempt)
+                if delay is None:
+                    return response
+
+            time.sleep(delay)
+            attempt += 1
+
+    async def RunAsync(self, send):
+        """
+        Run for coroutines, send() -> awaitable response
+        """
+        attempt: int = 0
+
+        while True:
+            delay = self.bucket.Reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                response = await send()
+            except RequestPolicy.retryable_errors:
+                if attempt >= self.maxRetries:
+                    raise
+                delay = self.RetryDelay(attempt)
+            else:
+                delay = self._CheckResponse(response, attempt)
+                if delay is None:
+                    return response
+
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,154 @@
+import json
+import mmap
+import os
+import re
+import zlib
+
+#
+#   LOG SEGMENT INDEX
+#
+
+class SegmentIndex:
+    """
+    Index of a rotated server log segment, kept next to it (server-YYYYmmdd-HHMMSS.idx)
+    the segment is cut in blocks of about blockSize bytes of whole lines, each compressed as its own gzip member
+    (the .log.gz stays a regular gzip file) so that one block can be read without the ones before it
+    for every block the index holds the time of its first and last line (sparse time index) and a bloom filter of its
+    lowercased words (runs of letters, digits and _): a block can only hold a word when its bits are set
+    (words rather than trigrams: logs are full of numbers, every digit trigram is in every block)
+
+    file: magic, a json line {"compressed", "bloomBits", "blocks": [[first time, last time, offset, length, raw length], ...]},
+    then the bloom filters, bloomBits / 8 bytes per block
+    """
+
+    magic: bytes = b"CS2LOGIDX1\n"
+    block_size: int = 1024 * 1024
+    bloom_bits: int = 1 << 17 # power of two, up to 1 << 17 (two positions come out of one crc32), ~2% false positives for 10000 words
+    word_pattern = re.compile(rb"\w+")
+
+    def __init__(self, compressed: bool, blocks: list, bloomBits: int, data, bloomOffset: int):
+        self.compressed     = compressed
+        self.blocks         = blocks
+        self.bloomBits      = bloomBits
+        self._data          = data          # mmap of the index file
+        self._bloomOffset   = bloomOffset
+
+    @staticmethod
+    def IndexPath(segmentPath: str) -> str:
+        path = segmentPath[:-3] if segmentPath.endswith(".gz") else segmentPath
+        return path[:-4] + ".idx"
+
+    @staticmethod
+    def Words(data: bytes) -> set:
+        return set(SegmentIndex.word_pattern.findall(data.lower()))
+
+    @staticmethod
+    def _BloomPositions(word: bytes, bloomBits: int) -> tuple:
+        crc = zlib.crc32(word)
+        return crc & (bloomBits - 1), (crc >> 15) & (bloomBits - 1)
+
+    @staticmethod
+    def Build(path: str, compress: bool = True, blockSize: int = None, bloomBits: int = None) -> str:
+        """
+        Index a rotated segment (plain text), compressing it block by block when compress is set
+        returns the path of the segment (path + ".gz" once compressed, the plain file is removed)
+        """
+        if blockSize is None: blockSize = SegmentIndex.block_size
+        if bloomBits is None: bloomBits = SegmentIndex.bloom_bits
+
+        blocks, blooms = [], []
+        offset = 0
+        destination = open(path + ".gz.tmp", "wb") if compress else None
+        try:
+            with open(path, "rb") as source:
+                while True:
+                    raw = source.read(blockSize)
+                    if raw == b"":
+                        break
+                    if not raw.endswith(b"\n"):
+                        raw += source.readline()
+
+                    lastLine = raw.rfind(b"\n", 0, len(raw) - 1) + 1
+                    bloom = bytearray(bloomBits // 8)
+                    for word in SegmentIndex.Words(raw):
+                        for position in SegmentIndex._BloomPositions(word, bloomBits):
+                            bloom[position >> 3] |= 1 << (position & 7)
+
+                    length = len(raw)
+                    if compress:
+                        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # 31: gzip header and trailer
+                        data = compressor.compress(raw) + compressor.flush()
+                        destination.write(data)
+                        length = len(data)
+
+                    blocks.append([raw[:19].decode("ascii", "replace"), raw[lastLine:lastLine + 19].decode("ascii", "replace"), offset, length, len(raw)])
+                    blooms.append(bloom)
+                    offset += length
+        finally:
+            if destination is not None:
+                destination.close()
+
+        # the .gz comes first: while the plain file is still there, readers skip it for the .gz, never pairing it with this index
+        if compress:
+            os.replace(path + ".gz.tmp", path + ".gz")
+
+        indexPath = SegmentIndex.IndexPath(path)
+        with open(indexPath + ".tmp", "wb") as f:
+            f.write(SegmentIndex.magic + json.dumps({"compressed":compress, "bloomBits":bloomBits, "blocks":blocks}).encode("utf-8") + b"\n")
+            for bloom in blooms:
+                f.write(bloom)
+        os.replace(indexPath + ".tmp", indexPath)
+
+        if not compress:
+            return path
+        os.remove(path)
+        return path + ".gz"
+
+    @staticmethod
+    def Load(indexPath: str):
+        """
+        Map an index file, None when it is missing or not an index
+        """
+        try:
+            with open(indexPath, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        headerEnd = data.find(b"\n", len(SegmentIndex.magic))
+        if data[:len(SegmentIndex.magic)] != SegmentIndex.magic or headerEnd == -1:
+            data.close()
+            return None
+        try:
+            header = json.loads(data[len(SegmentIndex.magic):headerEnd])
+            return SegmentIndex(header["compressed"], header["blocks"], header["bloomBits"], data, headerEnd + 1)
+        except (ValueError, KeyError):
+            data.close()
+            return None
+
+    def Close(self):
+        self._data.close()
+
+    def Candidates(self, words: set, first: str = None, last: str = None) -> list:
+        """
+        blocks that can hold lines between the times first and last ("YYYY-mm-dd HH:MM:SS") with every (lowercased) word
+        """
+        positions = [position for word in words for position in SegmentIndex._BloomPositions(word, self.bloomBits)]
+        bloomSize = self.bloomBits // 8
+
+        candidates = []
+        for block, (firstTime, lastTime, _, _, _) in enumerate(self.blocks):
+            if (first is not None and lastTime < first) or (last is not None and firstTime > last):
+                continue
+            base = self._bloomOffset + block * bloomSize
+            if all(self._data[base + (position >> 3)] & (1 << (position & 7)) for position in positions):
+                candidates.append(block)
+        return candidates
+
+    def Read(self, segment, block: int) -> bytes:
+        """
+        text of a block from the (mapped) segment
+        """
+        _, _, offset, length, _ = self.blocks[block]
+        data = segment[offset:offset + length]
+        return zlib.decompress(data, 31) if self.compressed else data
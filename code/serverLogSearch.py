@@ -0,0 +1,258 @@
+import gzip
+import mmap
+import os
+import re
+import time
+import zlib
+
+from serverLogIndex import SegmentIndex
+from serverLogWriter import ServerLogWriter
+
+#
+#   SERVER LOG SEARCH
+#
+
+class LogSearch:
+    """
+    Searches the server logs written by ServerLogWriter (directory/name/) with a regular expression, within a time range
+    rotated segments are read through their SegmentIndex: only the blocks of the time range that hold every word the pattern
+    requires (whole words: between other characters or \\b, like \\b76561198012345678\\b) are decompressed,
+    the current segment (and segments without index) are scanned whole
+    segments and indexes are memory mapped, results come as they are found, oldest first for every instance
+
+    usage:
+        search = LogSearch(ServerLogWriter.default_directory)
+        for name, line in search.Search(r"\b76561198012345678\b", start = time.time() - 30 * 24 * 3600):
+            print(name, line)
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        # of the last search
+        self.blocksIndexed: int = 0 # blocks of the indexed segments in the time range
+        self.blocksRead: int    = 0 # blocks decompressed and scanned
+        self.filesScanned: int  = 0 # segments without index scanned whole
+        self.unreadable: int    = 0 # blocks and segments that could not be decompressed (damaged)
+
+    @staticmethod
+    def RequiredWords(pattern: str) -> set:
+        """
+        lowercased words every match of a regular expression holds whole (conservative: none when unsure)
+        taken from the plain characters outside groups and classes, words between two other characters or next to a \\b
+        """
+        if "|" in pattern or "(?x" in pattern:
+            # alternatives, verbose patterns
+            return set()
+
+        runs = [] # (text, bounded on the left, bounded on the right)
+        current, leftBound = "", False
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            literal, boundary = None, False
+
+            if char == "\\":
+                escaped = pattern[i + 1:i + 2]
+                if escaped == "b":
+                    boundary = True
+                elif escaped != "" and not escaped.isalnum():
+                    literal = escaped
+                i += 2
+            elif char == "[":
+                # a class, up to its closing bracket (which can be its first character)
+                i += 1
+                if pattern[i:i + 1] == "^":
+                    i += 1
+                if pattern[i:i + 1] == "]":
+                    i += 1
+                while i < len(pattern) and pattern[i] != "]":
+                    i += 2 if pattern[i] == "\\" else 1
+                i += 1
+            elif char == "(":
+                # a group, up to its closing parenthesis
+                depth = 0
+                while i < len(pattern):
+                    if pattern[i] == "\\":
+                        i += 1
+                    elif pattern[i] == "(":
+                        depth += 1
+                    elif pattern[i] == ")":
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    i += 1
+                i += 1
+            elif char in ".^$*+?{})]":
+                i += 1
+            else:
+                literal = char
+                i += 1
+
+            # a character made optional by a quantifier is not required
+            if literal is not None and pattern[i:i + 1] in ("*", "?", "{"):
+                literal = None
+
+            if literal is None:
+                if current != "":
+                    runs.append((current, leftBound, boundary))
+                current, leftBound = "", boundary
+            else:
+                current += literal
+                if pattern[i:i + 1] == "+":
+                    # repeated: what follows is not next to it
+                    runs.append((current, leftBound, False))
+                    current, leftBound = "", False
+        if current != "":
+            runs.append((current, leftBound, False))
+
+        words = set()
+        for text, left, right in runs:
+            data = text.encode("utf-8").lower()
+            for match in SegmentIndex.word_pattern.finditer(data):
+                if (match.start() > 0 or left) and (match.end() < len(data) or right):
+                    words.add(match.group())
+        return words
+
+    @staticmethod
+    def _Stamp(timestamp: float) -> str:
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp is not None else None
+
+    def Names(self) -> list:
+        """
+        instances with logs
+        """
+        try:
+            return sorted(entry.name for entry in os.scandir(self.directory) if entry.is_dir())
+        except OSError:
+            return []
+
+    def Segments(self, name: str) -> list:
+        """
+        segments of an instance, oldest first, as (path, time of their first line "YYYY-mm-dd HH:MM:SS", index path or None)
+        the current segment comes last, without time
+        """
+        directory = os.path.join(self.directory, name)
+        segments, current = {}, None
+
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return []
+        names = set(entry.name for entry in entries)
+
+        for entry in entries:
+            if entry.name == ServerLogWriter.current_name:
+                current = (entry.path, None, None)
+                continue
+
+            match = ServerLogWriter.segment_pattern.match(entry.name)
+            if match is None:
+                continue
+            key = (match.group(1), int(match.group(2) or 0))
+            # the plain file of a segment being compressed is still there for a moment
+            if match.group(3) is None and entry.name + ".gz" in names:
+                continue
+
+            indexPath = SegmentIndex.IndexPath(entry.path)
+            start = time.strftime("%Y-%m-%d %H:%M:%S", time.strptime(match.group(1), "%Y%m%d-%H%M%S"))
+            segments[key] = (entry.path, start, indexPath if os.path.basename(indexPath) in names else None)
+
+        ordered = [segments[key] for key in sorted(segments.keys())]
+        return ordered + [current] if current is not None else ordered
+
+    @staticmethod
+    def _Lines(data, regex, first: str, last: str):
+        """
+        lines of data with a match, between the times first and last
+        """
+        position = 0
+        while True:
+            match = regex.search(data, position)
+            if match is None:
+                return
+
+            start = data.rfind(b"\n", 0, match.start()) + 1
+            end = data.find(b"\n", match.end())
+            if end == -1:
+                end = len(data)
+
+            line = data[start:end]
+            stamp = line[:19].decode("ascii", "replace")
+            if (first is None or stamp >= first) and (last is None or stamp <= last):
+                yield line
+
+            position = end + 1
+            if position > len(data):
+                return
+
+    def _SearchSegment(self, path: str, indexPath: str, regex, words: set, first: str, last: str):
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                segment = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        except OSError:
+            # removed by the retention or compressed meanwhile
+            return
+
+        compressed = path.endswith(".gz")
+        index = SegmentIndex.Load(indexPath) if indexPath is not None else None
+        if index is not None and index.compressed != compressed:
+            # an index of the other form of the segment (rotation in progress), its offsets don't match this file
+            index.Close()
+            index = None
+        try:
+            if index is None:
+                self.filesScanned += 1
+                try:
+                    data = gzip.decompress(segment) if compressed else segment
+                except (zlib.error, EOFError, gzip.BadGzipFile):
+                    self.unreadable += 1
+                    return
+                yield from LogSearch._Lines(data, regex, first, last)
+                return
+
+            self.blocksIndexed += sum(1 for firstTime, lastTime, _, _, _ in index.blocks
+                if (first is None or lastTime >= first) and (last is None or firstTime <= last))
+            for block in index.Candidates(words, first, last):
+                self.blocksRead += 1
+                try:
+                    data = index.Read(segment, block)
+                except (zlib.error, EOFError):
+                    self.unreadable += 1
+                    continue
+                yield from LogSearch._Lines(data, regex, first, last)
+        finally:
+            if index is not None:
+                index.Close()
+            segment.close()
+
+    def Search(self, pattern: str, start: float = None, end: float = None, names: list = None, ignoreCase: bool = True, limit: int = None):
+        """
+        Lines matching the regular expression pattern (an empty one matches every line) written between the times start and end,
+        yields (instance name, line with its time), at most limit of them
+        """
+        if names is None: names = self.Names()
+
+        regex = re.compile(pattern.encode("utf-8"), re.IGNORECASE if ignoreCase else 0)
+        words = LogSearch.RequiredWords(pattern)
+        first, last = LogSearch._Stamp(start), LogSearch._Stamp(end)
+
+        self.blocksIndexed, self.blocksRead, self.filesScanned, self.unreadable = 0, 0, 0, 0
+        count = 0
+        for name in names:
+            segments = self.Segments(name)
+            for i, (path, segmentStart, indexPath) in enumerate(segments):
+                if last is not None and segmentStart is not None and segmentStart > last:
+                    break
+                # a segment ends where the next one starts
+                nextStart = segments[i + 1][1] if i + 1 < len(segments) else None
+                if first is not None and nextStart is not None and nextStart < first:
+                    continue
+
+                for line in self._SearchSegment(path, indexPath, regex, words, first, last):
+                    yield name, line.decode("utf-8", "replace")
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
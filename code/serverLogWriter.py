@@ -0,0 +1,289 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import threading
+import time
+
+from serverLogIndex import SegmentIndex
+
+#
+#   SERVER LOG FILES
+#
+
+class ServerLogWriter:
+    """
+    Persists the output of a server instance in directory/name/, written by a background thread
+    Write() only stamps the line and queues it (at most maxPending lines wait, the next ones are dropped and counted),
+    the writer thread writes what is queued every flushInterval seconds in one write
+    the current segment (server.log) is rotated once it holds maxBytes or is maxAge seconds old, rotated segments
+    (server-YYYYmmdd-HHMMSS.log, named after their first line) are indexed and gzipped by another thread (SegmentIndex),
+    then the oldest ones are deleted while the segments take more than retentionBytes or are older than retentionAge seconds
+    every line starts with its local time: "YYYY-mm-dd HH:MM:SS.mmm "
+    a batch that fails to be written (disk full, directory removed) is counted in errors and written again with the next one,
+    on a segment opened again
+
+    usage:
+        writer = ServerLogWriter(ServerLogWriter.default_directory, "retake").Start()
+        writer.Write(line)
+        writer.Stop()
+    """
+
+    default_directory: str = os.path.join(os.path.expanduser("~"), ".cs2servermaker", "logs")
+
+    current_name: str = "server.log"
+    segment_pattern = re.compile(r"^server-(\d{8}-\d{6})(?:-(\d+))?\.log(\.gz)?$")
+
+    def __init__(self, directory: str, name: str, maxBytes: int = 64 * 1024 * 1024, maxAge: float = 24 * 3600, retentionBytes: int = 2 * 1024 ** 3,
+                 retentionAge: float = 30 * 24 * 3600, compress: bool = True, flushInterval: float = 0.5, maxPending: int = 200000):
+        self.directory      = os.path.join(directory, name)
+        self.name           = name
+        self.maxBytes       = maxBytes
+        self.maxAge         = maxAge
+        self.retentionBytes = retentionBytes
+        self.retentionAge   = retentionAge
+        self.compress       = compress
+        self.flushInterval  = flushInterval
+        self.maxPending     = maxPending
+
+        self.written: int   = 0 # lines written to disk
+        self.dropped: int   = 0 # lines dropped because the writer fell behind
+        self.rotations: int = 0
+        self.errors: int    = 0 # batches that could not be written
+        self.lastError: str = ""
+
+        self._pending       = deque()           # (time.time(), line)
+        self._pendingLock   = threading.Lock()  # the queue length check and dropped count go together
+        self._wake          = threading.Event()
+        self._stopped       = False
+        self._thread        = None
+        self._compressor    = None
+        self._file          = None
+        self._segmentStart  = 0.0               # time of the first line of the current segment
+        self._segmentSize   = 0
+        self._stampSecond   = None              # cache of the "YYYY-mm-dd HH:MM:SS" of a second
+        self._stampText     = ""
+
+    @property
+    def currentPath(self) -> str:
+        return os.path.join(self.directory, ServerLogWriter.current_name)
+
+    def Write(self, line: str):
+        """
+        Queue a line, never waits for the disk (any thread)
+        """
+        with self._pendingLock:
+            if len(self._pending) >= self.maxPending:
+                self.dropped += 1
+                return
+            self._pending.append((time.time(), line))
+
+    def Flush(self):
+        """
+        Ask the writer to write what is queued now instead of at its next interval
+        """
+        self._wake.set()
+
+    def Start(self):
+        os.makedirs(self.directory, exist_ok = True)
+        self._compressor = ThreadPoolExecutor(max_workers = 1)
+        self._stopped = False
+
+        # a segment left by a launcher that did not stop cleanly
+        if os.path.exists(self.currentPath):
+            self._RotateFile(self._FirstLineTime(self.currentPath))
+
+        self._thread = threading.Thread(target = self._Run, daemon = True)
+        self._thread.start()
+        return self
+
+    def Stop(self):
+        """
+        Write what is queued, close the segment and wait for pending compressions
+        """
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._compressor is not None:
+            self._compressor.shutdown(wait = True)
+            self._compressor = None
+
+    #
+    #   WRITER THREAD
+    #
+
+    def _Stamp(self, timestamp: float) -> str:
+        second = int(timestamp)
+        if second != self._stampSecond:
+            self._stampSecond = second
+            self._stampText = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return self._stampText + ".%03d " % int((timestamp - second) * 1000)
+
+    def _Run(self):
+        while True:
+            self._wake.wait(self.flushInterval)
+            self._wake.clear()
+            stopping = self._stopped
+
+            try:
+                self._WritePending()
+            except OSError as e:
+                self._Error(e)
+                if stopping:
+                    # no next batch to write them with
+                    with self._pendingLock:
+                        self.dropped += len(self._pending)
+                        self._pending.clear()
+
+            if stopping:
+                break
+
+        self._CloseFile()
+
+    def _Error(self, error: OSError):
+        # from the writer and compression threads
+        with self._pendingLock:
+            self.errors += 1
+            self.lastError = str(error)
+
+    def _CloseFile(self):
+        file, self._file = self._file, None
+        if file is not None:
+            try:
+                file.close()
+            except OSError:
+                pass
+
+    def _Requeue(self, lines: list):
+        """
+        put lines that were not written back in front of the queue, the newest ones are dropped past maxPending
+        """
+        with self._pendingLock:
+            self._pending.extendleft(reversed(lines))
+            while len(self._pending) > self.maxPending:
+                self._pending.pop()
+                self.dropped += 1
+
+    def _WritePending(self):
+        # only what is there now, readers keep writing meanwhile
+        with self._pendingLock:
+            batch = list(self._pending)
+            self._pending.clear()
+
+        start = 0
+        try:
+            if self._file is not None and time.time() - self._segmentStart >= self.maxAge:
+                self._Rotate()
+
+            while start < len(batch):
+                if self._file is None:
+                    self._Open(batch[start][0])
+
+                # lines up to the segment size limit go in one write
+                parts = []
+                size = self._segmentSize
+                end = start
+                while end < len(batch) and (size < self.maxBytes or end == start):
+                    data = (self._Stamp(batch[end][0]) + batch[end][1] + "\n").encode("utf-8", errors = "replace")
+                    parts.append(data)
+                    size += len(data)
+                    end += 1
+
+                self._file.write(b"".join(parts))
+                self._segmentSize = size
+                self.written += end - start
+                start = end
+
+                if self._segmentSize >= self.maxBytes:
+                    self._Rotate()
+
+            if self._file is not None:
+                self._file.flush()
+        except OSError:
+            # the segment is opened again for the next batch
+            self._CloseFile()
+            self._Requeue(batch[start:])
+            raise
+
+    def _Open(self, firstLineTime: float):
+        # the directory may have been removed meanwhile
+        os.makedirs(self.directory, exist_ok = True)
+        self._file = open(self.currentPath, "ab")
+        self._segmentStart = firstLineTime
+        self._segmentSize = self._file.tell()
+
+    def _Rotate(self):
+        file, self._file = self._file, None
+        file.close()
+        self._RotateFile(self._segmentStart)
+
+    @staticmethod
+    def _FirstLineTime(path: str) -> float:
+        try:
+            with open(path, "rb") as f:
+                return time.mktime(time.strptime(f.read(19).decode("ascii"), "%Y-%m-%d %H:%M:%S"))
+        except (OSError, ValueError, UnicodeDecodeError):
+            return os.path.getmtime(path)
+
+    def _RotateFile(self, segmentStart: float):
+        """
+        rename the current segment after its first line, then index / compress it and apply the retention in the background
+        """
+        base = "server-" + time.strftime("%Y%m%d-%H%M%S", time.localtime(segmentStart))
+        path = os.path.join(self.directory, base + ".log")
+        suffix = 1
+        while os.path.exists(path) or os.path.exists(path + ".gz"):
+            path = os.path.join(self.directory, base + "-" + str(suffix) + ".log")
+            suffix += 1
+
+        os.replace(self.currentPath, path)
+        self.rotations += 1
+        self._compressor.submit(self._Finish, path)
+
+    def _Finish(self, path: str):
+        try:
+            SegmentIndex.Build(path, self.compress)
+            self.ApplyRetention()
+        except OSError as e:
+            # the segment stays as it is, searched without index
+            self._Error(e)
+
+    def Segments(self) -> list:
+        """
+        rotated segments, oldest first, as (path, size with the index, modification time)
+        """
+        segments = []
+        for entry in os.scandir(self.directory):
+            match = ServerLogWriter.segment_pattern.match(entry.name)
+            if match is not None:
+                stat = entry.stat()
+                size = stat.st_size
+                try:
+                    size += os.path.getsize(SegmentIndex.IndexPath(entry.path))
+                except OSError:
+                    pass
+                segments.append((match.group(1), int(match.group(2) or 0), entry.path, size, stat.st_mtime))
+        return [(path, size, mtime) for _, _, path, size, mtime in sorted(segments)]
+
+    def ApplyRetention(self):
+        """
+        Delete the oldest segments while they take more than retentionBytes, and the ones older than retentionAge
+        """
+        segments = self.Segments()
+        total = sum(size for _, size, _ in segments)
+        now = time.time()
+
+        for path, size, mtime in segments:
+            if total <= self.retentionBytes and now - mtime <= self.retentionAge:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            try:
+                os.remove(SegmentIndex.IndexPath(path))
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,495 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import socket
+import subprocess
+import threading
+
+from a2sQuery import A2SPoller
+from outputReader import OutputReader
+from performanceProfile import CoreAllocator, CPUTopology, PerformanceProfile
+from serverLogWriter import ServerLogWriter
+from serverWatchdog import ServerWatchdog
+from exceptions import ServerInstanceStateError, ServerPortUnavailable
+
+#
+#   SERVER INSTANCES
+#
+
+class ServerInstanceConfig:
+    """
+    Launch settings of one dedicated server instance
+    port 0 lets the ServerManager pick a free port, profile (PerformanceProfile) sets its cpus and priorities
+    """
+
+    def __init__(self, exePath: str, ip: str = "", port: int = 0, map: str = "de_dust2", gameType: str = "0", gameMode: str = "0",
+                 maxPlayers: int = 10, serverPassword: str = "", rconPassword: str = "", additionalArgs: list = None, watchdog: bool = True,
+                 profile: PerformanceProfile = None):
+        if additionalArgs is None: additionalArgs = []
+
+        self.exePath        = exePath
+        self.ip             = ip
+        self.port           = int(port)
+        self.map            = map
+        self.gameType       = str(gameType)
+        self.gameMode       = str(gameMode)
+        self.maxPlayers     = int(maxPlayers)
+        self.serverPassword = serverPassword
+        self.rconPassword   = rconPassword
+        self.additionalArgs = additionalArgs
+        self.watchdog       = watchdog
+        self.profile        = profile
+
+    def ServerDir(self) -> str:
+        """
+        cs2 install root, the working directory of the server (exe is game/bin/win64/cs2.exe)
+        """
+        return os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(self.exePath))))
+
+    def Command(self, port: int) -> list:
+        command = [self.exePath, "-dedicated"]
+        if self.ip != "":
+            command += ["-ip", self.ip]
+        command += ["-port", str(port), "+game_type", self.gameType, "+game_mode", self.gameMode, "+map", self.map, "-maxplayers", str(self.maxPlayers)]
+
+        if self.serverPassword != "":
+            command += ["+sv_password", self.serverPassword]
+        if self.rconPassword != "":
+            command += ["+rcon_password", self.rconPassword]
+
+        return command + list(self.additionalArgs)
+
+    def ToDict(self) -> map:
+        return {"exePath":self.exePath, "ip":self.ip, "port":self.port, "map":self.map, "gameType":self.gameType, "gameMode":self.gameMode,
+            "maxPlayers":self.maxPlayers, "serverPassword":self.serverPassword, "rconPassword":self.rconPassword,
+            "additionalArgs":list(self.additionalArgs), "watchdog":self.watchdog, "profile":self.profile.ToDict() if self.profile is not None else None}
+
+    @staticmethod
+    def FromDict(data: map):
+        data = dict(data)
+        if data.get("profile") is not None:
+            data["profile"] = PerformanceProfile.FromDict(data["profile"])
+        return ServerInstanceConfig(**data)
+
+
+class ServerInstance:
+    """
+    One named server managed by a ServerManager, with its state machine:
+    stopped -> starting -> running -> stopping -> stopped
+    running -> restarting -> running (watchdog), and failed when it could not be started or the watchdog gave up
+    """
+
+    STOPPED: str    = "stopped"
+    STARTING: str   = "starting"
+    RUNNING: str    = "running"
+    RESTARTING: str = "restarting"
+    STOPPING: str   = "stopping"
+    FAILED: str     = "failed"
+
+    transitions: map = {
+        STOPPED:    (STARTING,),
+        FAILED:     (STARTING, STOPPING),
+        STARTING:   (RUNNING, FAILED),
+        RUNNING:    (RESTARTING, STOPPING, FAILED),
+        RESTARTING: (RUNNING, STOPPING, FAILED),
+        STOPPING:   (STOPPED,),
+    }
+
+    def __init__(self, name: str, config: ServerInstanceConfig):
+        self.name                   = name
+        self.config                 = config
+
+        self.state: str             = ServerInstance.STOPPED
+        self.port: int              = None # port of the current (or last) run
+        self.cpus: list             = None # cpus it is pinned to, None when it is not
+        self.process                = None
+        self.watchdog               = None
+        self.log                    = None # ServerLogWriter of the current run
+        self.lastError: str         = ""
+
+        self._lock = threading.Lock()
+
+    @property
+    def queryHost(self) -> str:
+        return self.config.ip if self.config.ip != "" else "127.0.0.1"
+
+    def IsActive(self) -> bool:
+        """
+        the instance holds a port (started and not stopped / failed yet)
+        """
+        return self.state not in (ServerInstance.STOPPED, ServerInstance.FAILED)
+
+    def SetState(self, state: str) -> str:
+        """
+        move to state, returns the previous one
+        """
+        with self._lock:
+            if state not in ServerInstance.transitions[self.state]:
+                raise ServerInstanceStateError(self.name, self.state, "become " + state)
+            previous, self.state = self.state, state
+            return previous
+
+    def ToDict(self) -> map:
+        return {"name":self.name, "state":self.state, "port":self.port, "cpus":self.cpus, "pid":self.process.pid if self.process is not None else None,
+            "restarts":len(self.watchdog.history) if self.watchdog is not None else 0, "lastError":self.lastError}
+
+#
+#   SERVER MANAGER
+#
+
+class ServerManager:
+    """
+    Runs several named dedicated server instances side by side, each with its own config, port and watchdog,
+    their output is read by one OutputReader
+    ports left at 0 are picked in portRange, portStride apart (room for the tv port and co), among ports no other instance
+    holds and nothing else listens on
+    output lines are given to onOutput(name, line) and state changes / watchdog events to onEvent(name, event, message)
+    (both called from worker threads)
+    instances are queried with a shared A2SPoller (poller = False to not query them)
+    instances with a pinned PerformanceProfile get cores from a CoreAllocator built on the cpu topology of the machine,
+    the profile is applied again to every process the watchdog restarts
+    with a logDirectory, the output and events of every instance are also written to rotating files
+    (logDirectory/name/, ServerLogWriter built with logOptions)
+
+    usage:
+        manager = ServerManager(onOutput = print)
+        manager.AddInstance("retake", ServerInstanceConfig(exePath, map = "de_mirage"))
+        manager.AddInstance("surf", ServerInstanceConfig(exePath, map = "surf_utopia"))
+        manager.StartAll()
+    """
+
+    def __init__(self, portRange: tuple = (27015, 27315), portStride: int = 10, onOutput = None, onEvent = None, poller = None, watchdogOptions: map = None,
+                 coreAllocator: CoreAllocator = None, logDirectory: str = None, logOptions: map = None):
+        if watchdogOptions is None: watchdogOptions = {}
+        if logOptions is None: logOptions = {}
+
+        self.portRange          = portRange
+        self.portStride         = portStride
+        self.onOutput           = onOutput
+        self.onEvent            = onEvent
+        self.poller             = poller # None: started with the first instance
+        self.watchdogOptions    = watchdogOptions
+        self.coreAllocator      = coreAllocator # None: built from the machine topology when first needed
+        self.outputReader       = None          # reads the output of every instance, started with the first one
+        self.logDirectory       = logDirectory  # None: output is not written to disk
+        self.logOptions         = logOptions
+
+        self.instances: map     = {} # name -> ServerInstance, in insertion order
+
+        self._lock = threading.Lock()
+
+    #
+    #   INSTANCES
+    #
+
+    def AddInstance(self, name: str, config: ServerInstanceConfig) -> ServerInstance:
+        """
+        Add an instance or replace the config of a stopped one
+        """
+        with self._lock:
+            instance = self.instances.get(name)
+            if instance is None:
+                instance = self.instances[name] = ServerInstance(name, config)
+            elif instance.IsActive():
+                raise ServerInstanceStateError(name, instance.state, "change its config")
+            else:
+                instance.config = config
+            return instance
+
+    def RemoveInstance(self, name: str):
+        with self._lock:
+            instance = self.instances[name]
+            if instance.IsActive():
+                raise ServerInstanceStateError(name, instance.state, "be removed")
+            del self.instances[name]
+
+    def GetInstance(self, name: str) -> ServerInstance:
+        return self.instances.get(name)
+
+    def Names(self) -> list:
+        with self._lock:
+            return list(self.instances.keys())
+
+    def GetStatus(self, name: str):
+        """
+        last A2S status of an instance (ServerStatus), None when it is not queried
+        """
+        instance = self.instances.get(name)
+        if instance is None or instance.port is None or not self.poller:
+            return None
+        return self.poller.GetStatus(instance.queryHost, instance.port)
+
+    def Snapshot(self) -> map:
+        with self._lock:
+            instances = list(self.instances.values())
+        return {instance.name: instance.ToDict() for instance in instances}
+
+    def ConfigsToDict(self) -> map:
+        with self._lock:
+            return {name: instance.config.ToDict() for name, instance in self.instances.items()}
+
+    def _Event(self, name: str, event: str, message: str):
+        instance = self.instances.get(name)
+        if instance is not None and instance.log is not None:
+            instance.log.Write("[launcher] " + event + ": " + message)
+        if self.onEvent is not None:
+            self.onEvent(name, event, message)
+
+    def _SetState(self, instance: ServerInstance, state: str):
+        instance.SetState(state)
+        if state in (ServerInstance.STOPPED, ServerInstance.FAILED) and self.coreAllocator is not None:
+            self.coreAllocator.Release(instance.name)
+        # a failed server is not polled anymore, its port can go to another instance
+        if state == ServerInstance.FAILED and self.poller and instance.port is not None:
+            self.poller.RemoveTarget(instance.queryHost, instance.port)
+        self._Event(instance.name, "state", state)
+
+    #
+    #   PORTS
+    #
+
+    @staticmethod
+    def IsPortFree(ip: str, port: int) -> bool:
+        """
+        nothing listens on the udp (game / queries) or tcp (rcon) port
+        """
+        for type in (socket.SOCK_DGRAM, socket.SOCK_STREAM):
+            sock = socket.socket(socket.AF_INET, type)
+            try:
+                sock.bind((ip, port))
+            except OSError:
+                return False
+            finally:
+                sock.close()
+        return True
+
+    def AllocatePort(self, instance: ServerInstance) -> int:
+        """
+        Reserve the port of an instance: its configured port, or the first free one of the range
+        """
+        with self._lock:
+            instance.port = None
+            taken = set(other.port for other in self.instances.values() if other is not instance and other.IsActive())
+
+            if instance.config.port != 0:
+                candidates = [instance.config.port]
+            else:
+                candidates = range(self.portRange[0], self.portRange[1] + 1, self.portStride)
+
+            for port in candidates:
+                if port not in taken and ServerManager.IsPortFree(instance.config.ip if instance.config.ip != "" else "0.0.0.0", port):
+                    instance.port = port
+                    return port
+
+        if instance.config.port != 0:
+            raise ServerPortUnavailable("port " + str(instance.config.port) + " of " + instance.name + " is already in use")
+        raise ServerPortUnavailable("no free port left between " + str(self.portRange[0]) + " and " + str(self.portRange[1]))
+
+    #
+    #   CPUS
+    #
+
+    def AllocateCPUs(self, instance: ServerInstance) -> list:
+        """
+        Pick the cpus of an instance from its profile, None when it is not pinned
+        """
+        profile = instance.config.profile
+        instance.cpus = None
+
+        if profile is None or not profile.IsPinned():
+            return None
+
+        if profile.cpus is not None:
+            instance.cpus = sorted(profile.cpus)
+            return instance.cpus
+
+        with self._lock:
+            if self.coreAllocator is None:
+                self.coreAllocator = CoreAllocator(CPUTopology.Load())
+        instance.cpus = self.coreAllocator.Allocate(instance.name, profile.cores, profile.isolate)
+        return instance.cpus
+
+    #
+    #   PROCESSES
+    #
+
+    def _Launch(self, instance: ServerInstance):
+        """
+        Start the server process of an instance and its output reader (also the watchdog launch function)
+        """
+        creationFlags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+        profile = instance.config.profile
+        # set before exec, so every thread the server starts inherits it
+        preexec = profile.PreExec(instance.cpus) if profile is not None and os.name == "posix" else None
+
+        process = subprocess.Popen(instance.config.Command(instance.port), cwd = instance.config.ServerDir() or None,
+            stdout = subprocess.PIPE, stderr = subprocess.STDOUT, creationflags = creationFlags, preexec_fn = preexec)
+        instance.process = process
+
+        # applied to every process, restarted ones too (and reports what could not be set)
+        if profile is not None:
+            for error in profile.Apply(process.pid, instance.cpus):
+                self._Event(instance.name, "profile", error)
+
+        with self._lock:
+            if self.outputReader is None:
+                self.outputReader = OutputReader().Start()
+        self.outputReader.Add(process.stdout, lambda line: self._OnOutputLine(instance, line), lambda: self._OnOutputClosed(instance, process))
+        return process
+
+    def _OnOutputLine(self, instance: ServerInstance, line: str):
+        if instance.watchdog is not None:
+            instance.watchdog.NotifyOutput()
+        if instance.log is not None:
+            instance.log.Write(line)
+        if self.onOutput is not None:
+            self.onOutput(instance.name, line)
+
+    def _OnOutputClosed(self, instance: ServerInstance, process):
+        # waiting for the exit code would hold the shared reader
+        threading.Thread(target = self._WaitExit, args = (instance, process), daemon = True).start()
+
+    def _WaitExit(self, instance: ServerInstance, process):
+        exitCode = process.wait()
+
+        # without a watchdog nobody else notices that the server died
+        if instance.watchdog is None and instance.process is process and instance.state == ServerInstance.RUNNING:
+            instance.lastError = "server exited with code " + str(exitCode)
+            try:
+                self._SetState(instance, ServerInstance.FAILED)
+            except ServerInstanceStateError:
+                # stopped meanwhile
+                pass
+
+    def _WatchdogEvent(self, instance: ServerInstance, event: str, message: str):
+        self._Event(instance.name, event, message)
+
+        try:
+            if event == "failure" and instance.state == ServerInstance.RUNNING:
+                self._SetState(instance, ServerInstance.RESTARTING)
+            elif event == "restarted" and instance.state == ServerInstance.RESTARTING:
+                self._SetState(instance, ServerInstance.RUNNING)
+            elif event == "gave_up":
+                instance.lastError = message
+                self._SetState(instance, ServerInstance.FAILED)
+        except ServerInstanceStateError:
+            # the instance is being stopped
+            pass
+
+    def Start(self, name: str) -> ServerInstance:
+        """
+        Start an instance, returns once its process is started
+        """
+        instance = self.instances[name]
+        if self.logDirectory is not None and instance.log is None:
+            instance.log = ServerLogWriter(self.logDirectory, name, **self.logOptions).Start()
+        self._SetState(instance, ServerInstance.STARTING)
+
+        previousProcess = instance.process
+        try:
+            self.AllocatePort(instance)
+            self.AllocateCPUs(instance)
+            self._Launch(instance)
+
+            with self._lock:
+                if self.poller is None:
+                    self.poller = A2SPoller().Start()
+            if self.poller:
+                self.poller.AddTarget(instance.queryHost, instance.port)
+
+            if instance.config.watchdog:
+                statusLookup = (lambda: self.poller.GetStatus(instance.queryHost, instance.port)) if self.poller else None
+                instance.watchdog = ServerWatchdog(lambda: self._Launch(instance), statusLookup = statusLookup,
+                    onEvent = lambda event, message: self._WatchdogEvent(instance, event, message), **self.watchdogOptions)
+                instance.watchdog.Start(instance.process)
+        except Exception as e:
+            # whatever failed, the instance must not stay in STARTING nor leave its server running
+            if instance.watchdog is not None:
+                instance.watchdog.Stop()
+                instance.watchdog = None
+            if instance.process is not previousProcess:
+                ServerManager._Terminate(instance.process)
+            instance.lastError = str(e)
+            self._SetState(instance, ServerInstance.FAILED)
+            raise
+
+        instance.lastError = ""
+        self._SetState(instance, ServerInstance.RUNNING)
+        return instance
+
+    def Stop(self, name: str, timeout: float = 10.0) -> ServerInstance:
+        """
+        Stop an instance (terminate, then kill after timeout seconds)
+        """
+        instance = self.instances[name]
+
+        # first, so the stopped server is not restarted
+        if instance.watchdog is not None:
+            instance.watchdog.Stop()
+            instance.watchdog = None
+
+        self._SetState(instance, ServerInstance.STOPPING)
+
+        if self.poller and instance.port is not None:
+            self.poller.RemoveTarget(instance.queryHost, instance.port)
+
+        ServerManager._Terminate(instance.process, timeout)
+
+        self._SetState(instance, ServerInstance.STOPPED)
+        if instance.log is not None:
+            instance.log.Stop()
+            instance.log = None
+        return instance
+
+    @staticmethod
+    def _Terminate(process, timeout: float = 10.0):
+        """
+        terminate a process, then kill it after timeout seconds
+        """
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout = timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def _Parallel(self, action, names: list) -> map:
+        """
+        run action(name) for every name at once, returns {name: None or the raised exception}
+        """
+        results = {}
+        if len(names) == 0:
+            return results
+
+        with ThreadPoolExecutor(max_workers = len(names)) as executor:
+            futures = {name: executor.submit(action, name) for name in names}
+            for name, future in futures.items():
+                results[name] = future.exception()
+        return results
+
+    def StartAll(self, names: list = None) -> map:
+        """
+        Start instances in parallel (every stopped / failed one by default)
+        """
+        if names is None: names = [name for name in self.Names() if not self.instances[name].IsActive()]
+        return self._Parallel(self.Start, names)
+
+    def StopAll(self, names: list = None) -> map:
+        """
+        Stop instances in parallel (every active one by default)
+        """
+        if names is None: names = [name for name in self.Names() if self.instances[name].IsActive()]
+        return self._Parallel(self.Stop, names)
+
+    def Close(self):
+        self.StopAll()
+        if self.poller:
+            self.poller.Stop()
+        if self.outputReader is not None:
+            self.outputReader.Stop()
+
+        # failed instances keep their log until they are started or stopped again
+        for instance in self.instances.values():
+            if instance.log is not None:
+                instance.log.Stop()
+                instance.log = None
@@ -0,0 +1,219 @@
+from collections import deque
+import subprocess
+import threading
+import time
+
+from metrics import MetricsRegistry, Histogram
+
+#
+#   SERVER WATCHDOG
+#
+
+class RestartRecord:
+    """
+    One restart done (or attempted) by a ServerWatchdog
+    latency is the time between the detection of the failure and the new process being started, backoff included
+    """
+
+    def __init__(self, reason: str, detail: str, detectedAt: float, backoff: float, exitCode: int = None):
+        self.reason                 = reason
+        self.detail                 = detail
+        self.detectedAt: float      = detectedAt # time.time()
+        self.backoff: float         = backoff
+        self.exitCode: int          = exitCode
+
+        self.latency: float         = None
+        self.error: str             = "" # why the new process could not be started
+
+    def ToDict(self) -> map:
+        return {"reason":self.reason, "detail":self.detail, "detectedAt":self.detectedAt, "backoff":self.backoff, "exitCode":self.exitCode,
+            "latency":self.latency, "error":self.error}
+
+
+class ServerWatchdog:
+    """
+    Supervises a server process and starts it again when it exits, stops writing output or stops answering queries
+    launch() starts the server (with its last launch arguments) and returns its Popen, statusLookup() returns its A2SPoller ServerStatus
+    restarts are delayed by an exponential backoff while the server keeps failing (reset once it ran stableAfter seconds),
+    the watchdog gives up after maxRestarts restarts in restartWindow seconds
+    events are reported to onEvent(event, message) with event "failure", "restarted", "restart_failed" or "gave_up" (called from the watchdog thread)
+
+    usage:
+        watchdog = ServerWatchdog(lambda: subprocess.Popen(command), statusLookup = lambda: poller.GetStatus(host, port))
+        watchdog.Start()
+        ... (the stdout reader calls watchdog.NotifyOutput() for every line)
+        watchdog.Stop() # before stopping the server on purpose
+    """
+
+    EXITED: str         = "exited"
+    OUTPUT_STALLED: str = "output_stalled"
+    NOT_ANSWERING: str  = "not_answering"
+
+    def __init__(self, launch, statusLookup = None, checkInterval: float = 0.5, outputTimeout: float = None, queryTimeout: float = 60.0,
+                 startupGrace: float = 120.0, backoffBase: float = 1.0, backoffMax: float = 60.0, maxRestarts: int = 5, restartWindow: float = 600.0,
+                 stableAfter: float = 300.0, onEvent = None):
+        self.launch         = launch
+        self.statusLookup   = statusLookup
+        self.checkInterval  = checkInterval
+        self.outputTimeout  = outputTimeout # None: output is not watched (an idle server can stay quiet for a long time)
+        self.queryTimeout   = queryTimeout
+        self.startupGrace   = startupGrace  # seconds a new process has to start answering queries
+        self.backoffBase    = backoffBase
+        self.backoffMax     = backoffMax
+        self.maxRestarts    = maxRestarts
+        self.restartWindow  = restartWindow
+        self.stableAfter    = stableAfter
+        self.onEvent        = onEvent
+
+        self.process        = None
+        self.state: str     = "stopped" # "stopped", "running", "restarting" or "gave_up"
+        self.history: list  = []        # RestartRecord, oldest first
+
+        self.metrics = MetricsRegistry()
+        self.metrics.Counter("watchdog_restarts_total", "Server restarts by failure reason")
+        self.metrics.Counter("watchdog_restart_failures_total", "Restarts that could not start a new server process")
+        self.metrics.Histogram("watchdog_restart_seconds", "Seconds between a failure and the new server process, backoff included", Histogram.latency_buckets + (60.0, 120.0))
+
+        self._lock          = threading.Lock()
+        self._stopEvent     = threading.Event()
+        self._thread        = None
+        self._launchedAt    = 0.0
+        self._lastOutput    = 0.0
+        self._failures      = 0             # failures in a row, drives the backoff
+        self._restartTimes  = deque()       # time.time() of the restarts in the window
+
+    def NotifyOutput(self):
+        """
+        the server wrote a line (called by the stdout reader)
+        """
+        self._lastOutput = time.time()
+
+    def Start(self, process = None):
+        """
+        Start supervising process, or a new process from launch() when none is given
+        """
+        self.Stop()
+
+        self.process = process if process is not None else self.launch()
+        self._launchedAt = self._lastOutput = time.time()
+        self._failures = 0
+        self.state = "running"
+
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target = self._Run, daemon = True)
+        self._thread.start()
+        return self
+
+    def Stop(self):
+        """
+        Stop supervising, the process is left as it is (call it before stopping the server on purpose)
+        """
+        self._stopEvent.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout = 10)
+        self._thread = None
+        if self.state != "gave_up":
+            self.state = "stopped"
+
+    def RestartsInWindow(self) -> int:
+        now = time.time()
+        with self._lock:
+            while len(self._restartTimes) != 0 and now - self._restartTimes[0] > self.restartWindow:
+                self._restartTimes.popleft()
+            return len(self._restartTimes)
+
+    def Check(self) -> tuple:
+        """
+        (reason, detail) of the failure of the supervised process, None while it is healthy
+        """
+        now = time.time()
+        exitCode = self.process.poll()
+        if exitCode is not None:
+            return ServerWatchdog.EXITED, "server exited with code " + str(exitCode)
+
+        if self.outputTimeout is not None and now - max(self._lastOutput, self._launchedAt) > self.outputTimeout:
+            return ServerWatchdog.OUTPUT_STALLED, "no server output for " + str(int(now - self._lastOutput)) + "s"
+
+        if self.statusLookup is not None and now - self._launchedAt > self.startupGrace:
+            status = self.statusLookup()
+            lastAnswer = max(status.lastUpdate if status is not None else 0.0, self._launchedAt + self.startupGrace)
+            if now - lastAnswer > self.queryTimeout:
+                return ServerWatchdog.NOT_ANSWERING, "server not answering queries for " + str(int(now - lastAnswer)) + "s"
+
+        # the server is healthy again, the next failure is not part of a crash loop
+        if self._failures != 0 and now - self._launchedAt > self.stableAfter:
+            self._failures = 0
+
+        return None
+
+    def _Event(self, event: str, message: str):
+        if self.onEvent is not None:
+            self.onEvent(event, message)
+
+    def _Run(self):
+        while not self._stopEvent.wait(self.checkInterval):
+            failure = self.Check()
+            if failure is None:
+                continue
+
+            if not self._Restart(*failure):
+                return
+
+    @staticmethod
+    def _Kill(process):
+        """
+        end a process that hangs, terminate first then kill
+        """
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout = 10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def _Restart(self, reason: str, detail: str) -> bool:
+        """
+        Restart the process after its backoff, False once the watchdog stopped or gave up
+        """
+        detectedAt = time.time()
+        self._Event("failure", detail)
+
+        if self.RestartsInWindow() >= self.maxRestarts:
+            ServerWatchdog._Kill(self.process)
+            self.state = "gave_up"
+            self._Event("gave_up", "server failed " + str(self.maxRestarts) + " times in " + str(int(self.restartWindow)) + "s, not restarting it anymore")
+            return False
+
+        backoff = min(self.backoffMax, self.backoffBase * (2 ** (self._failures - 1))) if self._failures != 0 else 0.0
+        self._failures += 1
+
+        record = RestartRecord(reason, detail, detectedAt, backoff, self.process.poll())
+        self.history.append(record)
+        with self._lock:
+            self._restartTimes.append(detectedAt)
+
+        self.state = "restarting"
+        ServerWatchdog._Kill(self.process)
+        if self._stopEvent.wait(backoff):
+            return False
+
+        try:
+            process = self.launch()
+        except Exception as e:
+            record.error = str(e)
+            self.metrics.Increment("watchdog_restart_failures_total", {"reason":reason})
+            self._Event("restart_failed", "server could not be started again: " + str(e))
+            # the dead process stays supervised, the next check restarts it again after a longer backoff
+            return True
+
+        self.process = process
+        self._launchedAt = self._lastOutput = time.time()
+        self.state = "running"
+
+        record.latency = self._launchedAt - detectedAt
+        self.metrics.Increment("watchdog_restarts_total", {"reason":reason})
+        self.metrics.Observe("watchdog_restart_seconds", record.latency)
+        self._Event("restarted", "server restarted after " + str(round(record.latency, 1)) + "s (" + str(self.RestartsInWindow()) + "/" + str(self.maxRestarts) + " restarts in the last " + str(int(self.restartWindow)) + "s)")
+        return True
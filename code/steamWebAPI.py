@@ -1,57 +1,176 @@
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from http import client
+from urllib.parse import quote_plus
+import gzip
 import json
 import os
+import zlib
 
 from tools import Tools
-from exceptions import CollectionIsNotPublicException, CollectionNotFoundException, SteamFileElementIsAnIncompatibleMap, SteamFileElementIsNotACS2Item, SteamFileElementIsNotPublicException, SteamFileElementNotFoundException
+from connectionPool import HTTPSConnectionPool
+from requestCoalescer import RequestCoalescer
+from requestPolicy import RequestPolicy
+from metrics import Histogram, MetricsRegistry
+from exceptions import CollectionIsNotPublicException, CollectionNotFoundException, SteamFileElementIsAnIncompatibleMap, SteamFileElementIsNotACS2Item, SteamFileElementIsNotPublicException, SteamFileElementNotFoundException, SteamWebAPIRequestFailed
 from dataStructs import CSMap, SteamCollection, SteamFileElement
 
 #
 #   STEAM WEB API
 #
 
+def _NewMetricsRegistry() -> MetricsRegistry:
+    metrics = MetricsRegistry()
+
+    metrics.Counter("steam_web_api_requests_total", "Steam web api requests sent, retries included")
+    metrics.Counter("steam_web_api_errors_total", "Failed steam web api requests by error class (exception name or http_<status>)")
+    metrics.Histogram("steam_web_api_connect_seconds", "Time to open the tcp connection (tls included for the async client)")
+    metrics.Histogram("steam_web_api_tls_seconds", "Time of the tls handshake")
+    metrics.Histogram("steam_web_api_ttfb_seconds", "Time from sending the request to the first byte of the response")
+    metrics.Histogram("steam_web_api_request_seconds", "Total time of a request, waiting for a pooled connection included")
+    metrics.Histogram("steam_web_api_response_bytes", "Response body size as received (compressed)", Histogram.bytes_buckets)
+    metrics.Histogram("steam_web_api_response_items", "Items returned by a response", Histogram.count_buckets)
+    metrics.Counter("workshop_cache_lookups_total", "Workshop cache lookups by result (fresh, stale or miss)")
+
+    return metrics
+
 class SteamWebAPI:
     """
     Simple Wrapper for steam web api calls
     """
 
+    # point these at a local stand-in (see mockSteamWebAPI.py) to run without the real api
+    steam_api_scheme: str = "https"
     steam_api_base_url: str = "api.steampowered.com"
     steam_api_version: str = "v1"
 
     steam_api_ISteamRemoteStorage_endpoint: str = "ISteamRemoteStorage"
 
+    request_headers: map = {"Content-type":"application/x-www-form-urlencoded", "Accept-Encoding":"gzip, deflate"}
+
+    # keep-alive connections shared by every call
+    connection_pool: HTTPSConnectionPool = HTTPSConnectionPool()
+
+    # timeouts, retries and rate limit shared by every call
+    request_policy: RequestPolicy = RequestPolicy()
+
+    # GetPublishedFileDetailsBatched settings
+    published_file_details_chunk_size: int = 100
+    max_parallel_requests: int = 4
+    chunk_retries: int = 2
+
+    # GetNestedCollectionsDetails settings
+    max_collection_depth: int = 8
+
+    # concurrent lookups of the same ids are only sent once (see the *Coalesced calls)
+    collections_details_coalescer: RequestCoalescer = RequestCoalescer(lambda ids: {collection.id: collection for collection in SteamWebAPI.GetCollectionsDetails(len(ids), ids, raiseOnError = False)})
+    published_file_details_coalescer: RequestCoalescer = RequestCoalescer(lambda ids: {int(element.publishedfileid): element for element in SteamWebAPI.GetPublishedFileDetailsBatched(ids)})
+
+    # per endpoint latency, size, item and error metrics of every call, see metrics.py
+    metrics: MetricsRegistry = _NewMetricsRegistry()
+
+    # errors worth sending the same request again for (json errors are truncated / garbage bodies)
+    retryable_errors: tuple = (OSError, client.HTTPException, ValueError, SteamWebAPIRequestFailed)
+    # the ones request_policy does not already retry, a chunk is only sent again for those
+    chunk_retryable_errors: tuple = (ValueError,)
+
 
     @staticmethod
     def ParseData(data: map) -> str:
         """
         Parse data from map to x-www-form-urlencoded format
+        keys and values are escaped, except the [] of array keys (publishedfileids[n]) to keep big bodies compact
         """
-        datastr = ""
+        return "&".join([quote_plus(str(fieldKey), safe = "[]") + "=" + quote_plus(str(fieldValue)) for fieldKey, fieldValue in data.items()])
 
-        i: int = 0
-        for fieldKey in data.keys():
-            if(i!= 0):
-                datastr += "&"
+    @staticmethod
+    def DecodeBody(response) -> bytes:
+        """
+        Body of a response, decompressed according to its Content-Encoding (gzip / deflate)
+        """
+        encoding = (response.headers.get("content-encoding") or "identity").strip().lower()
+
+        if encoding == "gzip":
+            return gzip.decompress(response.body)
+        if encoding == "deflate":
+            try:
+                return zlib.decompress(response.body)
+            except zlib.error:
+                # some servers send raw deflate without the zlib header
+                return zlib.decompress(response.body, -zlib.MAX_WBITS)
+        return response.body
 
-            datastr += fieldKey
-            datastr += "="
-            datastr += str(data[fieldKey])
+    @staticmethod
+    def SendRequest(url: str, data: map, method = "POST", verbose: bool = False) -> map:
+        """
+        Sends HTTP request with x-www-form-urlencoded format body
+        """
+        body = SteamWebAPI.ParseData(data)
+        policy = SteamWebAPI.request_policy
+        endpoint = SteamWebAPI.EndpointName(url)
+
+        def Send():
+            SteamWebAPI.metrics.Increment("steam_web_api_requests_total", {"endpoint":endpoint})
+            try:
+                response = SteamWebAPI.connection_pool.Request(SteamWebAPI.steam_api_base_url, method, url, body = body, headers = SteamWebAPI.request_headers, connectTimeout = policy.connectTimeout, readTimeout = policy.readTimeout, scheme = SteamWebAPI.steam_api_scheme)
+            except Exception as e:
+                SteamWebAPI.RecordError(endpoint, e)
+                raise
+            SteamWebAPI.RecordResponse(endpoint, response)
+            return response
+
+        response = policy.Run(Send)
 
-            i+=1
+        try:
+            return json.loads(SteamWebAPI.DecodeBody(response))
+        except Exception as e:
+            SteamWebAPI.RecordError(endpoint, e)
+            raise
 
-        return datastr
+    #
+    #   METRICS
+    #
 
     @staticmethod
-    def SendRequest(url: str, data: map, method = "POST", verbose: bool = False) -> map:
+    def EndpointName(url: str) -> str:
         """
-        Sends HTTP request with x-www-form-urlencoded format body
+        /ISteamRemoteStorage/GetCollectionDetails/v1/ -> GetCollectionDetails
         """
-        connection = client.HTTPSConnection(SteamWebAPI.steam_api_base_url)
+        parts = [part for part in url.split("/") if part != ""]
+        return parts[1] if len(parts) >= 2 else "/".join(parts)
 
-        connection.request(method, url, body = SteamWebAPI.ParseData(data), headers = {"Content-type":"application/x-www-form-urlencoded"})
+    @staticmethod
+    def RecordResponse(endpoint: str, response):
+        """
+        Record the timings and size of a response, and its status when it is an error
+        """
+        labels = {"endpoint":endpoint}
 
-        return json.loads(connection.getresponse().read())
+        for phase, seconds in response.timings.items():
+            SteamWebAPI.metrics.Observe("steam_web_api_" + ("request" if phase == "total" else phase) + "_seconds", seconds, labels)
+        SteamWebAPI.metrics.Observe("steam_web_api_response_bytes", len(response.body), labels)
+
+        if response.status >= 400:
+            SteamWebAPI.metrics.Increment("steam_web_api_errors_total", {"endpoint":endpoint, "error":"http_" + str(response.status)})
+
+    @staticmethod
+    def RecordError(endpoint: str, error: BaseException):
+        SteamWebAPI.metrics.Increment("steam_web_api_errors_total", {"endpoint":endpoint, "error":type(error).__name__})
+
+    @staticmethod
+    def RecordItems(endpoint: str, items: list) -> list:
+        SteamWebAPI.metrics.Observe("steam_web_api_response_items", len(items), {"endpoint":endpoint})
+        return items
+
+    @staticmethod
+    def Close():
+        """
+        Close every pooled connection, next calls will open new ones
+        """
+        oldPool = SteamWebAPI.connection_pool
+        SteamWebAPI.connection_pool = HTTPSConnectionPool(oldPool.maxConnectionsPerHost, oldPool.idleTimeout, oldPool.connectTimeout, oldPool.readTimeout)
+        oldPool.Close()
     
     @staticmethod
     def TestConnectivity()-> bool:
@@ -60,9 +179,7 @@ class SteamWebAPI:
         """
         try:
             # Test Ping on Steam API
-            connection = client.HTTPSConnection(SteamWebAPI.steam_api_base_url)
-
-            connection.request("GET", "/")
+            SteamWebAPI.connection_pool.Request(SteamWebAPI.steam_api_base_url, "GET", "/", connectTimeout = SteamWebAPI.request_policy.connectTimeout, readTimeout = SteamWebAPI.request_policy.readTimeout, scheme = SteamWebAPI.steam_api_scheme)
 
             return True
         except:
@@ -73,6 +190,17 @@ class SteamWebAPI:
         """
         Sends HTTP request with x-www-form-urlencoded format body
         """
+        url, body = SteamWebAPI.BuildCollectionsDetailsRequest(collectioncount, publishedfileids)
+
+        rawData = SteamWebAPI.SendRequest(url, body, verbose = verbose)
+
+        return SteamWebAPI.ParseCollectionsDetails(rawData, publishedfileids, raiseOnError)
+
+    @staticmethod
+    def BuildCollectionsDetailsRequest(collectioncount: int, publishedfileids: list) -> tuple:
+        """
+        Build (url, body) of a GetCollectionDetails request
+        """
         url = "/" + SteamWebAPI.steam_api_ISteamRemoteStorage_endpoint + "/GetCollectionDetails/" + SteamWebAPI.steam_api_version + "/"
         body = {
             'collectioncount': collectioncount,
@@ -86,12 +214,18 @@ class SteamWebAPI:
             body['publishedfileids['+str(i)+']'] = itemId
             i+=1
 
-        rawData = SteamWebAPI.SendRequest(url, body, verbose = verbose)
+        return url, body
 
-        if(len(rawData) == 0 and raiseOnError):
-            raise CollectionNotFoundException()
+    @staticmethod
+    def ParseCollectionsDetails(rawData: map, publishedfileids: list, raiseOnError = True) -> list:
+        """
+        Build SteamCollection list from a raw GetCollectionDetails response
+        """
+        if(len(rawData) == 0):
+            if raiseOnError: raise CollectionNotFoundException()
+            return []
 
-        data = rawData["response"]["collectiondetails"]
+        data = SteamWebAPI.RecordItems("GetCollectionDetails", rawData["response"]["collectiondetails"])
 
         collectionList = []
 
@@ -102,10 +236,11 @@ class SteamWebAPI:
                 continue
 
             mapIds: list = Tools.GetValidMapsIDsFromSteamWebAPIList(collection["children"])
+            subCollectionIds: list = Tools.GetSubCollectionsIDsFromSteamWebAPIList(collection["children"])
 
 
             url = "https://steamcommunity.com/sharedfiles/filedetails/?id=" + str(collection["publishedfileid"])
-            _col = SteamCollection(int(collection["publishedfileid"]), url, "", mapIds)
+            _col = SteamCollection(int(collection["publishedfileid"]), url, "", mapIds, subCollectionIds)
 
             collectionList.append(_col)
 
@@ -126,6 +261,17 @@ class SteamWebAPI:
         """
         Sends HTTP request with x-www-form-urlencoded format body
         """
+        url, body = SteamWebAPI.BuildPublishedFileDetailsRequest(itemcount, publishedfileids)
+
+        rawData = SteamWebAPI.SendRequest(url, body, verbose = verbose)
+
+        return SteamWebAPI.ParsePublishedFileDetails(rawData, publishedfileids, raiseOnError)
+
+    @staticmethod
+    def BuildPublishedFileDetailsRequest(itemcount: int, publishedfileids: list) -> tuple:
+        """
+        Build (url, body) of a GetPublishedFileDetails request
+        """
         url = "/" + SteamWebAPI.steam_api_ISteamRemoteStorage_endpoint + "/GetPublishedFileDetails/" + SteamWebAPI.steam_api_version + "/"
         body = {
             'itemcount': itemcount,
@@ -139,12 +285,18 @@ class SteamWebAPI:
             body['publishedfileids['+str(i)+']'] = itemId
             i+=1
 
-        rawData = SteamWebAPI.SendRequest(url, body, verbose = verbose)
+        return url, body
 
-        if(len(rawData) == 0 and raiseOnError):
-            raise SteamFileElementNotFoundException()
+    @staticmethod
+    def ParsePublishedFileDetails(rawData: map, publishedfileids: list, raiseOnError = False) -> list:
+        """
+        Build SteamFileElement list from a raw GetPublishedFileDetails response
+        """
+        if(len(rawData) == 0):
+            if raiseOnError: raise SteamFileElementNotFoundException()
+            return []
 
-        data = rawData["response"]["publishedfiledetails"]
+        data = SteamWebAPI.RecordItems("GetPublishedFileDetails", rawData["response"]["publishedfiledetails"])
 
         steamElementsList = []
 
@@ -155,29 +307,218 @@ class SteamWebAPI:
                 continue
             
             fileType: str = "unkown"
+            tags: frozenset = Tools.GetTagSet(element.get("tags", []))
             
             if(element["consumer_app_id"] != 730):
                 if len(publishedfileids) and raiseOnError: raise SteamFileElementIsNotACS2Item()
                 continue
             elif(element["creator_app_id"] == 766):
                 fileType = "Collection"
-            elif(Tools.SteamFileHasTag(element["tags"], "Other")):
+            elif("Other" in tags):
                 fileType = "Other"
-            elif(not Tools.SteamFileHasTag(element["tags"], "Cs2") and not Tools.SteamFileHasTag(element["tags"], "CS2")):
+            elif("Cs2" not in tags and "CS2" not in tags):
                 if len(publishedfileids) and raiseOnError: raise SteamFileElementIsAnIncompatibleMap()
                 continue
-            elif(Tools.SteamFileHasTag(element["tags"], "Map")):
+            elif("Map" in tags):
                 fileType = "Map"
-            elif(Tools.SteamFileHasTag(element["tags"], "Weapon Finish")):
+            elif("Weapon Finish" in tags):
                 fileType = "Weapon Finish"
 
-            _steamElement = SteamFileElement(element["publishedfileid"], element["creator"], element["title"], element["description"], element["tags"], fileType)
+            _steamElement = SteamFileElement(element["publishedfileid"], element["creator"], element["title"], element["description"], element["tags"], fileType, int(element.get("time_updated", 0)), int(element.get("file_size", 0)), int(element["consumer_app_id"]))
             steamElementsList.append(_steamElement)
 
         return steamElementsList
-    
 
-    
+    @staticmethod
+    def GetPublishedFileDetailsBatched(publishedfileids: list, chunkSize: int = None, maxWorkers: int = None, retries: int = None, verbose: bool = False, raiseOnError = False) -> list:
+        """
+        GetPublishedFileDetails for large id lists
+        ids are split in chunks of chunkSize sent at the same time on at most maxWorkers threads,
+        results are merged back in the order of publishedfileids
+        only the chunks whose answer could not be read are sent again, up to retries times
+        (network errors and 429 / 5xx answers were already retried by request_policy, they are raised)
+        """
+        if chunkSize is None: chunkSize = SteamWebAPI.published_file_details_chunk_size
+        if maxWorkers is None: maxWorkers = SteamWebAPI.max_parallel_requests
+        if retries is None: retries = SteamWebAPI.chunk_retries
+
+        chunks = [publishedfileids[i:i + chunkSize] for i in range(0, len(publishedfileids), chunkSize)]
+
+        if len(chunks) == 0:
+            return []
+
+        results: list = [None] * len(chunks)
+        pending: list = list(range(len(chunks)))
+        lastError = None
+
+        with ThreadPoolExecutor(max_workers = min(maxWorkers, len(chunks))) as executor:
+            for attempt in range(retries + 1):
+                futures = {executor.submit(SteamWebAPI.GetPublishedFileDetails, len(chunks[index]), chunks[index], verbose, raiseOnError): index for index in pending}
+
+                failed = []
+                for future, index in futures.items():
+                    try:
+                        results[index] = future.result()
+                    except SteamWebAPI.chunk_retryable_errors as e:
+                        lastError = e
+                        failed.append(index)
+
+                pending = failed
+                if len(pending) == 0:
+                    break
+
+        if len(pending) != 0:
+            raise lastError
+
+        steamElementsList = []
+        for chunkResult in results:
+            steamElementsList.extend(chunkResult)
+
+        return steamElementsList
+
+    @staticmethod
+    def IterPublishedFileDetails(publishedfileids: list, chunkSize: int = None, maxWorkers: int = None, retries: int = None, verbose: bool = False, raiseOnError = False):
+        """
+        Generator version of GetPublishedFileDetailsBatched
+        yields SteamFileElement in the order of publishedfileids as soon as their chunk is resolved,
+        at most maxWorkers chunks are in flight or waiting to be consumed so memory stays flat
+        whatever the number of ids
+        """
+        if chunkSize is None: chunkSize = SteamWebAPI.published_file_details_chunk_size
+        if maxWorkers is None: maxWorkers = SteamWebAPI.max_parallel_requests
+        if retries is None: retries = SteamWebAPI.chunk_retries
+
+        with ThreadPoolExecutor(max_workers = maxWorkers) as executor:
+            inFlight = deque()
+            nextChunk: int = 0
+
+            try:
+                while len(inFlight) != 0 or nextChunk < len(publishedfileids):
+                    while nextChunk < len(publishedfileids) and len(inFlight) < maxWorkers:
+                        inFlight.append(executor.submit(SteamWebAPI._GetPublishedFileDetailsChunk, publishedfileids[nextChunk:nextChunk + chunkSize], retries, verbose, raiseOnError))
+                        nextChunk += chunkSize
+
+                    for element in inFlight.popleft().result():
+                        yield element
+            finally:
+                # consumer stopped early or a chunk failed, drop what was not sent yet
+                for future in inFlight:
+                    future.cancel()
+
+    @staticmethod
+    def _GetPublishedFileDetailsChunk(publishedfileids: list, retries: int, verbose: bool = False, raiseOnError = False) -> list:
+        for attempt in range(retries + 1):
+            try:
+                return SteamWebAPI.GetPublishedFileDetails(len(publishedfileids), publishedfileids, verbose, raiseOnError)
+            except SteamWebAPI.chunk_retryable_errors:
+                if attempt == retries:
+                    raise
+
+    @staticmethod
+    def IterMapsFromCollectionsList(collections: list):
+        """
+        Generator version of GetMapsFromCollectionsList, yields CSMap as soon as their chunk is resolved
+        """
+        mapIDs = SteamWebAPI.GetMapIdsFromCollectionsList(collections)
+
+        for file in SteamWebAPI.IterPublishedFileDetails(mapIDs):
+            if(file.fileType != "Map"):
+                continue
+
+            yield file.ToCSMap()
+
+    @staticmethod
+    def GetCollectionsDetailsCoalesced(publishedfileids: list) -> list:
+        """
+        GetCollectionsDetails shared with concurrent callers asking for the same collections
+        never raises for a single collection, missing or private collections are left out
+        """
+        ids = [itemId for itemId in publishedfileids if type(itemId) == int]
+
+        results = SteamWebAPI.collections_details_coalescer.Get(ids)
+
+        return [results[itemId] for itemId in dict.fromkeys(ids) if itemId in results]
+
+    @staticmethod
+    def GetPublishedFileDetailsCoalesced(publishedfileids: list) -> list:
+        """
+        GetPublishedFileDetailsBatched shared with concurrent callers asking for the same files
+        ids already being fetched by another caller are waited for instead of being sent again
+        """
+        ids = [int(itemId) for itemId in publishedfileids]
+
+        results = SteamWebAPI.published_file_details_coalescer.Get(ids)
+
+        return [results[itemId] for itemId in dict.fromkeys(ids) if itemId in results]
+
+    @staticmethod
+    def GetNestedCollectionsDetails(publishedfileids: list, maxDepth: int = None) -> list:
+        """
+        GetCollectionsDetails that also expands sub collections
+        the tree is resolved breadth first, every level is sent as one lookup,
+        collections already seen (cycles, shared sub collections) are not fetched again
+        and sub collections deeper than maxDepth are ignored
+        returns one SteamCollection per root collection, its mapIds holding the maps of the whole
+        sub tree (own maps first, then sub collections in order), every map only kept the first time it's found
+        """
+        if maxDepth is None: maxDepth = SteamWebAPI.max_collection_depth
+
+        roots = [itemId for itemId in dict.fromkeys(publishedfileids) if type(itemId) == int]
+
+        resolved: map = {}
+        level: list = roots
+        depth: int = 0
+
+        while len(level) != 0:
+            for collection in SteamWebAPI.GetCollectionsDetailsCoalesced(level):
+                resolved[collection.id] = collection
+
+            depth += 1
+            if depth > maxDepth:
+                break
+
+            nextLevel = []
+            for itemId in level:
+                if itemId not in resolved:
+                    continue
+                for subCollectionId in resolved[itemId].subCollectionIds:
+                    if subCollectionId in resolved or subCollectionId in nextLevel or subCollectionId in level:
+                        continue
+                    nextLevel.append(subCollectionId)
+            level = nextLevel
+
+        seenMaps: set = set()
+        flatCollections = []
+
+        for rootId in roots:
+            if rootId not in resolved:
+                continue
+
+            mapIds = []
+            visited: set = set()
+            pending: list = [rootId]
+
+            # pre order walk, own maps before the maps of sub collections
+            while len(pending) != 0:
+                collectionId = pending.pop()
+                if collectionId in visited or collectionId not in resolved:
+                    continue
+                visited.add(collectionId)
+
+                collection = resolved[collectionId]
+                for mapId in collection.mapIds:
+                    if mapId in seenMaps:
+                        continue
+                    seenMaps.add(mapId)
+                    mapIds.append(mapId)
+
+                pending.extend(reversed(collection.subCollectionIds))
+
+            root = resolved[rootId]
+            flatCollections.append(SteamCollection(root.id, root.url, root.name, mapIds, root.subCollectionIds))
+
+        return flatCollections
+
     @staticmethod
     def GetMapsFromCollectionsList(collections: list):
         """
@@ -185,6 +526,20 @@ class SteamWebAPI:
         will ignore dupplicates
         collections: list elements must be of type SteamCollection, every element not of this type will be ignored
         """
+        mapIDs = SteamWebAPI.GetMapIdsFromCollectionsList(collections)
+
+        if (mapIDs == []):
+            return []
+
+        _tmpFiles = SteamWebAPI.GetPublishedFileDetailsCoalesced(mapIDs)
+
+        return SteamWebAPI.GetMapsFromFileElements(_tmpFiles)
+
+    @staticmethod
+    def GetMapIdsFromCollectionsList(collections: list) -> list:
+        """
+        map ids of every SteamCollection in collections, without dupplicates
+        """
         mapIDs = []
 
         for collection in collections:
@@ -195,14 +550,16 @@ class SteamWebAPI:
                     continue
                 mapIDs.append(mapId)
 
-        if (mapIDs == []):
-            return []
+        return mapIDs
 
+    @staticmethod
+    def GetMapsFromFileElements(files: list) -> list:
+        """
+        CSMap of every SteamFileElement of type Map in files
+        """
         maps = []
 
-        _tmpFiles = SteamWebAPI.GetPublishedFileDetails(len(mapIDs), mapIDs, False)
-
-        for file in _tmpFiles:
+        for file in files:
             if(type(file) != SteamFileElement):
                 continue
 
@@ -211,4 +568,4 @@ class SteamWebAPI:
 
             maps.append(file.ToCSMap())
 
-        return maps
\ No newline at end of file
+        return maps
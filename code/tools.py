@@ -1,4 +1,6 @@
 
+import sys
+
 class Tools:
     @staticmethod
     def GetValidMapsIDsFromSteamWebAPIList(listOfMaps: list) -> list:
@@ -10,9 +12,41 @@ class Tools:
             validMaps.append(map["publishedfileid"])
         return validMaps
 
+    @staticmethod
+    def GetSubCollectionsIDsFromSteamWebAPIList(listOfChildren: list) -> list:
+        subCollections = []
+        for child in listOfChildren:
+            if (child["filetype"] != 2):
+                # not a collection
+                continue
+            subCollections.append(int(child["publishedfileid"]))
+        return subCollections
+
     @staticmethod
     def SteamFileHasTag(fileTags: list, tagToSearch: str):
         for tag in fileTags:
             if tag["tag"] == tagToSearch: return True
 
-        return False
\ No newline at end of file
+        return False
+
+    @staticmethod
+    def GetTagSet(fileTags: list) -> frozenset:
+        """
+        tags of a steam file as a set, to check several tags without rescanning the list
+        """
+        return frozenset([tag["tag"] for tag in fileTags])
+
+    @staticmethod
+    def InternTags(fileTags: list) -> tuple:
+        """
+        tags of a steam file ([{"tag": "Map"}, ...] or ["Map", ...]) as a tuple of interned strings,
+        thousands of files share a handful of tags so they end up sharing the same strings
+        """
+        return tuple([sys.intern(tag["tag"] if type(tag) == dict else tag) for tag in fileTags])
+
+    @staticmethod
+    def NormalizeTag(tag: str) -> str:
+        """
+        case insensitive form of a tag (Cs2 and CS2 are the same tag), interned so equal tags share one string
+        """
+        return sys.intern(tag.strip().lower())
@@ -1,11 +1,47 @@
 
+import asyncio
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import os
+import re
+import shutil
+import tempfile
 from http import client
+import threading
+import socket
+import subprocess
+import time
 from socket import gaierror
-from sys import argv
+from sys import argv, executable
+from urllib.parse import parse_qsl
+import zlib
 from cmdColors import bcolors
-from exceptions import CollectionIsNotPublicException, CollectionNotFoundException
+from exceptions import CollectionIsNotPublicException, CollectionNotFoundException, CoreAllocationFailed, RCONAuthenticationFailed, RCONConnectionError, ServerInstanceStateError, SteamWebAPIRequestFailed, WorkshopSnapshotFormatError
 from dataStructs import SteamCollection, SteamFileElement
 from steamWebAPI import SteamWebAPI
+from workshopCache import WorkshopCache
+from workshopCatalog import WorkshopCatalog
+from collectionSync import CollectionSync
+from workshopSnapshot import WorkshopSnapshot
+from asyncSteamWebAPI import AsyncSteamWebAPI
+from requestCoalescer import RequestCoalescer
+from requestPolicy import RequestPolicy
+from connectionPool import PooledResponse
+from mockSteamWebAPI import MockSteamWebAPIServer
+from metrics import MetricsRegistry
+from workshopPrefetch import SteamCMDDownloader, WorkshopPrefetcher
+from rconClient import RCONClient
+from a2sQuery import A2S, A2SPoller, ServerStatus
+from mockGameServer import MockA2SServer, MockRCONServer
+from serverWatchdog import ServerWatchdog
+from serverManager import ServerManager, ServerInstanceConfig
+from performanceProfile import CoreAllocator, CPUTopology, PerformanceProfile
+from logBuffer import LogBuffer
+from outputReader import OutputReader
+from serverLogWriter import ServerLogWriter
+from serverLogIndex import SegmentIndex
+from serverLogSearch import LogSearch
 
 #
 #   UNIT TESTS
@@ -121,6 +157,1459 @@ class UnitTests:
 
         return True
 
+    @staticmethod
+    def TEST_ConnectionPoolReuse() -> bool:
+        """
+        to test that consecutive calls share one kept alive connection
+        """
+        SteamWebAPI.Close()
+
+        SteamWebAPI.GetCollectionsDetails(1, [3513758895], True)
+        SteamWebAPI.GetPublishedFileDetails(1, [3229373526], True)
+
+        openedConnections = SteamWebAPI.connection_pool.OpenedConnections(SteamWebAPI.steam_api_base_url, SteamWebAPI.steam_api_scheme)
+
+        SteamWebAPI.Close()
+
+        if(openedConnections != 1):
+            print("opened connections: ", openedConnections)
+            return False
+
+        return True
+
+    @staticmethod
+    def TEST_GetPublishedFileDetailsBatched() -> bool:
+        """
+        to test that a chunked lookup returns the same elements in the same order as a single request
+        """
+        collections = SteamWebAPI.GetCollectionsDetails(1, [3513758895], True)
+        mapIds = collections[0].mapIds
+
+        expectedData = SteamWebAPI.GetPublishedFileDetails(len(mapIds), mapIds)
+        data = SteamWebAPI.GetPublishedFileDetailsBatched(mapIds, chunkSize = 3, maxWorkers = 2)
+
+        if([element.ToDict() for element in data] != [element.ToDict() for element in expectedData]):
+            print([element.publishedfileid for element in data])
+            print([element.publishedfileid for element in expectedData])
+            return False
+
+        # a chunk is only sent again for an unreadable answer, failures request_policy already retried are raised
+        mock = MockSteamWebAPIServer(os.path.join(tempfile.gettempdir(), "GetPublishedFileDetailsBatched.invalid.json"))
+        mock.fixtures["files"] = {str(id): {"publishedfileid": str(id), "result": 1, "creator": "100", "creator_app_id": 766, "consumer_app_id": 730,
+            "title": "title " + str(id), "description": "", "tags": [{"tag": "Cs2"}, {"tag": "Map"}]} for id in range(1, 7)}
+        attempts = {}
+        answer = mock.Answer
+        def Answer(method: str, path: str, body: str) -> tuple:
+            ids = tuple(sorted(int(value) for key, value in parse_qsl(body) if key.startswith("publishedfileids[")))
+            attempts[ids] = attempts.get(ids, 0) + 1
+            if 5 in ids:
+                return 503, b"{}"
+            if 3 in ids and attempts[ids] == 1:
+                return 200, b'{"response": {"res'
+            return answer(method, path, body)
+        mock.Answer = Answer
+
+        policy = SteamWebAPI.request_policy
+        SteamWebAPI.request_policy = RequestPolicy(maxRetries = 2, baseDelay = 0.001, maxDelay = 0.01, rate = 1000, burst = 1000)
+        try:
+            with mock:
+                recovered = SteamWebAPI.GetPublishedFileDetailsBatched([1, 2, 3, 4], chunkSize = 2, retries = 2)
+                try:
+                    SteamWebAPI.GetPublishedFileDetailsBatched([5, 6], chunkSize = 2, retries = 2)
+                    failure = None
+                except SteamWebAPIRequestFailed as e:
+                    failure = e.status
+        finally:
+            SteamWebAPI.request_policy = policy
+
+        checks = [
+            ([element.publishedfileid for element in recovered], ["1", "2", "3", "4"]),
+            (failure, 503),
+            (attempts, {(1, 2): 1, (3, 4): 2, (5, 6): 3}),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_WorkshopCache() -> bool:
+        """
+        to test that cached collections are served without steam, fresh or stale
+        """
+        cache = WorkshopCache(":memory:")
+
+        collections = cache.GetCollectionsDetails([3513758895], True)
+        maps = cache.GetMapsFromCollectionsList(collections)
+
+        # steam is now unreachable, everything has to come from the cache
+        baseUrl = SteamWebAPI.steam_api_base_url
+        SteamWebAPI.steam_api_base_url = "invalid.invalid"
+        SteamWebAPI.Close()
+
+        try:
+            freshCollections = cache.GetCollectionsDetails([3513758895], True)
+            freshMaps = cache.GetMapsFromCollectionsList(freshCollections)
+
+            cache.collectionTTL = 0
+            cache.fileTTL = 0
+            cache.PutCollection(collections[0], ttl = 0)
+            for file in cache.GetPublishedFileDetails(collections[0].mapIds):
+                cache.PutFileElement(file, ttl = 0)
+
+            staleCollections = cache.GetCollectionsDetails([3513758895], True)
+            staleMaps = cache.GetMapsFromCollectionsList(staleCollections)
+        finally:
+            SteamWebAPI.steam_api_base_url = baseUrl
+            SteamWebAPI.Close()
+            cache.Close()
+
+        expectedData = ([collection.ToDict() for collection in collections], [_map.ToDict() for _map in maps])
+
+        for data in [(freshCollections, freshMaps), (staleCollections, staleMaps)]:
+            if(([collection.ToDict() for collection in data[0]], [_map.ToDict() for _map in data[1]]) != expectedData):
+                print([collection.ToDict() for collection in data[0]])
+                print(expectedData[0])
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_AsyncSteamWebAPI() -> bool:
+        """
+        to test that the asyncio client returns the same data as the sync one
+        """
+        collections = SteamWebAPI.GetCollectionsDetails(1, [3513758895], True)
+        expectedData = [_map.ToDict() for _map in SteamWebAPI.GetMapsFromCollectionsList(collections)]
+
+        async def GetMaps() -> list:
+            async with AsyncSteamWebAPI(maxConcurrency = 2) as api:
+                asyncCollections = await api.GetCollectionsDetails(1, [3513758895], True)
+                return await api.GetMapsFromCollectionsList(asyncCollections)
+
+        data = [_map.ToDict() for _map in asyncio.run(GetMaps())]
+
+        if(data != expectedData):
+            print(data)
+            print(expectedData)
+            return False
+
+        return True
+
+    @staticmethod
+    def TEST_RequestCoalescing() -> bool:
+        """
+        to test that concurrent lookups with overlapping ids fetch every id only once
+        """
+        fetchedIds = []
+        fetchStarted = threading.Event()
+        releaseFetch = threading.Event()
+
+        def Fetch(ids: list) -> map:
+            fetchedIds.extend(ids)
+            fetchStarted.set()
+            releaseFetch.wait(5)
+            return {id: "item " + str(id) for id in ids if id != 4}
+
+        coalescer = RequestCoalescer(Fetch)
+        data = {}
+
+        def Lookup(name: str, ids: list):
+            data[name] = coalescer.Get(ids)
+
+        first = threading.Thread(target = Lookup, args = ("first", [1, 2, 3]))
+        first.start()
+        fetchStarted.wait(5)
+
+        second = threading.Thread(target = Lookup, args = ("second", [2, 3, 4]))
+        second.start()
+        second.join(0.2)
+        releaseFetch.set()
+        first.join()
+        second.join()
+
+        expectedData = {"first": {1: "item 1", 2: "item 2", 3: "item 3"}, "second": {2: "item 2", 3: "item 3"}}
+
+        if(data != expectedData or sorted(fetchedIds) != [1, 2, 3, 4]):
+            print(data, fetchedIds)
+            return False
+
+        return True
+
+    @staticmethod
+    def TEST_GetNestedCollectionsDetails() -> bool:
+        """
+        to test expanding collections: without sub collections, nested levels, cycles, the depth limit and maps shared between branches
+        """
+        data = SteamWebAPI.GetNestedCollectionsDetails([3513758895, 3513758895])
+        expectedData = SteamWebAPI.GetCollectionsDetails(1, [3513758895], True)
+
+        if(len(data) != 1 or data[0].ToDict() != expectedData[0].ToDict()):
+            print([collection.ToDict() for collection in data])
+            print(expectedData[0].ToDict())
+            return False
+
+        def Collection(id: int, mapIds: list, subCollectionIds: list) -> map:
+            children = [{"publishedfileid": str(mapId), "sortorder": 0, "filetype": 0} for mapId in mapIds]
+            children += [{"publishedfileid": str(subId), "sortorder": 0, "filetype": 2} for subId in subCollectionIds]
+            return {"publishedfileid": str(id), "result": 1, "children": children}
+
+        mock = MockSteamWebAPIServer(os.path.join(tempfile.gettempdir(), "GetNestedCollectionsDetails.invalid.json"))
+        mock.fixtures = {"files": {}, "collections": {str(collection["publishedfileid"]): collection for collection in [
+            # nested: 103 is a sub collection of both 101 and 102, map 2 is in 100 and 101
+            Collection(100, [1, 2], [101, 102]),
+            Collection(101, [3, 2], [103]),
+            Collection(102, [4], [103]),
+            Collection(103, [5], []),
+            # another root sharing map 1 with the first one
+            Collection(104, [1, 6], []),
+            # cycle
+            Collection(200, [10], [201]),
+            Collection(201, [11], [200]),
+            # deeper than the limit
+            Collection(300, [20], [301]),
+            Collection(301, [21], [302]),
+            Collection(302, [22], [303]),
+            Collection(303, [23], []),
+        ]}}
+
+        # ids of every GetCollectionDetails request
+        requested = []
+        answer = mock.Answer
+        def Answer(method: str, path: str, body: str) -> tuple:
+            if method == "POST":
+                requested.append(sorted(int(value) for key, value in parse_qsl(body) if key.startswith("publishedfileids[")))
+            return answer(method, path, body)
+        mock.Answer = Answer
+
+        with mock:
+            nested = SteamWebAPI.GetNestedCollectionsDetails([100, 200, 104])
+            nestedRequests, requested[:] = requested[:], []
+            limited = SteamWebAPI.GetNestedCollectionsDetails([300], maxDepth = 2)
+            limitedRequests = requested[:]
+
+        checks = [
+            ([(collection.id, collection.mapIds) for collection in nested], [(100, ["1", "2", "3", "5", "4"]), (200, ["10", "11"]), (104, ["6"])]),
+            # one request per level, every collection fetched once
+            (nestedRequests, [[100, 104, 200], [101, 102, 201], [103]]),
+            ([(collection.id, collection.mapIds) for collection in limited], [(300, ["20", "21", "22"])]),
+            (limitedRequests, [[300], [301], [302]]),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_RequestPolicy() -> bool:
+        """
+        to test retries on 429 / 5xx answers and giving up once retries are exhausted
+        """
+        policy = RequestPolicy(maxRetries = 2, baseDelay = 0.01, maxDelay = 0.05, rate = 100, burst = 1)
+        statuses = [503, 429, 200]
+        attempts = []
+
+        def Send() -> PooledResponse:
+            status = statuses[len(attempts)] if len(attempts) < len(statuses) else 503
+            attempts.append(status)
+            return PooledResponse(status, "", {"retry-after": "0"}, b"{}")
+
+        if(policy.Run(Send).status != 200 or attempts != [503, 429, 200]):
+            print(attempts)
+            return False
+
+        statuses = []
+        attempts = []
+
+        try:
+            policy.Run(Send)
+            return False
+        except SteamWebAPIRequestFailed as e:
+            if(e.status != 503 or len(attempts) != 3):
+                print(e.status, attempts)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_IterMapsFromCollection() -> bool:
+        """
+        to test that streaming the maps of a collection yields the same maps as GetMapsFromCollectionsList
+        """
+        collections = SteamWebAPI.GetCollectionsDetails(1, [3513758895], True)
+
+        expectedData = [_map.ToDict() for _map in SteamWebAPI.GetMapsFromCollectionsList(collections)]
+
+        SteamWebAPI.published_file_details_chunk_size, chunkSize = 2, SteamWebAPI.published_file_details_chunk_size
+        try:
+            data = [_map.ToDict() for _map in SteamWebAPI.IterMapsFromCollectionsList(collections)]
+        finally:
+            SteamWebAPI.published_file_details_chunk_size = chunkSize
+
+        if(data != expectedData):
+            print(data)
+            print(expectedData)
+            return False
+
+        return True
+
+    @staticmethod
+    def TEST_RequestEncoding() -> bool:
+        """
+        to test form body escaping and the decompression of gzip / deflate answers
+        """
+        body = SteamWebAPI.ParseData({"itemcount": 2, "publishedfileids[0]": 3229373526, "publishedfileids[1]": "a b&c=d"})
+        expectedBody = "itemcount=2&publishedfileids[0]=3229373526&publishedfileids[1]=a+b%26c%3Dd"
+
+        if(body != expectedBody):
+            print(body)
+            print(expectedBody)
+            return False
+
+        data = b'{"response": {"publishedfiledetails": []}}'
+        rawDeflate = zlib.compressobj(wbits = -zlib.MAX_WBITS)
+
+        for encoding, encodedData in [(None, data), ("gzip", gzip.compress(data)), ("deflate", zlib.compress(data)), ("deflate", rawDeflate.compress(data) + rawDeflate.flush())]:
+            headers = {"content-encoding": encoding} if encoding is not None else {}
+            if(SteamWebAPI.DecodeBody(PooledResponse(200, "", headers, encodedData)) != data):
+                print("failed to decode", encoding)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_WorkshopCatalog() -> bool:
+        """
+        to test catalog queries by file type, tags (case insensitive), creator and app id
+        """
+        def Element(id: int, creator: str, tags: list, fileType: str = "Map", appId: int = 730) -> SteamFileElement:
+            return SteamFileElement(str(id), creator, "title " + str(id), "", [{"tag": tag} for tag in tags], fileType, appId = appId)
+
+        catalog = WorkshopCatalog([
+            Element(1, "100", ["CS2", "Map", "Hostage"]),
+            Element(2, "100", ["CS2", "Map", "Classic"]),
+            Element(3, "200", ["cs2", "map", " hostage "]),
+            Element(4, "200", ["CS2", "Weapon Finish"], "Weapon Finish"),
+            Element(5, "100", ["Map", "Hostage"], appId = 440),
+        ])
+
+        checks = [
+            ([id for id in catalog.QueryIds(fileType = "Map")], [1, 2, 3, 5]),
+            ([int(element.publishedfileid) for element in catalog.Query(tags = ["HOSTAGE", "cs2"])], [1, 3]),
+            ([int(element.publishedfileid) for element in catalog.Query(fileType = "Map", creator = 100, appId = 730)], [1, 2]),
+            ([int(element.publishedfileid) for element in catalog.Query(tags = ["unknown"])], []),
+            (catalog.CountBy("tag")["hostage"], 3),
+        ]
+
+        # replacing an element has to drop it from the indexes it no longer belongs to
+        catalog.Add([Element(3, "300", ["CS2", "Map", "Classic"])])
+        catalog.Remove([2])
+
+        checks += [
+            ([int(element.publishedfileid) for element in catalog.Query(tags = ["hostage"])], [1, 5]),
+            ([int(element.publishedfileid) for element in catalog.Query(tags = ["classic"])], [3]),
+            ([int(element.publishedfileid) for element in catalog.Query(creator = 200)], [4]),
+            (len(catalog), 4),
+        ]
+
+        for data, expectedData in checks:
+            if(sorted(data) if type(data) == list else data) != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_CollectionSync() -> bool:
+        """
+        to test that a sync only fetches the delta of a collection and reports it (does not need internet)
+        """
+        def File(id: int, timeUpdated: int, creatorAppId: int = 730) -> map:
+            return {"publishedfileid": str(id), "result": 1, "creator": "100", "creator_app_id": creatorAppId, "consumer_app_id": 730, "title": "title " + str(id), "description": "", "tags": [{"tag": "Cs2"}, {"tag": "Map"}], "time_updated": timeUpdated}
+
+        def Children(ids: list) -> map:
+            return {"publishedfileid": "900", "result": 1, "children": [{"publishedfileid": str(id), "sortorder": i, "filetype": 0} for i, id in enumerate(ids)]}
+
+        mock = MockSteamWebAPIServer(os.path.join(tempfile.gettempdir(), "CollectionSync.invalid.json"))
+        mock.fixtures = {"collections": {"900": Children([1, 2, 3, 4, 5])}, "files": {str(id): File(id, 10) for id in range(1, 7)}}
+        mock.fixtures["files"]["900"] = File(900, 1, 766)
+
+        # ids asked to each endpoint
+        requested = []
+        answer = mock.Answer
+        def Answer(method: str, path: str, body: str) -> tuple:
+            if method == "POST":
+                requested.append((path.split("/")[2], sorted(int(value) for key, value in parse_qsl(body) if key.startswith("publishedfileids["))))
+            return answer(method, path, body)
+        mock.Answer = Answer
+
+        cache = WorkshopCache(":memory:")
+        sync = CollectionSync(cache, checkBudget = 1)
+
+        try:
+            with mock:
+                first = sync.Sync(900)
+                firstRequests, requested[:] = requested[:], []
+
+                second = sync.Sync(900)
+                secondRequests, requested[:] = requested[:], []
+
+                # 3 is updated, 5 replaced by 6, 3 and 4 are due for a check but the budget only allows the oldest one
+                mock.fixtures["files"]["3"] = File(3, 20)
+                mock.fixtures["files"]["900"] = File(900, 2, 766)
+                mock.fixtures["collections"]["900"] = Children([1, 2, 3, 4, 6])
+                cache.PutFileElement(cache.GetFileElement(3)[0], ttl = 0)
+                cache.PutFileElement(cache.GetFileElement(4)[0], ttl = 0)
+
+                third = sync.Sync(900)
+                thirdRequests = requested[:]
+        finally:
+            cache.Close()
+
+        checks = [
+            ([int(element.publishedfileid) for element in first.added], [1, 2, 3, 4, 5]),
+            (firstRequests, [("GetPublishedFileDetails", [900]), ("GetCollectionDetails", [900]), ("GetPublishedFileDetails", [1, 2, 3, 4, 5])]),
+            (second.IsEmpty(), True),
+            (secondRequests, [("GetPublishedFileDetails", [900])]),
+            (([int(element.publishedfileid) for element in third.added], third.removed, [int(element.publishedfileid) for element in third.updated]), ([6], [5], [3])),
+            (thirdRequests, [("GetPublishedFileDetails", [3, 900]), ("GetCollectionDetails", [900]), ("GetPublishedFileDetails", [6])]),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_CompactDataStructs() -> bool:
+        """
+        to test that slotted records keep their ToDict / ToCSMap output, with packed and lazily loaded descriptions
+        """
+        description = "long description " * 40
+        tags = [{"tag": "Cs2"}, {"tag": "Map"}]
+
+        element = SteamFileElement("3073797349", "76561198103562816", "de_test", description, tags, "Map", 10, 20, 730)
+        otherElement = SteamFileElement("3088183343", "76561198103562816", "de_other", "short", [{"tag": "Cs2"}, {"tag": "Map"}], "Map")
+
+        loads = []
+        def LoadDescription() -> str:
+            loads.append(1)
+            return description
+        lazyElement = SteamFileElement("3073797349", "76561198103562816", "de_test", LoadDescription, ["Cs2", "Map"], "Map")
+
+        cache = WorkshopCache(":memory:")
+        try:
+            cache.PutFileElement(element)
+            # the description is read from the cache on first access, before it is closed
+            cachedData = cache.GetAllFileElements(loadDescriptions = False)[0].ToDict()
+        finally:
+            cache.Close()
+
+        expectedData = {"publishedfileid": "3073797349", "creator": "76561198103562816", "title": "de_test", "description": description, "tags": tags, "fileType": "Map"}
+        expectedMapData = {key: value for key, value in expectedData.items() if key != "fileType"}
+
+        checks = [
+            (element.ToDict(), expectedData),
+            (element.ToCSMap().ToDict(), expectedMapData),
+            (lazyElement.ToDict(), expectedData),
+            (lazyElement.ToDict(), expectedData),
+            (len(loads), 1),
+            (cachedData, expectedData),
+            (hasattr(element, "__dict__") or hasattr(element.ToCSMap(), "__dict__") or hasattr(SteamCollection(1, "", "", []), "__dict__"), False),
+            (all(a is b for a, b in zip(element.tagNames, otherElement.tagNames)), True),
+            (element.creator is otherElement.creator, True),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_WorkshopSnapshot() -> bool:
+        """
+        to test that records written to a binary snapshot come back unchanged, one at a time (does not need internet)
+        """
+        collections = [SteamCollection(3513758895, "https://steamcommunity.com/sharedfiles/filedetails/?id=3513758895", "", ["3229373526", "3073797349"], [3513758896])]
+        files = [
+            SteamFileElement("3229373526", "76561198103562816", "de_test", "long description " * 40, [{"tag": "Cs2"}, {"tag": "Map"}], "Map", 1700000000, 12345, 730),
+            SteamFileElement(3073797349, 76561198103562816, "de_other", "short", [{"tag": "Cs2"}, {"tag": "Map"}, {"tag": "Hostage"}], "Map"),
+        ]
+        maps = [files[0].ToCSMap()]
+
+        path = os.path.join(tempfile.gettempdir(), "WorkshopSnapshot.test.bin")
+        WorkshopSnapshot.Write(path, collections, files, maps)
+
+        try:
+            with WorkshopSnapshot(path) as snapshot:
+                data = (
+                    list(snapshot.FileIds()),
+                    snapshot.GetCollection(3513758895).ToDict(),
+                    [snapshot.GetFileElement(file.publishedfileid).ToDict() for file in files],
+                    snapshot.GetMap(3229373526).ToDict(),
+                    [element.timeUpdated for element in snapshot.IterFileElements()],
+                    snapshot.GetFileElement(1),
+                )
+
+            expectedData = (
+                [3073797349, 3229373526],
+                collections[0].ToDict(),
+                [file.ToDict() for file in files],
+                maps[0].ToDict(),
+                [0, 1700000000],
+                None,
+            )
+
+            if(data != expectedData):
+                print(data)
+                print(expectedData)
+                return False
+
+            # a snapshot from another format version has to be refused
+            with open(path, "r+b") as f:
+                f.seek(8)
+                f.write(b"\xff\xff")
+            try:
+                WorkshopSnapshot(path).Close()
+                return False
+            except WorkshopSnapshotFormatError:
+                pass
+        finally:
+            os.remove(path)
+
+        return True
+
+    @staticmethod
+    def TEST_SteamWebAPIMetrics() -> bool:
+        """
+        to test that steam web api calls are recorded per endpoint and exposed in the prometheus format
+        """
+        SteamWebAPI.metrics.Reset()
+        SteamWebAPI.Close()
+
+        collections = SteamWebAPI.GetCollectionsDetails(1, [3513758895], True)
+        SteamWebAPI.GetPublishedFileDetails(len(collections[0].mapIds), collections[0].mapIds)
+
+        try:
+            SteamWebAPI.SendRequest("/" + SteamWebAPI.steam_api_ISteamRemoteStorage_endpoint + "/UnknownEndpoint/v1/", {})
+            return False
+        except ValueError:
+            pass
+
+        metrics = SteamWebAPI.metrics
+        collectionLabels = {"endpoint": "GetCollectionDetails"}
+        fileLabels = {"endpoint": "GetPublishedFileDetails"}
+
+        checks = [
+            (metrics.GetCounter("steam_web_api_requests_total", collectionLabels), 1),
+            (metrics.GetCounter("steam_web_api_requests_total", fileLabels), 1),
+            (metrics.GetHistogram("steam_web_api_request_seconds", fileLabels)["count"], 1),
+            (metrics.GetHistogram("steam_web_api_ttfb_seconds", fileLabels)["count"], 1),
+            # the first call opened the connection, the second one reused it
+            (metrics.GetHistogram("steam_web_api_connect_seconds", collectionLabels)["count"], 1),
+            (metrics.GetHistogram("steam_web_api_connect_seconds", fileLabels), None),
+            (metrics.GetHistogram("steam_web_api_response_items", fileLabels)["sum"], len(collections[0].mapIds)),
+            (metrics.GetCounter("steam_web_api_errors_total", {"endpoint": "UnknownEndpoint", "error": "http_404"}), 1),
+            (metrics.GetCounter("steam_web_api_errors_total", {"endpoint": "UnknownEndpoint", "error": "JSONDecodeError"}), 1),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        registry = MetricsRegistry()
+        registry.Counter("requests_total", "Requests sent")
+        registry.Histogram("latency_seconds", "Latency", (0.1, 1.0))
+        registry.Increment("requests_total", {"endpoint": 'say "hi"'}, 2)
+        registry.Observe("latency_seconds", 0.5)
+
+        expectedText = "\n".join([
+            "# HELP latency_seconds Latency",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{le="0.1"} 0',
+            'latency_seconds_bucket{le="1"} 1',
+            'latency_seconds_bucket{le="+Inf"} 1',
+            "latency_seconds_sum 0.5",
+            "latency_seconds_count 1",
+            "# HELP requests_total Requests sent",
+            "# TYPE requests_total counter",
+            'requests_total{endpoint="say \\"hi\\""} 2',
+        ]) + "\n"
+
+        if(registry.ToPrometheus() != expectedText):
+            print(registry.ToPrometheus())
+            print(expectedText)
+            return False
+
+        return True
+
+    @staticmethod
+    def TEST_WorkshopPrefetch() -> bool:
+        """
+        to test that prefetching downloads through a stand-in steamcmd and skips items already up to date (does not need internet)
+        """
+        # stand-in for steamcmd: locks the install like steamcmd, writes a 100 bytes file in the directory of every item, item 13 always fails
+        standIn = "\n".join([
+            "import os, sys, time",
+            "args = sys.argv[1:]",
+            "installDir = args[args.index('+force_install_dir') + 1]",
+            "lock = os.open(os.path.join(installDir, 'steamcmd.lock'), os.O_CREAT | os.O_EXCL)",
+            "time.sleep(0.1)",
+            "items = [args[i + 1:i + 3] for i, arg in enumerate(args) if arg == '+workshop_download_item']",
+            "with open(os.path.join(installDir, 'calls.txt'), 'a') as f: f.write(' '.join(id for _, id in items) + '\\n')",
+            "for appId, id in items:",
+            "    if id == '13':",
+            "        print('ERROR! Download item 13 failed (Failure).')",
+            "        continue",
+            "    itemDir = os.path.join(installDir, 'steamapps', 'workshop', 'content', appId, id)",
+            "    os.makedirs(itemDir, exist_ok = True)",
+            "    with open(os.path.join(itemDir, id + '.vpk'), 'wb') as f: f.write(b'0' * 100)",
+            "    print('Success. Downloaded item ' + id + ' to \"' + itemDir + '\" (100 bytes)')",
+            "os.close(lock)",
+            "os.remove(os.path.join(installDir, 'steamcmd.lock'))",
+            "sys.exit(1 if any(id == '13' for _, id in items) else 0)",
+        ])
+
+        installDir = tempfile.mkdtemp()
+        downloader = SteamCMDDownloader(installDir, [executable, "-c", standIn])
+
+        def Calls() -> list:
+            """
+            ids of every steamcmd run
+            """
+            with open(os.path.join(installDir, "calls.txt"), "r") as f:
+                calls = sorted(sorted(int(id) for id in line.split()) for line in f.read().splitlines())
+            os.remove(os.path.join(installDir, "calls.txt"))
+            return calls
+
+        elements = [SteamFileElement("11", "1", "", "", [], "Map", 100, 100), SteamFileElement("12", "1", "", "", [], "Map", 100, 100), SteamFileElement("13", "1", "", "", [], "Map", 100, 100)]
+        # CSMap don't have time_updated / file_size, they are looked up
+        # 15 is private: its details can't be found
+        maps = [SteamFileElement("14", "1", "", "", [], "Map", 100, 100).ToCSMap(), SteamFileElement("15", "1", "", "", [], "Map", 100, 100).ToCSMap()]
+        lookup = lambda ids: [SteamFileElement(str(id), "1", "", "", [], "Map", 100, 100) for id in ids if str(id) != "15"]
+
+        progress = []
+        def OnProgress(id, status: str, done: int, total: int):
+            progress.append((status, total))
+
+        try:
+            prefetcher = WorkshopPrefetcher(downloader, maxParallel = 2, onProgress = OnProgress, detailsLookup = lookup)
+            first = prefetcher.Prefetch(elements + maps)
+            firstCalls = Calls()
+
+            # 12 was updated, 11 lost its files
+            elements[1].timeUpdated = 200
+            os.remove(os.path.join(downloader.ItemPath(11), "11.vpk"))
+
+            # a new prefetcher has to find what was downloaded in the manifest
+            second = WorkshopPrefetcher(downloader, detailsLookup = lookup).Prefetch(elements + maps)
+            secondCalls = Calls()
+
+            # items downloaded one by one from several threads still never run steamcmd on the install at the same time
+            with ThreadPoolExecutor(max_workers = 3) as executor:
+                parallel = sorted(os.path.basename(path) for path in executor.map(downloader.Download, [21, 22, 23]))
+            parallelCalls = Calls()
+        finally:
+            shutil.rmtree(installDir, ignore_errors = True)
+
+        checks = [
+            ((sorted(int(id) for id in first.downloaded), first.skipped, sorted(first.failed.keys())), ([11, 12, 14], [], ["13", "15"])),
+            ((str(first.failed["13"]), str(first.failed["15"])), ("workshop item 13 could not be downloaded: Failure", "workshop item 15 could not be downloaded: details unavailable")),
+            # one steamcmd run with every item, then one with the failed ones
+            (firstCalls, [[11, 12, 13, 14], [13]]),
+            (sorted(progress), sorted([("downloading", 5)] * 4 + [("downloaded", 5)] * 3 + [("failed", 5)] * 2)),
+            ((sorted(int(id) for id in second.downloaded), [int(id) for id in second.skipped]), ([11, 12], [14])),
+            (secondCalls, [[11, 12, 13], [13]]),
+            ((parallel, parallelCalls), (["21", "22", "23"], [[21], [22], [23]])),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_RCONClient() -> bool:
+        """
+        to test rcon authentication, pipelined commands, multi packet answers, reconnection and timeouts (does not need internet)
+        """
+        def Answer(command: str) -> str:
+            if command == "slow":
+                time.sleep(0.5)
+            elif command == "crash":
+                # the server drops the connection after running the command
+                raise ConnectionResetError()
+            return MockRCONServer.DefaultAnswer(command)
+
+        with MockRCONServer("secret", answer = Answer, answerPacketSize = 100) as server:
+            try:
+                RCONClient(server.host, server.port, "wrong").Connect()
+                return False
+            except RCONAuthenticationFailed:
+                pass
+
+            rcon = RCONClient(server.host, server.port, "secret")
+            try:
+                longText = "x" * 1000
+                answers = rcon.ExecuteMany(["echo " + longText, "echo a", "status", "echo b"])
+                connections = server.connections
+
+                # the server drops the connection, the next command opens a new one
+                rcon._socket.shutdown(socket.SHUT_RDWR)
+                answerAfterDrop = rcon.Execute("echo c")
+
+                # a command that timed out leaves nothing behind
+                try:
+                    rcon.Execute("slow", timeout = 0.1)
+                    timedOut = False
+                except TimeoutError:
+                    timedOut = True
+                pendingAfterTimeout = (dict(rcon._pending), dict(rcon._terminators))
+                answerAfterTimeout = rcon.Execute("echo d")
+
+                # a command that went out is not sent again when the connection drops before its answer
+                try:
+                    rcon.Execute("crash")
+                    crashFailed = False
+                except RCONConnectionError:
+                    crashFailed = True
+            finally:
+                rcon.Close()
+
+            # closing the shared client of a stopped server leaves the other servers' clients connected
+            with MockRCONServer("secret") as otherServer:
+                shared = RCONClient.ForServer(server.host, server.port, "secret")
+                other = RCONClient.ForServer(otherServer.host, otherServer.port, "secret")
+                try:
+                    shared.Execute("echo e")
+                    other.Execute("echo f")
+                    RCONClient.CloseServer(server.host, server.port)
+                    closedServer = (shared.connected, other.connected, (otherServer.host, otherServer.port) in RCONClient.clients,
+                        (server.host, server.port) in RCONClient.clients)
+                finally:
+                    RCONClient.CloseAll()
+
+            checks = [
+                (answers, [longText + "\n", "a\n", MockRCONServer.DefaultAnswer("status"), "b\n"]),
+                (server.commands, ["echo " + longText, "echo a", "status", "echo b", "echo c", "slow", "echo d", "crash", "echo e"]),
+                # one connection for the wrong password, one for every pipelined command
+                (connections, 2),
+                (answerAfterDrop, "c\n"),
+                ((timedOut, pendingAfterTimeout), (True, ({}, {}))),
+                (answerAfterTimeout, "d\n"),
+                (crashFailed, True),
+                (closedServer, (False, True, True, False)),
+                (server.connections, 4),
+            ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_A2SPoller() -> bool:
+        """
+        to test A2S_INFO / A2S_PLAYER / A2S_RULES polling with challenges, split (compressed) answers and timeouts (does not need internet)
+        """
+        players = [{"name":"player1", "score":12, "duration":60.5}, {"name":"player2", "score":-1, "duration":2.0}]
+        rules = {"sv_cheats":"0", "mp_maxrounds":"24"}
+        rules.update({"rule_" + str(i):"value_" + str(i) for i in range(150)}) # more than one packet
+
+        poller = A2SPoller(interval = 0.2, timeout = 0.5, offlineAfter = 1)
+        with MockA2SServer(players = players, rules = rules) as server, MockA2SServer() as silentServer, \
+             MockA2SServer(rules = rules, splitSize = 200) as compressedServer, MockA2SServer(rules = rules) as lossyServer:
+            silentServer.silent = True
+            compressedServer.compress = True
+            # the rules answer never comes whole
+            lossyServer.lostPacket = 1
+
+            poller.Start()
+            try:
+                poller.AddTarget(server.host, server.port, rules = True)
+                poller.AddTarget(silentServer.host, silentServer.port, interval = 0.1, timeout = 0.1)
+                poller.AddTarget(compressedServer.host, compressedServer.port, rules = True)
+                poller.AddTarget(lossyServer.host, lossyServer.port, rules = True, interval = 0.1, timeout = 0.1)
+
+                status = poller.GetStatus(server.host, server.port)
+                compressedStatus = poller.GetStatus(compressedServer.host, compressedServer.port)
+                lossyStatus = poller.GetStatus(lossyServer.host, lossyServer.port)
+                for _ in range(50):
+                    if status.online and compressedStatus.online and lossyStatus.failures >= 2 and poller.GetStatus(silentServer.host, silentServer.port).failures != 0:
+                        break
+                    time.sleep(0.1)
+
+                snapshot = poller.Snapshot()
+                silentStatus = snapshot[silentServer.host + ":" + str(silentServer.port)]
+                lossyStatus = snapshot[lossyServer.host + ":" + str(lossyServer.port)]
+
+                poller.RemoveTarget(server.host, server.port)
+                time.sleep(0.3)
+                queries = len(server.queries)
+                time.sleep(0.5)
+            finally:
+                poller.Stop()
+
+        checks = [
+            (status.online, True),
+            ((compressedStatus.online, compressedStatus.rules), (True, rules)),
+            ((lossyStatus["online"], lossyStatus["lastError"], lossyStatus["failures"] >= 2), (False, "timed out", True)),
+            # the parts of the lost answers are not kept
+            (poller._protocol.splits, {}),
+            ((status.info["name"], status.info["map"], status.info["players"], status.info["maxPlayers"], status.info["port"]), ("Mock CS2 Server", "de_dust2", 2, 10, server.port)),
+            (status.players, [{"index":0, "name":"player1", "score":12, "duration":60.5}, {"index":1, "name":"player2", "score":-1, "duration":2.0}]),
+            (status.rules, rules),
+            (server.queries[:3], [A2S.A2S_INFO, A2S.A2S_PLAYER, A2S.A2S_RULES]),
+            ((silentStatus["online"], silentStatus["lastError"]), (False, "timed out")),
+            # removed targets are not polled anymore
+            (len(server.queries), queries),
+            (poller.GetStatus(server.host, server.port), None),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_ServerWatchdog() -> bool:
+        """
+        to test crash loop restarts with backoff and restart budget, and hang detection (does not need internet)
+        """
+        events = []
+        crashing = ServerWatchdog(lambda: subprocess.Popen([executable, "-c", "exit(3)"]), checkInterval = 0.05, backoffBase = 0.1,
+            maxRestarts = 3, restartWindow = 60, onEvent = lambda event, message: events.append(event))
+        crashing.Start()
+        for _ in range(100):
+            if crashing.state == "gave_up":
+                break
+            time.sleep(0.1)
+        crashing.Stop()
+
+        # a process that keeps running but stops answering queries is killed and started again
+        hanging = []
+        def LaunchHanging():
+            hanging.append(subprocess.Popen([executable, "-c", "import time; time.sleep(30)"]))
+            return hanging[-1]
+
+        status = ServerStatus("127.0.0.1", 27015)
+        unresponsive = ServerWatchdog(LaunchHanging, statusLookup = lambda: status, checkInterval = 0.05, startupGrace = 0.2, queryTimeout = 0.2)
+        unresponsive.Start()
+        try:
+            for _ in range(100):
+                if len(unresponsive.history) != 0 and unresponsive.state == "running":
+                    break
+                time.sleep(0.05)
+
+            # answering again: no more restarts
+            status.lastUpdate = time.time() + 60
+            time.sleep(0.5)
+        finally:
+            unresponsive.Stop()
+            for process in hanging:
+                process.kill()
+                process.wait()
+
+        checks = [
+            (crashing.state, "gave_up"),
+            ([(record.reason, record.exitCode, record.backoff) for record in crashing.history], [("exited", 3, 0.0), ("exited", 3, 0.1), ("exited", 3, 0.2)]),
+            (all(record.latency >= record.backoff for record in crashing.history), True),
+            (events, ["failure", "restarted"] * 3 + ["failure", "gave_up"]),
+            (crashing.metrics.GetCounter("watchdog_restarts_total", {"reason":"exited"}), 3),
+            (crashing.metrics.GetHistogram("watchdog_restart_seconds")["count"], 3),
+            ([record.reason for record in unresponsive.history], ["not_answering"]),
+            (len(hanging), 2),
+            (hanging[0].returncode is not None, True),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_ServerManager() -> bool:
+        """
+        to test parallel start / stop of several instances, port allocation, state machine and watchdog restarts (does not need internet)
+        """
+        directory = tempfile.mkdtemp()
+        exePath = os.path.join(directory, "game", "bin", "linuxsteamrt64", "cs2")
+        os.makedirs(os.path.dirname(exePath))
+        with open(exePath, "w") as f:
+            f.write("#!" + executable + "\nimport sys, time\nprint(' '.join(sys.argv[1:]), flush = True)\ntime.sleep(60)\n")
+        os.chmod(exePath, 0o755)
+
+        # a port taken by something else is skipped
+        blocker = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        blocker.bind(("0.0.0.0", 0))
+        blockedPort = blocker.getsockname()[1]
+
+        lock = threading.Lock()
+        output = []
+        states = {}
+        def OnOutput(name: str, line: str):
+            with lock:
+                output.append((name, line))
+        def OnEvent(name: str, event: str, message: str):
+            with lock:
+                states.setdefault(name, []).append(message if event == "state" else event)
+
+        manager = ServerManager(portRange = (blockedPort, blockedPort + 20), portStride = 10, onOutput = OnOutput, onEvent = OnEvent,
+            poller = False, watchdogOptions = {"checkInterval":0.05}, logDirectory = os.path.join(directory, "logs"))
+        try:
+            manager.AddInstance("retake", ServerInstanceConfig(exePath, map = "de_mirage"))
+            manager.AddInstance("surf", ServerInstanceConfig(exePath, map = "surf_utopia"))
+            manager.AddInstance("taken", ServerInstanceConfig(exePath, port = blockedPort))
+            startResults = manager.StartAll()
+
+            try:
+                manager.Start("retake")
+                startedTwice = True
+            except ServerInstanceStateError:
+                startedTwice = False
+
+            for _ in range(100):
+                if len(output) >= 2:
+                    break
+                time.sleep(0.05)
+
+            # the watchdog restarts a server that died
+            manager.GetInstance("surf").process.kill()
+            for _ in range(100):
+                if "restarted" in states.get("surf", []) and len(output) >= 3:
+                    break
+                time.sleep(0.05)
+
+            processes = [manager.GetInstance(name).process for name in ("retake", "surf")]
+            stopResults = manager.StopAll()
+
+            # a start failing once the server is launched, and a server dying without watchdog, leave nothing running or polled
+            poller = A2SPoller()
+            failing = ServerManager(portRange = (blockedPort + 30, blockedPort + 50), portStride = 10, poller = poller, watchdogOptions = {"unknownOption":1})
+            try:
+                failing.AddInstance("broken", ServerInstanceConfig(exePath))
+                try:
+                    failing.Start("broken")
+                    brokenError = None
+                except TypeError as e:
+                    brokenError = type(e).__name__
+                broken = failing.GetInstance("broken")
+                brokenProcess = broken.process
+                brokenProcess.wait(timeout = 5)
+                brokenState = (broken.state, len(poller.statuses))
+
+                failing.watchdogOptions = {"checkInterval":0.05}
+                failing.Start("broken")
+                failing.AddInstance("unwatched", ServerInstanceConfig(exePath, watchdog = False))
+                failing.Start("unwatched")
+                pollingBoth = len(poller.statuses)
+
+                failing.GetInstance("unwatched").process.kill()
+                for _ in range(100):
+                    if failing.GetInstance("unwatched").state == "failed":
+                        break
+                    time.sleep(0.05)
+                unwatchedState = (failing.GetInstance("unwatched").state, list(poller.statuses.keys()))
+                brokenPort = broken.port
+            finally:
+                failing.Close()
+        finally:
+            manager.Close()
+            blocker.close()
+
+            # the log of a failed instance is written out on close
+            try:
+                with open(os.path.join(directory, "logs", "taken", ServerLogWriter.current_name)) as f:
+                    takenLog = [line[24:] for line in f.read().splitlines()]
+            except OSError:
+                takenLog = []
+            shutil.rmtree(directory, ignore_errors = True)
+
+        ports = [manager.GetInstance(name).port for name in ("retake", "surf")]
+
+        checks = [
+            ({name: type(error).__name__ if error else None for name, error in startResults.items()}, {"retake":None, "surf":None, "taken":"ServerPortUnavailable"}),
+            (startedTwice, False),
+            (sorted(ports), [blockedPort + 10, blockedPort + 20]),
+            (sorted(set(line for name, line in output if name == "retake")), ["-dedicated -port " + str(ports[0]) + " +game_type 0 +game_mode 0 +map de_mirage -maxplayers 10"]),
+            (len([line for name, line in output if name == "surf"]), 2),
+            (states["retake"], ["starting", "running", "stopping", "stopped"]),
+            (states["surf"], ["starting", "running", "failure", "restarting", "restarted", "running", "stopping", "stopped"]),
+            (states["taken"], ["starting", "failed"]),
+            (stopResults, {"retake":None, "surf":None}),
+            ([process.poll() is not None for process in processes], [True, True]),
+            ({name: instance["state"] for name, instance in manager.Snapshot().items()}, {"retake":"stopped", "surf":"stopped", "taken":"failed"}),
+            ((takenLog[-1:], manager.GetInstance("taken").log), (["[launcher] state: failed"], None)),
+            ((brokenError, brokenState, brokenProcess.returncode is not None), ("TypeError", ("failed", 0), True)),
+            (pollingBoth, 2),
+            ((unwatchedState[0], [key.endswith(":" + str(brokenPort)) for key in unwatchedState[1]]), ("failed", [True])),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_PerformanceProfile() -> bool:
+        """
+        to test cpu topology parsing, non overlapping core allocation and profiles applied to (restarted) server processes
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            # 4 physical cores with 2 hyperthreads each, siblings numbered next to each other
+            sysPath = os.path.join(directory, "sys")
+            for cpu in range(8):
+                os.makedirs(os.path.join(sysPath, "cpu" + str(cpu), "topology"))
+                with open(os.path.join(sysPath, "cpu" + str(cpu), "topology", "physical_package_id"), "w") as f:
+                    f.write("0\n")
+                with open(os.path.join(sysPath, "cpu" + str(cpu), "topology", "core_id"), "w") as f:
+                    f.write(str(cpu // 2) + "\n")
+            topology = CPUTopology.Load(sysPath, allowed = set(range(8)))
+
+            # without /sys, siblings numbered one package apart like most intel cpus
+            cpuinfoPath = os.path.join(directory, "cpuinfo")
+            with open(cpuinfoPath, "w") as f:
+                f.write("".join("processor\t: " + str(cpu) + "\nphysical id\t: 0\ncore id\t\t: " + str(cpu % 2) + "\n\n" for cpu in range(4)))
+            cpuinfoTopology = CPUTopology.Load(os.path.join(directory, "missing"), cpuinfoPath, allowed = set(range(4)))
+
+            allocator = CoreAllocator(topology)
+            allocations = [allocator.Allocate("a", 1), allocator.Allocate("b", 1, isolate = True), allocator.Allocate("c", 2)]
+            try:
+                allocator.Allocate("d", 1, isolate = True)
+                allocations.append("no failure")
+            except CoreAllocationFailed:
+                pass
+            allocator.Release("b")
+            allocations.append(allocator.Allocate("d", 1, isolate = True))
+
+            # profiles are applied to every thread of the server process and of the processes its watchdog restarts
+            exePath = os.path.join(directory, "game", "bin", "linuxsteamrt64", "cs2")
+            os.makedirs(os.path.dirname(exePath))
+            with open(exePath, "w") as f:
+                f.write("#!" + executable + "\nimport threading, time\nthreading.Thread(target = time.sleep, args = (60,), daemon = True).start()\ntime.sleep(60)\n")
+            def Applied(pid: int) -> tuple:
+                # the thread is started after the profile was applied to the process
+                for _ in range(100):
+                    if len(PerformanceProfile.Threads(pid)) > 1:
+                        break
+                    time.sleep(0.05)
+                threads = PerformanceProfile.Threads(pid)
+                return len(threads), set((tuple(sorted(os.sched_getaffinity(tid))), os.getpriority(os.PRIO_PROCESS, tid)) for tid in threads)
+            os.chmod(exePath, 0o755)
+
+            # threads running before Apply, threads started after PreExec
+            running = subprocess.Popen([exePath])
+            try:
+                Applied(running.pid)
+                errors = PerformanceProfile(nice = 4).Apply(running.pid)
+                appliedToThreads = Applied(running.pid)
+            finally:
+                running.kill()
+                running.wait()
+            inherited = subprocess.Popen([exePath], preexec_fn = PerformanceProfile(nice = 5).PreExec())
+            try:
+                appliedBeforeExec = Applied(inherited.pid)
+            finally:
+                inherited.kill()
+                inherited.wait()
+
+            cpus = sorted(os.sched_getaffinity(0))
+            restarted = threading.Event()
+            manager = ServerManager(portRange = (27015, 28015), poller = False, watchdogOptions = {"checkInterval":0.05},
+                coreAllocator = CoreAllocator(CPUTopology([(cpu,) for cpu in cpus])), onEvent = lambda name, event, message: restarted.set() if event == "restarted" else None)
+            config = ServerInstanceConfig.FromDict(ServerInstanceConfig(exePath, profile = PerformanceProfile(cores = 1, nice = 3)).ToDict())
+            manager.AddInstance("pinned", config)
+            try:
+                instance = manager.Start("pinned")
+                applied = [Applied(instance.process.pid)]
+
+                instance.process.kill()
+                restarted.wait(5)
+                applied.append(Applied(instance.process.pid))
+            finally:
+                manager.Close()
+        finally:
+            shutil.rmtree(directory, ignore_errors = True)
+
+        expectedCpus = (cpus[1] if len(cpus) > 1 else cpus[0],)
+
+        checks = [
+            (topology.cores, [(0, 1), (2, 3), (4, 5), (6, 7)]),
+            (cpuinfoTopology.cores, [(0, 2), (1, 3)]),
+            # the first core is left to the system, cores are shared once none is free, never the isolated ones
+            (allocations, [[2, 3], [4, 5], [2, 3, 6, 7], [4, 5]]),
+            (allocator.Assignments(), {"a":[2, 3], "c":[2, 3, 6, 7], "d":[4, 5]}),
+            (config.profile.ToDict(), {"cores":1, "cpus":None, "isolate":False, "nice":3, "ioClass":None, "ioLevel":4}),
+            (applied, [(2, {(expectedCpus, 3)}), (2, {(expectedCpus, 3)})]),
+            ((errors, appliedToThreads[0], set(nice for _, nice in appliedToThreads[1])), ([], 2, {4})),
+            ((appliedBeforeExec[0], set(nice for _, nice in appliedBeforeExec[1])), (2, {5})),
+            (PerformanceProfile.Preset("Default"), None),
+            (PerformanceProfile.Preset("Isolated core, high priority").ToDict(), {"cores":1, "cpus":None, "isolate":True, "nice":-5, "ioClass":"best-effort", "ioLevel":0}),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_LogBuffer() -> bool:
+        """
+        to test the bounded log buffer: coalesced repeated lines, dropped lines counted and concurrent pushes
+        """
+        buffer = LogBuffer(maxPending = 100, maxBatch = 50)
+        for line in ["map de_dust2", "spam", "spam", "spam", "ready", "spam"]:
+            buffer.Push(line)
+        coalesced = buffer.Drain()
+
+        # 150 lines while the panel does not render: 50 pushed out of the queue, 50 more than a batch
+        for i in range(150):
+            buffer.Push("line " + str(i))
+        dropped = buffer.Drain()
+        stats = buffer.Stats()
+
+        # readers push concurrently while the ui drains, into a queue big enough for everything and into a small one
+        def Read(buffer: LogBuffer) -> list:
+            def Reader(id: int):
+                for i in range(20000):
+                    buffer.Push(str(id) + " " + str(i))
+            readers = [threading.Thread(target = Reader, args = (id,)) for id in range(4)]
+            for reader in readers:
+                reader.start()
+            rendered = []
+            while any(reader.is_alive() for reader in readers):
+                rendered += buffer.Drain()
+            for reader in readers:
+                reader.join()
+            return rendered + buffer.Drain()
+
+        concurrent = LogBuffer(maxPending = 1000000, maxBatch = 1000000)
+        rendered = Read(concurrent)
+        small = LogBuffer(maxPending = 50, maxBatch = 1000000)
+        smallRendered = Read(small)
+
+        checks = [
+            (coalesced, ["map de_dust2", "spam", "    (last line repeated 2 more times)", "ready", "spam"]),
+            (dropped, ["... 100 lines dropped, the server writes faster than the log panel renders ..."] + ["line " + str(i) for i in range(100, 150)]),
+            (stats, {"pending":0, "rendered":56, "dropped":100, "coalesced":2}),
+            (len(rendered), 80000),
+            (set(rendered) == set(str(id) + " " + str(i) for id in range(4) for i in range(20000)), True),
+            (concurrent.dropped, 0),
+            (small.rendered + small.dropped, 80000),
+            (len([line for line in smallRendered if not line.startswith("... ")]), small.rendered),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_OutputReader() -> bool:
+        """
+        to test the selector based output reader: lines split between chunks, many pipes on one thread and immediate stop
+        """
+        reader = OutputReader(chunkSize = 3).Start()
+        threadCount = threading.active_count()
+
+        # utf-8 characters and \r\n split between chunks, last line without newline
+        lines, closed = [], threading.Event()
+        readFd, writeFd = os.pipe()
+        reader.Add(os.fdopen(readFd, "rb", buffering = 0), lines.append, closed.set)
+        for chunk in [b"h\xc3", b"\xa9llo\r", b"\nwor", b"ld\n\nta", b"il"]:
+            os.write(writeFd, chunk)
+            time.sleep(0.02)
+        os.close(writeFd)
+        closed.wait(5)
+
+        # many processes, one reader thread
+        script = "import sys\nfor i in range(200): print(sys.argv[1] + ' line ' + str(i) + ' ' + 'x' * i)\n"
+        processes = [subprocess.Popen([executable, "-c", script, str(id)], stdout = subprocess.PIPE) for id in range(20)]
+        outputs = {id: [] for id in range(20)}
+        done = threading.Semaphore(0)
+        for id, process in enumerate(processes):
+            reader.Add(process.stdout, outputs[id].append, done.release)
+        threadsWhileReading = threading.active_count()
+        for process in processes:
+            done.acquire(timeout = 10)
+            process.wait()
+
+        # a server still writing does not hold Stop()
+        running = subprocess.Popen([executable, "-c", "import time\nwhile True: print('tick', flush = True); time.sleep(0.01)"], stdout = subprocess.PIPE)
+        reader.Add(running.stdout, lambda line: None)
+        time.sleep(0.1)
+        start = time.monotonic()
+        reader.Stop()
+        stopTime = time.monotonic() - start
+        running.kill()
+        running.wait()
+
+        checks = [
+            (lines, ["héllo", "world", "", "tail"]),
+            (closed.is_set(), True),
+            (threadsWhileReading, threadCount),
+            (all(outputs[id] == [str(id) + " line " + str(i) + " " + "x" * i for i in range(200)] for id in range(20)), True),
+            (stopTime < 0.5, True),
+        ]
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_ServerLogWriter() -> bool:
+        """
+        to test the server log files: size rotation, compressed segments, retention, leftover segment, the bounded queue and write errors
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            # a segment left by a launcher that did not stop cleanly
+            os.makedirs(os.path.join(directory, "retake"))
+            with open(os.path.join(directory, "retake", "server.log"), "w") as f:
+                f.write("2024-05-01 12:00:00.000 leftover\n")
+
+            lines = ["line " + str(i) + " " + "x" * 40 for i in range(300)]
+            writer = ServerLogWriter(directory, "retake", maxBytes = 2000, flushInterval = 0.01).Start()
+            for line in lines:
+                writer.Write(line)
+                if len(line) % 7 == 0:
+                    time.sleep(0.001)
+            writer.Stop()
+
+            segments = writer.Segments()
+            written = []
+            for path, _, _ in segments:
+                with gzip.open(path, "rt", encoding = "utf-8") as f:
+                    written += f.read().splitlines()
+            if os.path.exists(writer.currentPath):
+                with open(writer.currentPath, encoding = "utf-8") as f:
+                    written += f.read().splitlines()
+            stamped = all(re.match(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d{3} ", line) is not None for line in written)
+
+            # the oldest segments go once the folder is over its budget
+            pruned = ServerLogWriter(directory, "retake", retentionBytes = sum(size for _, size, _ in segments[-3:]))
+            pruned.ApplyRetention()
+            kept = pruned.Segments()
+            indexes = set(name for name in os.listdir(pruned.directory) if name.endswith(".idx"))
+
+            # the queue is bounded, writes past it are dropped, not waited for
+            queue = ServerLogWriter(directory, "queue", maxPending = 10)
+            for i in range(15):
+                queue.Write(str(i))
+
+            # drops from several threads are all counted
+            crowded = ServerLogWriter(directory, "crowded", maxPending = 1000)
+            threads = [threading.Thread(target = lambda: [crowded.Write("line") for _ in range(5000)]) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # a segment that can't be rotated (directory removed) is an error, not the end of the writer
+            failing = ServerLogWriter(directory, "failing", maxBytes = 200, compress = False, flushInterval = 0.01).Start()
+            failing.Write("before")
+            for _ in range(500):
+                if failing.written == 1:
+                    break
+                time.sleep(0.01)
+            shutil.rmtree(failing.directory)
+            for i in range(5):
+                failing.Write("lost " + str(i) + " " + "x" * 40)
+            for _ in range(500):
+                if failing.errors != 0:
+                    break
+                time.sleep(0.01)
+            for i in range(3):
+                failing.Write("after " + str(i))
+            failing.Stop()
+            afterError = []
+            for path in [path for path, _, _ in failing.Segments()] + [failing.currentPath]:
+                if os.path.exists(path):
+                    with open(path, encoding = "utf-8") as f:
+                        afterError += [line[24:] for line in f.read().splitlines()]
+
+            checks = [
+                (os.path.basename(segments[0][0]), "server-20240501-120000.log.gz"),
+                (len(segments) > 5, True),
+                (all(path.endswith(".log.gz") for path, _, _ in segments), True),
+                (stamped, True),
+                ([line[24:] for line in written], ["leftover"] + lines),
+                (writer.written, 300),
+                (writer.dropped, 0),
+                (kept, segments[-3:]),
+                (indexes, set(os.path.basename(SegmentIndex.IndexPath(path)) for path, _, _ in kept)),
+                (queue.dropped, 5),
+                ((crowded.dropped, len(crowded._pending)), (19000, 1000)),
+                ((failing.errors, afterError[-3:]), (1, ["after 0", "after 1", "after 2"])),
+                (all(line.startswith("lost ") for line in afterError[:-3]), True),
+            ]
+        finally:
+            shutil.rmtree(directory, ignore_errors = True)
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
+    @staticmethod
+    def TEST_LogSearch() -> bool:
+        """
+        to test the indexed log search: blocks skipped by the word and time indexes, regex queries, time ranges, unindexed segments
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            # a day per segment, a line every 4 minutes, one player connects once
+            os.makedirs(os.path.join(directory, "retake"))
+            dayStart = time.mktime((2024, 5, 1, 0, 0, 0, 0, 0, -1))
+            texts = []
+            for day in range(4):
+                lines = []
+                for i in range(360):
+                    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(dayStart + day * 86400 + i * 240)) + ".000 "
+                    steamID = "76561198" + str(100000000 + day * 1000 + i % 50)
+                    lines.append(stamp + '"Player' + str(i % 50) + '<' + steamID + '>" killed "Bot<BOT>" with "ak47"')
+                if day == 2:
+                    lines[200] = lines[200][:24] + 'Client "Rare<76561198999999999>" connected'
+                texts.append("\n".join(lines) + "\n")
+
+                name = "server-" + time.strftime("%Y%m%d-%H%M%S", time.localtime(dayStart + day * 86400))
+                if day < 3:
+                    path = os.path.join(directory, "retake", name + ".log")
+                else:
+                    # the current segment, not indexed yet
+                    path = os.path.join(directory, "retake", "server.log")
+                with open(path, "w") as f:
+                    f.write(texts[-1])
+                if day < 3:
+                    SegmentIndex.Build(path, compress = day != 1, blockSize = 2048, bloomBits = 1 << 12)
+
+            with gzip.open(os.path.join(directory, "retake", "server-" + time.strftime("%Y%m%d-%H%M%S", time.localtime(dayStart)) + ".log.gz"), "rt") as f:
+                unpacked = f.read()
+
+            def Expected(pattern: str, start: float = None, end: float = None) -> list:
+                regex = re.compile(pattern, re.IGNORECASE)
+                first = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start)) if start is not None else ""
+                last = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end)) if end is not None else "9"
+                return [("retake", line) for text in texts for line in text.splitlines() if regex.search(line) and first <= line[:19] <= last]
+
+            search = LogSearch(directory)
+            rare = list(search.Search(r"\b76561198999999999\b"))
+            rareStats = (search.blocksRead, search.blocksIndexed, search.filesScanned)
+            player = list(search.Search(r"Player7<76561198100001007>"))
+            unbounded = list(search.Search("999999999"))
+            unboundedStats = (search.blocksRead, search.blocksIndexed)
+            start, end = dayStart + 86400 + 12 * 3600, dayStart + 2 * 86400 + 6 * 3600
+            ranged = list(search.Search(r"killed .* with", start = start, end = end))
+            rangedStats = search.blocksIndexed
+            limited = list(search.Search("ak47", limit = 10))
+
+            # a segment caught in the middle of its rotation: plain file next to the index of its compressed form, then
+            # plain file, .gz and index, the plain file must not be read through the index nor be read twice
+            os.makedirs(os.path.join(directory, "rotating", "build"))
+            rotatingPath = os.path.join(directory, "rotating", "server-" + time.strftime("%Y%m%d-%H%M%S", time.localtime(dayStart)) + ".log")
+            buildPath = os.path.join(directory, "rotating", "build", os.path.basename(rotatingPath))
+            for path in (rotatingPath, buildPath):
+                with open(path, "w") as f:
+                    f.write(texts[0])
+            SegmentIndex.Build(buildPath, blockSize = 2048, bloomBits = 1 << 12)
+            shutil.copy(SegmentIndex.IndexPath(buildPath), SegmentIndex.IndexPath(rotatingPath))
+
+            rotatingExpected = [("rotating", line) for line in texts[0].splitlines() if "player7<" in line.lower()]
+            beforeGz = list(search.Search(r"\bPlayer7\b", names = ["rotating"]))
+            shutil.copy(buildPath + ".gz", rotatingPath + ".gz")
+            withGz = list(search.Search(r"\bPlayer7\b", names = ["rotating"]))
+            withGzStats = (search.blocksRead, search.filesScanned)
+
+            # a damaged block is skipped, the others are still searched
+            os.remove(rotatingPath)
+            with open(rotatingPath + ".gz", "r+b") as f:
+                f.seek(100)
+                f.write(b"\xff" * 64)
+            damaged = list(search.Search(r"\bPlayer7\b", names = ["rotating"]))
+            damagedStats = search.unreadable
+
+            checks = [
+                (unpacked, texts[0]),
+                (rare, Expected("76561198999999999")),
+                (len(rare), 1),
+                (rareStats[0] < 5 and rareStats[1] > 30 and rareStats[2] == 1, True),
+                (player, Expected(r"Player7<76561198100001007>")),
+                (len(player) > 5, True),
+                (unbounded, rare),
+                (unboundedStats[0], unboundedStats[1]),
+                (ranged, Expected(r"killed .* with", start, end)),
+                (len(ranged), 180 + 91),
+                (rangedStats < rareStats[1], True),
+                (limited, Expected("ak47")[:10]),
+                (list(search.Search("ak47", names = ["surf"])), []),
+                (beforeGz, rotatingExpected),
+                (withGz, rotatingExpected),
+                (withGzStats[0] > 0 and withGzStats[1] == 0, True),
+                (damagedStats, 1),
+                (0 < len(damaged) < len(rotatingExpected) and all(line in rotatingExpected for line in damaged), True),
+                (LogSearch.RequiredWords(r"\bClient \"[^\"]+<7656(\d+)>\" connected\b"), {b"client", b"connected"}),
+                (LogSearch.RequiredWords(r"Client \"[^\"]+\" connected"), set()),
+                (LogSearch.RequiredWords(r"\[U:1:123\]"), {b"u", b"1", b"123"}),
+                (LogSearch.RequiredWords("STEAM_1:0:12345 x?"), {b"0", b"12345"}),
+                (LogSearch.RequiredWords(r"ab+c de|f"), set()),
+            ]
+        finally:
+            shutil.rmtree(directory, ignore_errors = True)
+
+        for data, expectedData in checks:
+            if data != expectedData:
+                print(data)
+                print(expectedData)
+                return False
+
+        return True
+
 
 if __name__ == "__main__":
     print ("CS2 Server Maker - Unit Tests")
@@ -128,12 +1617,40 @@ if __name__ == "__main__":
 
     if len(argv) < 2:
         print ("Not enough arguments")
-        print ("py .\\unitTests.py <testName>\n")
+        print ("py .\\unitTests.py <testName> [--replay | --record]\n")
+        print (" --replay: answer steam web api calls from fixtures/steamWebAPI.json, no internet needed")
+        print (" --record: forward steam web api calls to steam and store the answers in fixtures/steamWebAPI.json\n")
         print ("valid tests:")
         print (" - WebConnection")
         print (" - GetCollectionDetails")
         print (" - GetNonPublicCollectionDetails")
         print (" - CollectionNotFound")
+        print (" - GetPublishedFileDetails")
+        print (" - GetMapsFromCollection")
+        print (" - ConnectionPoolReuse")
+        print (" - GetPublishedFileDetailsBatched")
+        print (" - WorkshopCache")
+        print (" - AsyncSteamWebAPI")
+        print (" - RequestCoalescing")
+        print (" - GetNestedCollectionsDetails")
+        print (" - RequestPolicy")
+        print (" - IterMapsFromCollection")
+        print (" - RequestEncoding")
+        print (" - WorkshopCatalog")
+        print (" - CollectionSync")
+        print (" - CompactDataStructs")
+        print (" - WorkshopSnapshot")
+        print (" - SteamWebAPIMetrics")
+        print (" - WorkshopPrefetch")
+        print (" - RCONClient")
+        print (" - A2SPoller")
+        print (" - ServerWatchdog")
+        print (" - ServerManager")
+        print (" - PerformanceProfile")
+        print (" - LogBuffer")
+        print (" - OutputReader")
+        print (" - ServerLogWriter")
+        print (" - LogSearch")
         exit(1)
 
     #
@@ -146,6 +1663,11 @@ if __name__ == "__main__":
     # STEAM API TESTS
     #
 
+    if "--replay" in argv or "--record" in argv:
+        mockServer = MockSteamWebAPIServer(record = "--record" in argv).Start()
+        mockServer.Install()
+        atexit.register(mockServer.Stop)
+
     if(not UnitTests.TEST_WebConnection()):
         print(bcolors.FAIL, end="")
         print("Internet Connection Failed")
@@ -230,5 +1752,317 @@ if __name__ == "__main__":
         else:
             exit(5)
 
+    if argv[1] == "ConnectionPoolReuse":
+        testVal = UnitTests.TEST_ConnectionPoolReuse()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_ConnectionPoolReuse() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(6)
+
+    if argv[1] == "GetPublishedFileDetailsBatched":
+        testVal = UnitTests.TEST_GetPublishedFileDetailsBatched()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_GetPublishedFileDetailsBatched() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(7)
+
+    if argv[1] == "WorkshopCache":
+        testVal = UnitTests.TEST_WorkshopCache()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_WorkshopCache() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(8)
+
+    if argv[1] == "AsyncSteamWebAPI":
+        testVal = UnitTests.TEST_AsyncSteamWebAPI()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_AsyncSteamWebAPI() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(9)
+
+    if argv[1] == "RequestCoalescing":
+        testVal = UnitTests.TEST_RequestCoalescing()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_RequestCoalescing() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(10)
+
+    if argv[1] == "GetNestedCollectionsDetails":
+        testVal = UnitTests.TEST_GetNestedCollectionsDetails()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_GetNestedCollectionsDetails() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(11)
+
+    if argv[1] == "RequestPolicy":
+        testVal = UnitTests.TEST_RequestPolicy()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_RequestPolicy() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(12)
+
+    if argv[1] == "IterMapsFromCollection":
+        testVal = UnitTests.TEST_IterMapsFromCollection()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_IterMapsFromCollection() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(13)
+
+    if argv[1] == "RequestEncoding":
+        testVal = UnitTests.TEST_RequestEncoding()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_RequestEncoding() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(14)
+
+    if argv[1] == "WorkshopCatalog":
+        testVal = UnitTests.TEST_WorkshopCatalog()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_WorkshopCatalog() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(15)
+
+    if argv[1] == "CollectionSync":
+        testVal = UnitTests.TEST_CollectionSync()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_CollectionSync() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(16)
+
+    if argv[1] == "CompactDataStructs":
+        testVal = UnitTests.TEST_CompactDataStructs()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_CompactDataStructs() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(17)
+
+    if argv[1] == "WorkshopSnapshot":
+        testVal = UnitTests.TEST_WorkshopSnapshot()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_WorkshopSnapshot() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(18)
+
+    if argv[1] == "SteamWebAPIMetrics":
+        testVal = UnitTests.TEST_SteamWebAPIMetrics()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_SteamWebAPIMetrics() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(19)
+
+    if argv[1] == "WorkshopPrefetch":
+        testVal = UnitTests.TEST_WorkshopPrefetch()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_WorkshopPrefetch() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(20)
+
+    if argv[1] == "RCONClient":
+        testVal = UnitTests.TEST_RCONClient()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_RCONClient() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(21)
+
+    if argv[1] == "A2SPoller":
+        testVal = UnitTests.TEST_A2SPoller()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_A2SPoller() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(22)
+
+    if argv[1] == "ServerWatchdog":
+        testVal = UnitTests.TEST_ServerWatchdog()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_ServerWatchdog() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(23)
+
+    if argv[1] == "ServerManager":
+        testVal = UnitTests.TEST_ServerManager()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_ServerManager() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(24)
+
+    if argv[1] == "PerformanceProfile":
+        testVal = UnitTests.TEST_PerformanceProfile()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_PerformanceProfile() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(25)
+
+    if argv[1] == "LogBuffer":
+        testVal = UnitTests.TEST_LogBuffer()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_LogBuffer() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(26)
+
+    if argv[1] == "OutputReader":
+        testVal = UnitTests.TEST_OutputReader()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_OutputReader() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(27)
+
+    if argv[1] == "ServerLogWriter":
+        testVal = UnitTests.TEST_ServerLogWriter()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_ServerLogWriter() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(28)
+
+    if argv[1] == "LogSearch":
+        testVal = UnitTests.TEST_LogSearch()
+
+        print ("\033[92m") if testVal else print ("\033[91m")
+
+        print ("TEST_LogSearch() ::", testVal)
+
+        print ("Test Pass","\033[0m") if testVal else print ("Test Failed","\033[0m")
+        if testVal :
+            exit(0)
+        else:
+            exit(29)
+
     print ("\033[91mTest not found.\033[0m")
     exit(2)
\ No newline at end of file
@@ -0,0 +1,313 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from steamWebAPI import SteamWebAPI
+from dataStructs import SteamCollection, SteamFileElement
+
+#
+#   WORKSHOP CACHE
+#
+
+class WorkshopCache:
+    """
+    Persistent sqlite cache of SteamCollection and SteamFileElement records
+    entries younger than their ttl are served without any request,
+    older entries are revalidated with the time_updated steam returns,
+    stale entries are still served when the steam web api can't be reached
+    """
+
+    default_path: str = os.path.join(os.path.expanduser("~"), ".cs2servermaker", "workshopCache.sqlite3")
+
+    collection_ttl: float = 60 * 60
+    file_ttl: float = 24 * 60 * 60
+
+    def __init__(self, path: str = None, collectionTTL: float = None, fileTTL: float = None):
+        if path is None: path = WorkshopCache.default_path
+        if collectionTTL is None: collectionTTL = WorkshopCache.collection_ttl
+        if fileTTL is None: fileTTL = WorkshopCache.file_ttl
+
+        self.path           = path
+        self.collectionTTL  = collectionTTL
+        self.fileTTL        = fileTTL
+
+        if path != ":memory:" and os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread = False)
+
+        with self._lock, self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS collections (id INTEGER PRIMARY KEY, data TEXT NOT NULL, time_updated INTEGER NOT NULL, fetched_at REAL NOT NULL, ttl REAL NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, data TEXT NOT NULL, file_type TEXT NOT NULL, time_updated INTEGER NOT NULL, file_size INTEGER NOT NULL, fetched_at REAL NOT NULL, ttl REAL NOT NULL, app_id INTEGER NOT NULL DEFAULT 0)")
+
+            # caches created before app_id was stored
+            if "app_id" not in [column[1] for column in self._db.execute("PRAGMA table_info(files)")]:
+                self._db.execute("ALTER TABLE files ADD COLUMN app_id INTEGER NOT NULL DEFAULT 0")
+
+    def Close(self):
+        with self._lock:
+            self._db.close()
+
+    #
+    #   RAW ENTRIES
+    #
+
+    def PutCollection(self, collection: SteamCollection, timeUpdated: int = 0, ttl: float = None):
+        if ttl is None: ttl = self.collectionTTL
+
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO collections VALUES (?, ?, ?, ?, ?)", (int(collection.id), json.dumps(collection.ToDict()), timeUpdated, time.time(), ttl))
+
+    def GetCollection(self, id: int) -> tuple:
+        """
+        returns (SteamCollection, timeUpdated, fetchedAt, isFresh) or None if the collection is not cached
+        """
+        with self._lock:
+            row = self._db.execute("SELECT data, time_updated, fetched_at, ttl FROM collections WHERE id = ?", (int(id),)).fetchone()
+
+        if row is None:
+            return None
+
+        data = json.loads(row[0])
+        collection = SteamCollection(data["id"], data["url"], data["name"], data["mapIds"], data.get("subCollectionIds", []))
+
+        return collection, row[1], row[2], time.time() - row[2] < row[3]
+
+    def PutFileElement(self, element: SteamFileElement, ttl: float = None):
+        self.PutFileElements([element], ttl)
+
+    def PutFileElements(self, elements: list, ttl: float = None):
+        if ttl is None: ttl = self.fileTTL
+        now = time.time()
+
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO files (id, data, file_type, time_updated, file_size, fetched_at, ttl, app_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(int(element.publishedfileid), json.dumps(element.ToDict()), element.fileType, element.timeUpdated, element.fileSize, now, ttl, element.appId) for element in elements])
+
+    def GetFileElement(self, id: int) -> tuple:
+        """
+        returns (SteamFileElement, isFresh) or None if the file is not cached
+        """
+        with self._lock:
+            row = self._db.execute("SELECT data, time_updated, file_size, fetched_at, ttl, app_id FROM files WHERE id = ?", (int(id),)).fetchone()
+
+        if row is None:
+            return None
+
+        return WorkshopCache._FileElementFromRow(row), time.time() - row[3] < row[4]
+
+    def GetFileStates(self, ids: list) -> map:
+        """
+        returns {id: (timeUpdated, fetchedAt, isFresh)} for the cached files among ids, without decoding them
+        """
+        ids = [int(id) for id in ids]
+        states = {}
+        now = time.time()
+
+        with self._lock:
+            # stay under sqlite's bound parameters limit
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for id, timeUpdated, fetchedAt, ttl in self._db.execute("SELECT id, time_updated, fetched_at, ttl FROM files WHERE id IN (" + ",".join("?" * len(chunk)) + ")", chunk):
+                    states[id] = (timeUpdated, fetchedAt, now - fetchedAt < ttl)
+
+        return states
+
+    def GetAllFileElements(self, loadDescriptions: bool = True) -> list:
+        """
+        every cached file, fresh or not (to fill a WorkshopCatalog for example)
+        without loadDescriptions, descriptions stay in the cache until they are first read
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT data, time_updated, file_size, fetched_at, ttl, app_id FROM files ORDER BY id").fetchall()
+
+        return [WorkshopCache._FileElementFromRow(row, None if loadDescriptions else self) for row in rows]
+
+    def GetDescription(self, id: int) -> str:
+        entry = self.GetFileElement(id)
+        return entry[0].description if entry is not None else ""
+
+    @staticmethod
+    def _FileElementFromRow(row: tuple, lazyCache = None) -> SteamFileElement:
+        data = json.loads(row[0])
+
+        description = data["description"]
+        if lazyCache is not None:
+            id = int(data["publishedfileid"])
+            description = lambda: lazyCache.GetDescription(id)
+
+        return SteamFileElement(data["publishedfileid"], data["creator"], data["title"], description, data["tags"], data["fileType"], row[1], row[2], row[5])
+
+    def Touch(self, table: str, ids: list):
+        """
+        mark entries as fresh again after a successful revalidation
+        """
+        if table not in ("collections", "files"):
+            raise ValueError("unknown cache table " + table)
+
+        with self._lock, self._db:
+            self._db.executemany("UPDATE " + table + " SET fetched_at = ? WHERE id = ?", [(time.time(), int(id)) for id in ids])
+
+    def Delete(self, table: str, ids: list):
+        if table not in ("collections", "files"):
+            raise ValueError("unknown cache table " + table)
+
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM " + table + " WHERE id = ?", [(int(id),) for id in ids])
+
+    #
+    #   CACHED STEAM WEB API CALLS
+    #
+
+    @staticmethod
+    def _RecordLookups(table: str, fresh: int, stale: int, missing: int):
+        for result, count in (("fresh", fresh), ("stale", stale), ("miss", missing)):
+            if count != 0:
+                SteamWebAPI.metrics.Increment("workshop_cache_lookups_total", {"table":table, "result":result}, count)
+
+    def GetCollectionsDetails(self, publishedfileids: list, verbose: bool = False, raiseOnError = True) -> list:
+        """
+        Cached SteamWebAPI.GetCollectionsDetails
+        expired collections are revalidated together with their maps in one GetPublishedFileDetails request,
+        GetCollectionDetails is only sent again for collections that changed or were never cached
+        """
+        ids = []
+        for itemId in publishedfileids:
+            if(type(itemId) != int or itemId in ids):
+                continue
+            ids.append(itemId)
+
+        collections = {}
+        expired = {}
+        elementsById = {}
+        toFetch = []
+
+        for id in ids:
+            entry = self.GetCollection(id)
+            if entry is None:
+                toFetch.append(id)
+            elif entry[3]:
+                collections[id] = entry[0]
+            else:
+                expired[id] = entry
+
+        WorkshopCache._RecordLookups("collections", len(collections), len(expired), len(toFetch))
+
+        if len(expired) != 0:
+            childIds = []
+            for collection, _, _, _ in expired.values():
+                childIds.extend(mapId for mapId in collection.mapIds if mapId not in childIds)
+
+            try:
+                elements = SteamWebAPI.GetPublishedFileDetailsBatched(list(expired.keys()) + childIds, verbose = verbose)
+            except SteamWebAPI.retryable_errors:
+                # steam is unreachable, serve what we have
+                for id, entry in expired.items():
+                    collections[id] = entry[0]
+                expired = {}
+                elements = []
+
+            elementsById = {int(element.publishedfileid): element for element in elements}
+            self.PutFileElements([element for element in elements if int(element.publishedfileid) not in expired])
+
+            unchanged = []
+            for id, (collection, timeUpdated, fetchedAt, _) in expired.items():
+                element = elementsById.get(id)
+                if element is not None and element.timeUpdated != 0 and (element.timeUpdated == timeUpdated or (timeUpdated == 0 and element.timeUpdated < fetchedAt)):
+                    collections[id] = collection
+                    unchanged.append(id)
+                    if timeUpdated == 0:
+                        self.PutCollection(collection, element.timeUpdated)
+                else:
+                    toFetch.append(id)
+            self.Touch("collections", unchanged)
+
+        if len(toFetch) != 0:
+            try:
+                fetched = SteamWebAPI.GetCollectionsDetails(len(toFetch), toFetch, verbose, raiseOnError)
+            except SteamWebAPI.retryable_errors:
+                staleCount = 0
+                for id in toFetch:
+                    if id in expired:
+                        collections[id] = expired[id][0]
+                        staleCount += 1
+                if staleCount == 0 and len(collections) == 0:
+                    raise
+                fetched = None
+
+            if fetched is not None:
+                for collection in fetched:
+                    element = elementsById.get(collection.id)
+                    self.PutCollection(collection, element.timeUpdated if element is not None else 0)
+                    collections[collection.id] = collection
+
+                fetchedIds = [collection.id for collection in fetched]
+                self.Delete("collections", [id for id in toFetch if id not in fetchedIds])
+                for id in toFetch:
+                    if id not in fetchedIds: collections.pop(id, None)
+
+        return [collections[id] for id in ids if id in collections]
+
+    def GetPublishedFileDetails(self, publishedfileids: list, verbose: bool = False, raiseOnError = False) -> list:
+        """
+        Cached SteamWebAPI.GetPublishedFileDetails
+        missing and expired files are fetched in one batched lookup
+        """
+        ids = []
+        for itemId in publishedfileids:
+            if int(itemId) in ids:
+                continue
+            ids.append(int(itemId))
+
+        elements = {}
+        stale = {}
+        toFetch = []
+
+        for id in ids:
+            entry = self.GetFileElement(id)
+            if entry is None:
+                toFetch.append(id)
+            elif entry[1]:
+                elements[id] = entry[0]
+            else:
+                stale[id] = entry[0]
+                toFetch.append(id)
+
+        WorkshopCache._RecordLookups("files", len(elements), len(stale), len(toFetch) - len(stale))
+
+        if len(toFetch) != 0:
+            try:
+                fetched = SteamWebAPI.GetPublishedFileDetailsBatched(toFetch, verbose = verbose, raiseOnError = raiseOnError)
+            except SteamWebAPI.retryable_errors:
+                # steam is unreachable, serve what we have
+                if len(elements) == 0 and len(stale) == 0:
+                    raise
+                fetched = None
+                elements.update(stale)
+
+            if fetched is not None:
+                self.PutFileElements(fetched)
+
+                fetchedIds = set()
+                for element in fetched:
+                    elements[int(element.publishedfileid)] = element
+                    fetchedIds.add(int(element.publishedfileid))
+
+                # not returned anymore: deleted, private or not a cs2 item
+                self.Delete("files", [id for id in toFetch if id not in fetchedIds])
+
+        return [elements[id] for id in ids if id in elements]
+
+    def GetMapsFromCollectionsList(self, collections: list) -> list:
+        """
+        Cached SteamWebAPI.GetMapsFromCollectionsList
+        """
+        mapIDs = SteamWebAPI.GetMapIdsFromCollectionsList(collections)
+
+        if (mapIDs == []):
+            return []
+
+        return SteamWebAPI.GetMapsFromFileElements(self.GetPublishedFileDetails(mapIDs))
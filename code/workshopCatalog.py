@@ -0,0 +1,152 @@
+import threading
+
+from tools import Tools
+from dataStructs import SteamFileElement
+
+#
+#   WORKSHOP CATALOG
+#
+
+class WorkshopCatalog:
+    """
+    In memory catalog of classified SteamFileElement
+    tags are normalized once (case insensitive, interned) when an element is added,
+    secondary indexes by file type, tag, creator and app id answer queries by set intersection
+    without rescanning elements or their tag lists
+
+    usage:
+        catalog.Query(fileType = "Map", tags = ["Hostage"], creator = "76561198103562816", appId = 730)
+    """
+
+    def __init__(self, elements: list = None):
+        self._lock = threading.RLock()
+
+        self._elements: map = {}    # id -> SteamFileElement
+        self._tags: map = {}        # id -> frozenset of normalized tags
+
+        self._byFileType: map = {}  # file type -> set of ids
+        self._byTag: map = {}       # normalized tag -> set of ids
+        self._byCreator: map = {}   # creator -> set of ids
+        self._byAppId: map = {}     # app id -> set of ids
+
+        if elements is not None:
+            self.Add(elements)
+
+    def __len__(self) -> int:
+        return len(self._elements)
+
+    def __contains__(self, id) -> bool:
+        return int(id) in self._elements
+
+    @staticmethod
+    def _Index(index: map, key, id: int):
+        ids = index.get(key)
+        if ids is None:
+            ids = index[key] = set()
+        ids.add(id)
+
+    @staticmethod
+    def _Unindex(index: map, key, id: int):
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.discard(id)
+        if len(ids) == 0:
+            del index[key]
+
+    def Add(self, elements: list):
+        """
+        Add or replace elements
+        """
+        with self._lock:
+            for element in elements:
+                if(type(element) != SteamFileElement):
+                    continue
+
+                id = int(element.publishedfileid)
+                if id in self._elements:
+                    self._Remove(id)
+
+                tags = frozenset([Tools.NormalizeTag(tag) for tag in element.tagNames])
+
+                self._elements[id] = element
+                self._tags[id] = tags
+
+                WorkshopCatalog._Index(self._byFileType, element.fileType, id)
+                WorkshopCatalog._Index(self._byCreator, str(element.creator), id)
+                WorkshopCatalog._Index(self._byAppId, int(element.appId), id)
+                for tag in tags:
+                    WorkshopCatalog._Index(self._byTag, tag, id)
+
+    def Remove(self, ids: list):
+        with self._lock:
+            for id in ids:
+                if int(id) in self._elements:
+                    self._Remove(int(id))
+
+    def _Remove(self, id: int):
+        element = self._elements.pop(id)
+        tags = self._tags.pop(id)
+
+        WorkshopCatalog._Unindex(self._byFileType, element.fileType, id)
+        WorkshopCatalog._Unindex(self._byCreator, str(element.creator), id)
+        WorkshopCatalog._Unindex(self._byAppId, int(element.appId), id)
+        for tag in tags:
+            WorkshopCatalog._Unindex(self._byTag, tag, id)
+
+    def Get(self, id) -> SteamFileElement:
+        return self._elements.get(int(id))
+
+    def GetTags(self, id) -> frozenset:
+        """
+        normalized tags of an element
+        """
+        return self._tags.get(int(id), frozenset())
+
+    def QueryIds(self, fileType: str = None, tags: list = None, creator = None, appId: int = None) -> set:
+        """
+        ids of the elements matching every given filter (tags: every tag has to be present)
+        """
+        with self._lock:
+            candidates = []
+
+            if fileType is not None:
+                candidates.append(self._byFileType.get(fileType, set()))
+            if creator is not None:
+                candidates.append(self._byCreator.get(str(creator), set()))
+            if appId is not None:
+                candidates.append(self._byAppId.get(int(appId), set()))
+            if tags is not None:
+                for tag in tags:
+                    candidates.append(self._byTag.get(Tools.NormalizeTag(tag), set()))
+
+            if len(candidates) == 0:
+                return set(self._elements.keys())
+
+            # intersect from the smallest set, so the cost follows the most selective filter
+            candidates.sort(key = len)
+            ids = set(candidates[0])
+            for candidate in candidates[1:]:
+                if len(ids) == 0:
+                    break
+                ids.intersection_update(candidate)
+
+            return ids
+
+    def Query(self, fileType: str = None, tags: list = None, creator = None, appId: int = None) -> list:
+        """
+        elements matching every given filter, sorted by id
+        """
+        ids = self.QueryIds(fileType, tags, creator, appId)
+
+        with self._lock:
+            return [self._elements[id] for id in sorted(ids)]
+
+    def CountBy(self, index: str) -> map:
+        """
+        number of elements per key of an index ("fileType", "tag", "creator" or "appId")
+        """
+        indexes = {"fileType": self._byFileType, "tag": self._byTag, "creator": self._byCreator, "appId": self._byAppId}
+
+        with self._lock:
+            return {key: len(ids) for key, ids in indexes[index].items()}
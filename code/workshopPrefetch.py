@@ -0,0 +1,271 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+import subprocess
+import threading
+
+from steamWebAPI import SteamWebAPI
+from exceptions import WorkshopDownloadFailed
+
+#
+#   WORKSHOP DOWNLOADERS
+#
+
+class SteamCMDDownloader:
+    """
+    Downloads (or validates) workshop items with steamcmd +workshop_download_item
+    items end up in installDir/steamapps/workshop/content/appId/<id>, where a dedicated server installed in installDir finds them
+    command is the steamcmd command line before the arguments, a local stand-in can be given instead (tests)
+    steamcmd locks its install: several items go in one run (DownloadMany) and runs on the same install never overlap
+    """
+
+    success_pattern = re.compile(r"Success\. Downloaded item (\d+)")
+    error_pattern   = re.compile(r"ERROR! Download item (\d+) failed \((.*)\)")
+
+    # installDir -> lock held while steamcmd runs on it
+    install_locks: map = {}
+    install_locks_lock = threading.Lock()
+
+    def __init__(self, installDir: str, command: list = None, appId: int = 730, login: str = "anonymous", timeout: float = 30 * 60):
+        if command is None: command = ["steamcmd"]
+
+        self.installDir = installDir
+        self.command    = command
+        self.appId      = appId
+        self.login      = login
+        self.timeout    = timeout
+
+    def ItemPath(self, publishedfileid) -> str:
+        return os.path.join(self.installDir, "steamapps", "workshop", "content", str(self.appId), str(publishedfileid))
+
+    def _InstallLock(self) -> threading.Lock:
+        key = os.path.normcase(os.path.abspath(self.installDir))
+        with SteamCMDDownloader.install_locks_lock:
+            return SteamCMDDownloader.install_locks.setdefault(key, threading.Lock())
+
+    def Download(self, publishedfileid) -> str:
+        """
+        Download an item, returns its directory
+        """
+        outcome = self.DownloadMany([publishedfileid])[str(publishedfileid)]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def DownloadMany(self, ids: list) -> map:
+        """
+        Download items in a single steamcmd run, returns a map of every id (str) to its directory or its WorkshopDownloadFailed
+        """
+        args = self.command + ["+force_install_dir", os.path.abspath(self.installDir), "+login", self.login]
+        for id in ids:
+            args += ["+workshop_download_item", str(self.appId), str(id), "validate"]
+        args.append("+quit")
+
+        try:
+            with self._InstallLock():
+                process = subprocess.run(args, stdout = subprocess.PIPE, stderr = subprocess.STDOUT, timeout = self.timeout * max(1, len(ids)))
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return {str(id): WorkshopDownloadFailed(id, str(e)) for id in ids}
+
+        output = process.stdout.decode("utf-8", errors = "replace")
+        succeeded = set(SteamCMDDownloader.success_pattern.findall(output))
+        errors = dict(SteamCMDDownloader.error_pattern.findall(output))
+        lines = [line for line in output.splitlines() if line.strip() != ""]
+        fallback = lines[-1] if lines else "exit code " + str(process.returncode)
+
+        # items are told apart by the lines steamcmd prints for them, not by its exit code
+        return {str(id): self.ItemPath(id) if str(id) in succeeded else WorkshopDownloadFailed(id, errors.get(str(id), fallback)) for id in ids}
+
+#
+#   WORKSHOP PREFETCH
+#
+
+class PrefetchResult:
+    """
+    Outcome of a WorkshopPrefetcher.Prefetch call
+    downloaded / skipped are ids, failed maps ids to their error
+    """
+
+    def __init__(self):
+        self.downloaded: list   = []
+        self.skipped: list      = []
+        self.failed: map        = {}
+
+    def ToDict(self) -> map:
+        return {"downloaded":self.downloaded, "skipped":self.skipped, "failed":{id: str(error) for id, error in self.failed.items()}}
+
+
+class WorkshopPrefetcher:
+    """
+    Downloads workshop maps ahead of a server launch
+    downloaders with DownloadMany (steamcmd) get every item in one call, the others at most maxParallel at once with Download
+    an item is skipped when the manifest says the version on disk has the same time_updated and file_size
+    and its directory still has the size it had once downloaded
+    progress is reported to onProgress(id, status, done, total) with status "skipped", "downloading", "downloaded" or "failed"
+    (called from the download threads), ids whose details can't be found (private, removed) are failed
+
+    usage:
+        prefetcher = WorkshopPrefetcher(SteamCMDDownloader(serverDir))
+        prefetcher.Prefetch(SteamWebAPI.GetMapsFromCollectionsList(collections))
+    """
+
+    manifest_name: str = "cs2servermaker_prefetch.json"
+
+    def __init__(self, downloader, maxParallel: int = 4, retries: int = 1, onProgress = None, manifestPath: str = None, detailsLookup = None):
+        if manifestPath is None: manifestPath = os.path.join(os.path.dirname(downloader.ItemPath(0)), WorkshopPrefetcher.manifest_name)
+        if detailsLookup is None: detailsLookup = SteamWebAPI.GetPublishedFileDetailsBatched
+
+        self.downloader     = downloader
+        self.maxParallel    = maxParallel
+        self.retries        = retries
+        self.onProgress     = onProgress
+        self.manifestPath   = manifestPath
+        self.detailsLookup  = detailsLookup
+
+        self._lock = threading.Lock()
+        self._manifest: map = {}
+        if os.path.exists(manifestPath):
+            try:
+                with open(manifestPath, "r", encoding = "utf-8") as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                # unreadable manifest, everything is downloaded again
+                self._manifest = {}
+
+    @staticmethod
+    def DirectorySize(path: str) -> int:
+        """
+        size of every file under path, -1 if path is not a directory
+        """
+        if not os.path.isdir(path):
+            return -1
+
+        size = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return size
+
+    def IsUpToDate(self, element) -> bool:
+        entry = self._manifest.get(str(element.publishedfileid))
+        if entry is None:
+            return False
+
+        if entry["timeUpdated"] != element.timeUpdated or entry["fileSize"] != element.fileSize:
+            return False
+
+        return WorkshopPrefetcher.DirectorySize(self.downloader.ItemPath(element.publishedfileid)) == entry["diskSize"]
+
+    def _SaveManifest(self):
+        if os.path.dirname(self.manifestPath) != "":
+            os.makedirs(os.path.dirname(self.manifestPath), exist_ok = True)
+
+        with open(self.manifestPath + ".tmp", "w", encoding = "utf-8") as f:
+            json.dump(self._manifest, f, indent = 1, sort_keys = True)
+        os.replace(self.manifestPath + ".tmp", self.manifestPath)
+
+    def Prefetch(self, items: list) -> PrefetchResult:
+        """
+        Download every item that is not already up to date on disk
+        items are SteamFileElement or CSMap (the time_updated / file_size of CSMap are looked up first)
+        """
+        elements = {}
+        toLookup = []
+        for item in items:
+            if hasattr(item, "timeUpdated"):
+                elements[str(item.publishedfileid)] = item
+            else:
+                toLookup.append(item.publishedfileid)
+
+        if len(toLookup) != 0:
+            for element in self.detailsLookup(toLookup):
+                elements[str(element.publishedfileid)] = element
+
+        result = PrefetchResult()
+        missing = [str(id) for id in dict.fromkeys(toLookup) if str(id) not in elements]
+        total = len(elements) + len(missing)
+        done = [0]
+
+        def Report(id, status: str):
+            if self.onProgress is not None:
+                self.onProgress(id, status, done[0], total)
+
+        def Finish(id, status: str, error = None):
+            with self._lock:
+                done[0] += 1
+                if status == "skipped": result.skipped.append(id)
+                elif status == "downloaded": result.downloaded.append(id)
+                else: result.failed[id] = error
+            Report(id, status)
+
+        def Downloaded(element, path: str):
+            with self._lock:
+                self._manifest[str(element.publishedfileid)] = {"timeUpdated":element.timeUpdated, "fileSize":element.fileSize, "diskSize":WorkshopPrefetcher.DirectorySize(path)}
+                self._SaveManifest()
+            Finish(element.publishedfileid, "downloaded")
+
+        for id in missing:
+            Finish(id, "failed", WorkshopDownloadFailed(id, "details unavailable"))
+
+        toDownload = []
+        for element in elements.values():
+            if self.IsUpToDate(element):
+                Finish(element.publishedfileid, "skipped")
+            else:
+                toDownload.append(element)
+
+        if hasattr(self.downloader, "DownloadMany"):
+            self._DownloadBatched(toDownload, Report, Finish, Downloaded)
+            return result
+
+        def Fetch(element):
+            id = element.publishedfileid
+            Report(id, "downloading")
+
+            for attempt in range(self.retries + 1):
+                try:
+                    path = self.downloader.Download(id)
+                    break
+                except (WorkshopDownloadFailed, OSError) as e:
+                    if attempt == self.retries:
+                        Finish(id, "failed", e)
+                        return
+
+            Downloaded(element, path)
+
+        with ThreadPoolExecutor(max_workers = max(1, self.maxParallel)) as executor:
+            for future in [executor.submit(Fetch, element) for element in toDownload]:
+                future.result()
+
+        return result
+
+    def _DownloadBatched(self, elements: list, Report, Finish, Downloaded):
+        """
+        one DownloadMany call per attempt, the next attempts only with the items that failed
+        """
+        for element in elements:
+            Report(element.publishedfileid, "downloading")
+
+        for attempt in range(self.retries + 1):
+            if len(elements) == 0:
+                return
+
+            try:
+                outcomes = self.downloader.DownloadMany([element.publishedfileid for element in elements])
+            except (WorkshopDownloadFailed, OSError) as e:
+                outcomes = {str(element.publishedfileid): e for element in elements}
+
+            failed = []
+            for element in elements:
+                outcome = outcomes.get(str(element.publishedfileid), WorkshopDownloadFailed(element.publishedfileid, "not downloaded"))
+                if not isinstance(outcome, Exception):
+                    Downloaded(element, outcome)
+                elif attempt == self.retries:
+                    Finish(element.publishedfileid, "failed", outcome)
+                else:
+                    failed.append(element)
+            elements = failed
@@ -0,0 +1,323 @@
+from array import array
+from bisect import bisect_left
+import mmap
+import os
+import struct
+import sys
+
+from dataStructs import CSMap, SteamCollection, SteamFileElement
+from exceptions import WorkshopSnapshotFormatError
+
+#
+#   WORKSHOP SNAPSHOT
+#
+# binary file layout (little endian), every section starts on 8 bytes:
+#
+#   header          magic, version, record counts and section offsets (header_struct)
+#   string table    stringCount + 1 u64 offsets, then the utf-8 data of every distinct string
+#   collections     u64 id column (sorted), u64 record offset column, then the records
+#   files           same as collections
+#   maps            same as collections
+#
+# records only hold fixed width fields and u32 indexes in the string table, see *_record_struct
+#
+
+class WorkshopSnapshot:
+    """
+    Versioned binary snapshot of SteamCollection, SteamFileElement and CSMap records
+    opening a snapshot only maps the file and reads its header, ids are looked up by binary search
+    in the id columns and a record is only decoded when it is asked for
+    descriptions stay in the file until they are read, so they have to be read before Close()
+
+    usage:
+        WorkshopSnapshot.Write(path, collections, files, maps)
+
+        with WorkshopSnapshot(path) as snapshot:
+            element = snapshot.GetFileElement(3073797349)
+    """
+
+    default_path: str = os.path.join(os.path.expanduser("~"), ".cs2servermaker", "workshopSnapshot.bin")
+
+    magic: bytes = b"CS2WSNAP"
+    version: int = 1
+
+    # magic, version, reserved, string / collection / file / map counts, string / collection / file / map section offsets
+    header_struct = struct.Struct("<8sHHIIIIQQQQ")
+    # url, name, flags, map id count, sub collection id count + map ids (u32 strings) + sub collection ids (u64)
+    collection_record_struct = struct.Struct("<IIBII")
+    # publishedfileid, creator, title, description, file type, time updated, file size, app id, flags, tag count + tags (u32 strings)
+    file_record_struct = struct.Struct("<IIIIIqqIBH")
+    # publishedfileid, creator, title, description, flags, tag count + tags (u32 strings)
+    map_record_struct = struct.Struct("<IIIIBH")
+
+    # flags, set when the field was an int instead of a string
+    flag_int_publishedfileid: int = 1
+    flag_int_creator: int = 2
+    flag_int_map_ids: int = 4
+
+    def __init__(self, path: str = None):
+        if path is None: path = WorkshopSnapshot.default_path
+
+        self.path = path
+        self._views: list = []
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+        try:
+            if len(self._mmap) < WorkshopSnapshot.header_struct.size:
+                raise WorkshopSnapshotFormatError(path + " is too short to be a workshop snapshot")
+
+            magic, version, _, stringCount, collectionCount, fileCount, mapCount, stringsOffset, collectionsOffset, filesOffset, mapsOffset = WorkshopSnapshot.header_struct.unpack_from(self._mmap, 0)
+
+            if magic != WorkshopSnapshot.magic:
+                raise WorkshopSnapshotFormatError(path + " is not a workshop snapshot")
+            if version != WorkshopSnapshot.version:
+                raise WorkshopSnapshotFormatError(path + " is a version " + str(version) + " workshop snapshot, version " + str(WorkshopSnapshot.version) + " is expected")
+
+            self._stringOffsets = self._Column(stringsOffset, stringCount + 1)
+            self._stringData = stringsOffset + 8 * (stringCount + 1)
+
+            self._collectionIds = self._Column(collectionsOffset, collectionCount)
+            self._collectionOffsets = self._Column(collectionsOffset + 8 * collectionCount, collectionCount)
+            self._fileIds = self._Column(filesOffset, fileCount)
+            self._fileOffsets = self._Column(filesOffset + 8 * fileCount, fileCount)
+            self._mapIds = self._Column(mapsOffset, mapCount)
+            self._mapOffsets = self._Column(mapsOffset + 8 * mapCount, mapCount)
+        except (WorkshopSnapshotFormatError, ValueError, TypeError, struct.error) as e:
+            self.Close()
+            if isinstance(e, WorkshopSnapshotFormatError):
+                raise
+            raise WorkshopSnapshotFormatError(path + " is a corrupted workshop snapshot") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Close()
+
+    def Close(self):
+        # the mmap can't be closed while views on it exist
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def _Column(self, offset: int, count: int):
+        """
+        u64 column of the file, as a sequence of ints
+        """
+        if offset + 8 * count > len(self._mmap):
+            raise WorkshopSnapshotFormatError(self.path + " is truncated")
+
+        if sys.byteorder == "little":
+            view = memoryview(self._mmap)[offset:offset + 8 * count]
+            self._views.append(view)
+            column = view.cast("Q")
+            self._views.append(column)
+            return column
+
+        column = array("Q", self._mmap[offset:offset + 8 * count])
+        column.byteswap()
+        return column
+
+    def _String(self, index: int) -> str:
+        return self._mmap[self._stringData + self._stringOffsets[index]:self._stringData + self._stringOffsets[index + 1]].decode("utf-8")
+
+    def _Strings(self, offset: int, count: int) -> list:
+        return [self._String(index) for index in struct.unpack_from("<" + str(count) + "I", self._mmap, offset)]
+
+    def _LazyString(self, index: int):
+        return lambda: self._String(index)
+
+    @staticmethod
+    def _Find(ids, offsets, id) -> int:
+        """
+        offset of the record of id, None if the snapshot doesn't have it
+        """
+        id = int(id)
+        i = bisect_left(ids, id)
+        if i == len(ids) or ids[i] != id:
+            return None
+        return offsets[i]
+
+    #
+    #   READING
+    #
+
+    def CollectionIds(self):
+        """
+        sorted ids of the collections in the snapshot (read from the file, nothing is decoded)
+        """
+        return self._collectionIds
+
+    def FileIds(self):
+        return self._fileIds
+
+    def MapIds(self):
+        return self._mapIds
+
+    def GetCollection(self, id: int) -> SteamCollection:
+        offset = WorkshopSnapshot._Find(self._collectionIds, self._collectionOffsets, id)
+        if offset is None:
+            return None
+        return self._DecodeCollection(int(id), offset)
+
+    def GetFileElement(self, id) -> SteamFileElement:
+        offset = WorkshopSnapshot._Find(self._fileIds, self._fileOffsets, id)
+        if offset is None:
+            return None
+        return self._DecodeFileElement(offset)
+
+    def GetMap(self, id) -> CSMap:
+        offset = WorkshopSnapshot._Find(self._mapIds, self._mapOffsets, id)
+        if offset is None:
+            return None
+        return self._DecodeMap(offset)
+
+    def IterCollections(self):
+        for id, offset in zip(self._collectionIds, self._collectionOffsets):
+            yield self._DecodeCollection(id, offset)
+
+    def IterFileElements(self):
+        for offset in self._fileOffsets:
+            yield self._DecodeFileElement(offset)
+
+    def IterMaps(self):
+        for offset in self._mapOffsets:
+            yield self._DecodeMap(offset)
+
+    def _DecodeCollection(self, id: int, offset: int) -> SteamCollection:
+        url, name, flags, mapCount, subCollectionCount = WorkshopSnapshot.collection_record_struct.unpack_from(self._mmap, offset)
+        offset += WorkshopSnapshot.collection_record_struct.size
+
+        mapIds = self._Strings(offset, mapCount)
+        if flags & WorkshopSnapshot.flag_int_map_ids:
+            mapIds = [int(mapId) for mapId in mapIds]
+        offset += 4 * mapCount
+
+        subCollectionIds = list(struct.unpack_from("<" + str(subCollectionCount) + "Q", self._mmap, offset))
+
+        return SteamCollection(id, self._String(url), self._String(name), mapIds, subCollectionIds)
+
+    def _DecodeFileElement(self, offset: int) -> SteamFileElement:
+        publishedfileid, creator, title, description, fileType, timeUpdated, fileSize, appId, flags, tagCount = WorkshopSnapshot.file_record_struct.unpack_from(self._mmap, offset)
+        tags = self._Strings(offset + WorkshopSnapshot.file_record_struct.size, tagCount)
+
+        publishedfileid, creator = self._DecodeIds(publishedfileid, creator, flags)
+
+        return SteamFileElement(publishedfileid, creator, self._String(title), self._LazyString(description), tags, self._String(fileType), timeUpdated, fileSize, appId)
+
+    def _DecodeMap(self, offset: int) -> CSMap:
+        publishedfileid, creator, title, description, flags, tagCount = WorkshopSnapshot.map_record_struct.unpack_from(self._mmap, offset)
+        tags = self._Strings(offset + WorkshopSnapshot.map_record_struct.size, tagCount)
+
+        publishedfileid, creator = self._DecodeIds(publishedfileid, creator, flags)
+
+        return CSMap(publishedfileid, creator, self._String(title), self._LazyString(description), tags)
+
+    def _DecodeIds(self, publishedfileid: int, creator: int, flags: int) -> tuple:
+        publishedfileid = self._String(publishedfileid)
+        if flags & WorkshopSnapshot.flag_int_publishedfileid:
+            publishedfileid = int(publishedfileid)
+
+        creator = self._String(creator)
+        if flags & WorkshopSnapshot.flag_int_creator:
+            creator = int(creator)
+
+        return publishedfileid, creator
+
+    #
+    #   WRITING
+    #
+
+    @staticmethod
+    def Write(path: str = None, collections: list = (), files: list = (), maps: list = ()):
+        """
+        Write a snapshot of the records, replacing path atomically
+        records with the same id are only written once (the last one wins)
+        """
+        if path is None: path = WorkshopSnapshot.default_path
+
+        strings: map = {}
+        def String(value) -> int:
+            value = str(value)
+            index = strings.get(value)
+            if index is None:
+                index = strings[value] = len(strings)
+            return index
+
+        def Flags(publishedfileid, creator) -> int:
+            flags = 0
+            if type(publishedfileid) == int: flags |= WorkshopSnapshot.flag_int_publishedfileid
+            if type(creator) == int: flags |= WorkshopSnapshot.flag_int_creator
+            return flags
+
+        collectionRecords = {}
+        for collection in collections:
+            flags = WorkshopSnapshot.flag_int_map_ids if len(collection.mapIds) != 0 and type(collection.mapIds[0]) == int else 0
+            record = WorkshopSnapshot.collection_record_struct.pack(String(collection.url), String(collection.name), flags, len(collection.mapIds), len(collection.subCollectionIds))
+            record += struct.pack("<" + str(len(collection.mapIds)) + "I", *[String(mapId) for mapId in collection.mapIds])
+            record += struct.pack("<" + str(len(collection.subCollectionIds)) + "Q", *[int(id) for id in collection.subCollectionIds])
+            collectionRecords[int(collection.id)] = record
+
+        fileRecords = {}
+        for element in files:
+            record = WorkshopSnapshot.file_record_struct.pack(String(element.publishedfileid), String(element.creator), String(element.title), String(element.description), String(element.fileType),
+                element.timeUpdated, element.fileSize, element.appId, Flags(element.publishedfileid, element.creator), len(element.tagNames))
+            record += struct.pack("<" + str(len(element.tagNames)) + "I", *[String(tag) for tag in element.tagNames])
+            fileRecords[int(element.publishedfileid)] = record
+
+        mapRecords = {}
+        for _map in maps:
+            record = WorkshopSnapshot.map_record_struct.pack(String(_map.publishedfileid), String(_map.creator), String(_map.title), String(_map.description), Flags(_map.publishedfileid, _map.creator), len(_map.tagNames))
+            record += struct.pack("<" + str(len(_map.tagNames)) + "I", *[String(tag) for tag in _map.tagNames])
+            mapRecords[int(_map.publishedfileid)] = record
+
+        # string table
+        encodedStrings = [value.encode("utf-8") for value in strings.keys()]
+        stringOffsets = [0]
+        for encoded in encodedStrings:
+            stringOffsets.append(stringOffsets[-1] + len(encoded))
+
+        data = bytearray(WorkshopSnapshot.header_struct.size)
+
+        def Align():
+            data.extend(b"\0" * (-len(data) % 8))
+
+        Align()
+        stringsOffset = len(data)
+        data += struct.pack("<" + str(len(stringOffsets)) + "Q", *stringOffsets)
+        for encoded in encodedStrings:
+            data += encoded
+
+        def Section(records: map) -> int:
+            Align()
+            offset = len(data)
+            ids = sorted(records.keys())
+
+            recordOffsets = []
+            recordsOffset = offset + 16 * len(ids)
+            for id in ids:
+                recordOffsets.append(recordsOffset)
+                recordsOffset += len(records[id])
+
+            data.extend(struct.pack("<" + str(len(ids)) + "Q", *ids))
+            data.extend(struct.pack("<" + str(len(ids)) + "Q", *recordOffsets))
+            for id in ids:
+                data.extend(records[id])
+            return offset
+
+        collectionsOffset = Section(collectionRecords)
+        filesOffset = Section(fileRecords)
+        mapsOffset = Section(mapRecords)
+
+        WorkshopSnapshot.header_struct.pack_into(data, 0, WorkshopSnapshot.magic, WorkshopSnapshot.version, 0,
+            len(strings), len(collectionRecords), len(fileRecords), len(mapRecords), stringsOffset, collectionsOffset, filesOffset, mapsOffset)
+
+        if os.path.dirname(path) != "":
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)